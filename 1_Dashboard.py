@@ -1,9 +1,23 @@
 import streamlit as st
 import pandas as pd
+import os
 import plotly.express as px
+import plotly.graph_objects as go
 
-from src.data_loader import load_emr_data
-from src.mhabi_algorithm import process_dataframe
+from src.cache import use_streamlit_cache
+from src.compact import use_mapped_frames
+from src.cube import CORRELATION_INPUTS
+from src.data_loader import (
+    DEFAULT_DATA_PATH, DataLoadError, data_version, get_cohort_cube, get_store, get_trends, load_filter_options,
+    load_scored_data
+)
+from src.history import TREND_WINDOWS
+from src.instrumentation import Recorder, activate, stage
+from src.patient_index import PatientIndex
+from src.plotting import DEFAULT_MAX_POINTS, box_from_summary, scatter_with_trendline
+from src.scoring_config import list_scoring_profiles, load_scoring_config
+from src.table import PatientTable
+from src.whatif import WhatIfModel
 
 st.set_page_config(
     page_title="MHABI Dashboard",
@@ -11,127 +25,263 @@ st.set_page_config(
     layout="wide"
 )
 
-DATA_FILE_PATH = 'data/sample_emr_data.csv'
+# Share loader caches across sessions and pages
+use_streamlit_cache()
+
+# A SQLite patient database, CSV file or partitioned Parquet dataset directory
+DATA_FILE_PATH = os.environ.get('MHABI_DATA_PATH', DEFAULT_DATA_PATH)
+
+# Optional directory for memory-mapped snapshots of CSV/Parquet data, shared by every dashboard process on the host
+FRAME_CACHE_DIR = os.environ.get('MHABI_FRAME_CACHE')
+use_mapped_frames(FRAME_CACHE_DIR)
+
+# Optional per-stage timing exports: a JSON-lines log and/or an OpenMetrics text file
+METRICS_LOG_PATH = os.environ.get('MHABI_METRICS_LOG')
+METRICS_FILE_PATH = os.environ.get('MHABI_METRICS_FILE')
 
-def highlight_amplified(row):
-    """Highlights a DataFrame row in light red with black text if risk was amplified."""
-    bg_color = '#ffcccc'
-    text_color = 'black'
-    style = f'background-color: {bg_color}; color: {text_color};'
-    
-    if row.risk_amplified:
-        return [style for _ in row]
-    else:
-        return ['' for _ in row]
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Largest cohort the correlation scatter draws point by point; larger ones are density-binned
+SCATTER_MAX_POINTS = int(os.environ.get('MHABI_SCATTER_MAX_POINTS', DEFAULT_MAX_POINTS))
 
 st.title("MHABI Analysis Dashboard")
 st.markdown("This dashboard provides an interactive interface to explore the MHABI score.")
 st.info("To add a new patient record, please navigate to the **'Add New Patient'** page from the sidebar.")
 
-data = load_emr_data(DATA_FILE_PATH)
-if not data.empty:
-    processed_data = process_dataframe(data)
-else:
-    st.warning("Data file is empty or could not be loaded.")
-    processed_data = pd.DataFrame(columns=[
-        'patient_id', 'region', 'age_group', 'gender', 'mhabi_score', 'risk_amplified'
-    ])
+# Stage timing is off (and free) unless the performance panel is open or an export is configured
+show_performance = st.sidebar.toggle("Show performance panel", value=False)
+recorder = activate(Recorder(enabled=show_performance or bool(METRICS_LOG_PATH or METRICS_FILE_PATH)))
+
+scoring_profiles = list_scoring_profiles()
+profile_names = list(scoring_profiles)
+# Preselect the reference profile, or the first one if default.toml has been removed
+selected_profile = st.sidebar.selectbox(
+    "Scoring Profile", options=profile_names, index=profile_names.index('default') if 'default' in profile_names else 0
+)
+scoring_config = load_scoring_config(scoring_profiles[selected_profile])
 
 st.sidebar.header("Filter Options")
 
-if not processed_data.empty:
-    regions = sorted(processed_data['region'].unique())
+with stage('filter_options'):
+    # Creates (and seeds) the patient database on first run
+    get_store(DATA_FILE_PATH)
+
+    # Filter choices come from a column-only scan so the selections can be pushed down to the loader
+    filter_options = load_filter_options(DATA_FILE_PATH)
+has_data = bool(filter_options) and all(filter_options.values())
+
+if has_data:
+    regions = filter_options['region']
     selected_regions = st.sidebar.multiselect("Select Region(s)", options=regions, default=regions)
-    age_groups = sorted(processed_data['age_group'].unique())
+    age_groups = filter_options['age_group']
     selected_age_groups = st.sidebar.multiselect("Select Age Group(s)", options=age_groups, default=age_groups)
-    genders = sorted(processed_data['gender'].unique())
+    genders = filter_options['gender']
     selected_genders = st.sidebar.multiselect("Select Gender(s)", options=genders, default=genders)
 
-    filtered_df = processed_data[
-        (processed_data['region'].isin(selected_regions)) &
-        (processed_data['age_group'].isin(selected_age_groups)) &
-        (processed_data['gender'].isin(selected_genders))
-    ]
+    # A column with every option selected needs no predicate
+    selections = {'region': selected_regions, 'age_group': selected_age_groups, 'gender': selected_genders}
+    filters = {
+        column: (None if set(selected) == set(filter_options[column]) else tuple(selected))
+        for column, selected in selections.items()
+    }
 else:
     st.sidebar.info("No data available to filter.")
-    filtered_df = processed_data
+    filters = None
+
+try:
+    filtered_df = load_scored_data(DATA_FILE_PATH, filters, scoring_profiles[selected_profile])
+except DataLoadError as e:
+    st.error(str(e))
+    filtered_df = pd.DataFrame()
+if filtered_df.empty:
+    if not has_data:
+        st.warning("Data file is empty or could not be loaded.")
+    filtered_df = pd.DataFrame(columns=[
+        'patient_id', 'region', 'age_group', 'gender', 'mhabi_score', 'risk_amplified'
+    ])
 
 
-if filtered_df.empty and not processed_data.empty:
+if filtered_df.empty and has_data:
     st.warning("No data matches the selected filters. Try adjusting the sidebar options.")
-elif filtered_df.empty and processed_data.empty:
+elif filtered_df.empty:
     st.info("The dataset is currently empty. Please add a new patient record from the 'Add New Patient' page.")
 else:
+    display_cols = ['patient_id', 'region', 'age_group', 'gender', 'mhabi_score', 'risk_amplified']
+    # Sort, lookup and what-if structures are rebuilt only when the data, profile or filters change, not on every rerun
+    table_key = (DATA_FILE_PATH, selected_profile, repr(filters), data_version(DATA_FILE_PATH, scoring_profiles[selected_profile]))
+    with stage('table_indexes'):
+        if st.session_state.get('patient_table_key') != table_key:
+            st.session_state.patient_table = PatientTable(filtered_df, columns=display_cols)
+            st.session_state.patient_index = PatientIndex(filtered_df, scoring_config)
+            st.session_state.whatif_model = WhatIfModel(filtered_df, scoring_config)
+            st.session_state.patient_table_key = table_key
+
     st.header("Exploratory Analysis")
+    # Cohort charts are answered from pre-aggregated cells rather than patient rows
+    with stage('cohort_cube'):
+        cohort = get_cohort_cube(DATA_FILE_PATH, scoring_profiles[selected_profile], filters).query(filters)
     plot_options = [
         "Average MHABI Score by Region", "MHABI Score Distribution by Age Group",
         "MHABI Score Distribution by Gender", "Risk Amplification Breakdown",
         "Correlation of Inputs with MHABI Score"
     ]
     selected_plot = st.selectbox("Choose a visualization to display:", plot_options)
-    if selected_plot == "Average MHABI Score by Region":
-        avg_mhabi_by_region = filtered_df.groupby('region')['mhabi_score'].mean().reset_index()
-        fig = px.bar(
-            avg_mhabi_by_region, x='region', y='mhabi_score', title="Average MHABI Score by Region", color='region',
-            labels={'mhabi_score': 'Average MHABI Score', 'region': 'Region'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    elif selected_plot == "MHABI Score Distribution by Age Group":
-        sorted_age = sorted(filtered_df['age_group'].unique())
-        fig = px.box(
-            filtered_df, x='age_group', y='mhabi_score', title="MHABI Score Distribution by Age Group", color='age_group',
-            category_orders={"age_group": sorted_age}, labels={'mhabi_score': 'MHABI Score', 'age_group': 'Age Group'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    elif selected_plot == "MHABI Score Distribution by Gender":
-        fig = px.box(
-            filtered_df, x='gender', y='mhabi_score', title="MHABI Score Distribution by Gender", color='gender',
-            labels={'mhabi_score': 'MHABI Score', 'gender': 'Gender'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    elif selected_plot == "Risk Amplification Breakdown":
-        amplified_counts = filtered_df['risk_amplified'].value_counts()
-        fig = px.pie(
-            values=amplified_counts.values, names=amplified_counts.index, title="Proportion of Patients with Amplified Risk",
-            hole=0.3, color_discrete_map={True: 'crimson', False: 'royalblue'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-    elif selected_plot == "Correlation of Inputs with MHABI Score":
-        st.markdown("Select a raw input variable to see its correlation with the final MHABI score.")
-        correlation_var = st.selectbox(
-            "Select an input variable:", ['wait_time_days', 'dalys', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score']
-        )
-        fig = px.scatter(
-            filtered_df, x=correlation_var, y='mhabi_score', title=f"MHABI Score vs. {correlation_var.replace('_', ' ').title()}",
-            trendline="ols", trendline_color_override="red",
-            labels={'mhabi_score': 'MHABI Score', correlation_var: correlation_var.replace('_', ' ').title()}
+    with stage('chart', chart=selected_plot):
+        if selected_plot == "Average MHABI Score by Region":
+            avg_mhabi_by_region = cohort.by('region').rename(columns={'mean': 'mhabi_score'})
+            fig = px.bar(
+                avg_mhabi_by_region, x='region', y='mhabi_score', title="Average MHABI Score by Region", color='region',
+                labels={'mhabi_score': 'Average MHABI Score', 'region': 'Region'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        elif selected_plot == "MHABI Score Distribution by Age Group":
+            fig = box_from_summary(
+                cohort.by('age_group'), 'age_group', title="MHABI Score Distribution by Age Group",
+                labels={'mhabi_score': 'MHABI Score', 'age_group': 'Age Group'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        elif selected_plot == "MHABI Score Distribution by Gender":
+            fig = box_from_summary(
+                cohort.by('gender'), 'gender', title="MHABI Score Distribution by Gender",
+                labels={'mhabi_score': 'MHABI Score', 'gender': 'Gender'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        elif selected_plot == "Risk Amplification Breakdown":
+            amplified_counts = {flag: count for flag, count in cohort.amplified_counts().items() if count}
+            fig = px.pie(
+                values=list(amplified_counts.values()), names=list(amplified_counts.keys()), title="Proportion of Patients with Amplified Risk",
+                hole=0.3, color_discrete_map={True: 'crimson', False: 'royalblue'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        elif selected_plot == "Correlation of Inputs with MHABI Score":
+            st.markdown("Select a raw input variable to see its correlation with the final MHABI score.")
+            correlation_var = st.selectbox("Select an input variable:", list(CORRELATION_INPUTS))
+            # Large cohorts are density-binned; the trendline is fitted from the cube's running sums
+            fig = scatter_with_trendline(
+                filtered_df, x=correlation_var, y='mhabi_score', title=f"MHABI Score vs. {correlation_var.replace('_', ' ').title()}",
+                labels={'mhabi_score': 'MHABI Score', correlation_var: correlation_var.replace('_', ' ').title()},
+                max_points=SCATTER_MAX_POINTS, statistics=cohort.statistics(correlation_var)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Trends come from weekly rollups of the assessment log, which only a patient database keeps
+    trends = get_trends(DATA_FILE_PATH, scoring_profiles[selected_profile])
+    if trends is not None:
+        st.header("MHABI Trends")
+        t1, t2 = st.columns([2, 1])
+        trend_window = t1.selectbox("Window:", list(TREND_WINDOWS), index=1)
+        split_regions = t2.toggle("One line per region", value=True)
+        with stage('trends', window=trend_window):
+            trend = trends.trend(
+                TREND_WINDOWS[trend_window], regions=(filters or {}).get('region'), by_region=split_regions
+            )
+            if trend.empty:
+                st.info("No assessments have been recorded for the selected regions yet.")
+            else:
+                fig = px.line(
+                    trend, x='week_start', y='mean_score', color='region', title=f"Mean MHABI Score ({trend_window})",
+                    labels={'week_start': 'Week', 'mean_score': 'Mean MHABI Score', 'region': 'Region'},
+                    hover_data={'assessments': True, 'amplified_rate': ':.1%'}
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                st.caption("Each point covers every assessment recorded in its window, including re-assessments. "
+                           "Age group and gender filters do not apply to trends.")
+
+    st.header("What-If Weight Tuning")
+    if st.toggle("Explore alternative weights", value=False):
+        whatif_model = st.session_state.whatif_model
+        st.markdown("Adjust the factor weights and amplification multiplier to see how the filtered population's scores would shift.")
+        weight_columns = st.columns(len(whatif_model.labels))
+        whatif_weights = {
+            label: column.slider(label, min_value=0.0, max_value=1.0, value=float(weight), step=0.05, key=f"whatif_weight_{label}")
+            for column, (label, weight) in zip(weight_columns, whatif_model.baseline_weights.items())
+        }
+        whatif_factor = st.slider(
+            "Risk amplification multiplier", min_value=1.0, max_value=2.0,
+            value=float(scoring_config.amplification_factor), step=0.05, key="whatif_amplification"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Weights sum to {sum(whatif_weights.values()):.2f} (profile: {sum(whatif_model.baseline_weights.values()):.2f}).")
+
+        with stage('whatif'):
+            scenario = whatif_model.compare(whatif_weights, whatif_factor)
+            m1, m2, m3, m4 = st.columns(4)
+            for column, label, key in ((m1, "Mean Score", 'mean'), (m2, "Median Score", 'median'), (m3, "90th Percentile", 'p90')):
+                column.metric(label, f"{scenario['after'][key]:.2f}", delta=f"{scenario['after'][key] - scenario['before'][key]:+.2f}")
+            m4.metric("Patients Affected", f"{scenario['changed']:,}", delta=f"{scenario['mean_change']:+.2f} avg", delta_color="off")
+
+            # Histogram counts rather than raw scores keep the chart small for any population size
+            bin_centers = (scenario['bins'][:-1] + scenario['bins'][1:]) / 2
+            fig = go.Figure([
+                go.Bar(x=bin_centers, y=scenario['before']['counts'], name="Current weights", marker_color='royalblue', opacity=0.6),
+                go.Bar(x=bin_centers, y=scenario['after']['counts'], name="What-if weights", marker_color='crimson', opacity=0.6),
+            ])
+            fig.update_layout(
+                barmode='overlay', bargap=0, title="MHABI Score Distribution: Current vs. What-If",
+                xaxis_title="MHABI Score", yaxis_title="Patients"
+            )
+            st.plotly_chart(fig, use_container_width=True)
 
     st.header("Patient-Level Data")
     st.markdown("Rows for patients with **amplified risk** are highlighted in red.")
-    display_cols = ['patient_id', 'region', 'age_group', 'gender', 'mhabi_score', 'risk_amplified']
-    st.dataframe(
-        filtered_df[display_cols].style.apply(highlight_amplified, axis=1),
-        use_container_width=True
-    )
+    patient_table = st.session_state.patient_table
+    patient_index = st.session_state.patient_index
+
+    with stage('patient_table'):
+        c1, c2, c3, c4 = st.columns(4)
+        sort_by = c1.selectbox("Sort by", options=display_cols, index=display_cols.index('mhabi_score'))
+        descending = c2.radio("Order", options=["Descending", "Ascending"], horizontal=True) == "Descending"
+        page_size = c3.selectbox("Rows per page", options=PAGE_SIZES, index=1)
+        page_number = c4.number_input("Page", min_value=1, max_value=patient_table.page_count(page_size), value=1, step=1)
+        first_row = (page_number - 1) * page_size
+        st.caption(f"Showing patients {first_row + 1:,}-{min(first_row + page_size, len(patient_table)):,} of {len(patient_table):,}")
+        st.dataframe(
+            patient_table.styled_page(page_number, page_size, sort_by, descending),
+            use_container_width=True, hide_index=True
+        )
 
     st.header("Diagnostic Sub-Score Drill-Down")
-    patient_list = filtered_df['patient_id'].tolist()
-    selected_patient_id = st.selectbox("Select a Patient ID for a detailed view of their score components:", options=patient_list)
-    if selected_patient_id:
-        patient_details = filtered_df[filtered_df['patient_id'] == selected_patient_id].iloc[0]
-        st.subheader(f"Contributing Factors for Patient {selected_patient_id}")
-        norm_scores = patient_details['normalized_scores']
-        df_scores = pd.DataFrame(list(norm_scores.items()), columns=['Factor', 'Normalized Score'])
-        fig_sub_scores = px.bar(
-            df_scores, x='Normalized Score', y='Factor', orientation='h', title=f"Diagnostic Sub-Scores for {selected_patient_id}",
-            color='Normalized Score', color_continuous_scale=px.colors.sequential.Reds
+    # Typeahead over the patient index: only the top matches are sent to the selectbox
+    with stage('drill_down'):
+        search_prefix = st.text_input("Search Patient ID", placeholder="Start typing an ID, e.g. P01")
+        matches = patient_index.search(search_prefix)
+        if not matches:
+            st.info(f"No patient ID starts with '{search_prefix}'.")
+        selected_patient_id = st.selectbox(
+            "Select a Patient ID for a detailed view of their score components:", options=matches,
+            help=f"Showing the first {len(matches)} matching IDs of {len(patient_index):,} patients."
         )
-        fig_sub_scores.update_layout(xaxis_title="Normalized Score (0-100)", yaxis_title="Component")
-        st.plotly_chart(fig_sub_scores, use_container_width=True)
-        if patient_details['risk_amplified']:
-            st.warning(f"**Risk Amplified:** This patient's score was increased by 10% due to high suicide risk (Score: {patient_details['suicide_risk_score']}) and ER visits (Count: {patient_details['er_visits_last_year']}).")
-        else:
-            st.info("Risk was not amplified for this patient.")
+        if selected_patient_id:
+            patient_details = patient_index.get(selected_patient_id)
+            st.subheader(f"Contributing Factors for Patient {selected_patient_id}")
+            norm_scores = patient_index.sub_scores(selected_patient_id)
+            df_scores = pd.DataFrame(list(norm_scores.items()), columns=['Factor', 'Normalized Score'])
+            fig_sub_scores = px.bar(
+                df_scores, x='Normalized Score', y='Factor', orientation='h', title=f"Diagnostic Sub-Scores for {selected_patient_id}",
+                color='Normalized Score', color_continuous_scale=px.colors.sequential.Reds
+            )
+            fig_sub_scores.update_layout(xaxis_title="Normalized Score (0-100)", yaxis_title="Component")
+            st.plotly_chart(fig_sub_scores, use_container_width=True)
+            if patient_details['risk_amplified']:
+                st.warning(f"**Risk Amplified:** This patient's score was increased by {scoring_config.amplification_factor - 1:.0%} due to high suicide risk (Score: {patient_details['suicide_risk_score']}) and ER visits (Count: {patient_details['er_visits_last_year']}).")
+            else:
+                st.info("Risk was not amplified for this patient.")
 
+# --- Performance Panel & Metrics Export ---
+if recorder.enabled:
+    if METRICS_LOG_PATH:
+        recorder.write_jsonl(METRICS_LOG_PATH)
+    if METRICS_FILE_PATH:
+        recorder.write_openmetrics(METRICS_FILE_PATH)
+    if show_performance:
+        st.sidebar.header("Performance")
+        stage_summary = pd.DataFrame([
+            {
+                'Stage': total['stage'] + (f" ({', '.join(map(str, total['labels'].values()))})" if total['labels'] else ''),
+                'Calls': total['calls'],
+                'Time (ms)': round(total['seconds'] * 1000, 1),
+                'RSS change (MiB)': round(total['rss_delta_bytes'] / 2 ** 20, 1),
+            }
+            for total in recorder.summary()
+        ])
+        st.sidebar.dataframe(stage_summary, hide_index=True, use_container_width=True)
+        st.sidebar.caption("Nested stages (e.g. process_dataframe inside load_scored_data) also count toward their parent.")
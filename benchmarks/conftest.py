@@ -0,0 +1,114 @@
+"""
+pytest-benchmark fixtures for the hot-path suite in `benchmarks/test_hot_paths.py`.
+
+Usage:
+    python -m pytest benchmarks --sizes 1k,100k,1m --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20% --memory-tolerance 0.2
+
+Every benchmark runs once per size in --sizes against a seeded synthetic EMR
+frame (`benchmarks/synthetic.py`). Besides pytest-benchmark's timings, each one
+records rows/s throughput and tracemalloc peak memory in the saved run's
+`extra_info`; --memory-tolerance fails a benchmark whose peak memory grew by
+more than that fraction since the most recent saved run.
+"""
+import glob
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import generate_emr  # noqa: E402
+from src.mhabi_algorithm import process_dataframe  # noqa: E402
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+DEFAULT_SIZES = '1k,10k'
+
+# Peak memory changes smaller than this are allocator noise, not regressions
+MEMORY_NOISE_BYTES = 1 << 20
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mhabi benchmarks')
+    group.addoption('--sizes', default=DEFAULT_SIZES,
+                    help=f"Comma-separated synthetic population sizes from {', '.join(SIZES)}.")
+    group.addoption('--memory-tolerance', type=float, default=None,
+                    help="Fail when peak memory grew by more than this fraction since the last saved run.")
+
+
+def pytest_generate_tests(metafunc):
+    if 'size' in metafunc.fixturenames:
+        sizes = metafunc.config.getoption('sizes').split(',')
+        unknown = [size for size in sizes if size not in SIZES]
+        if unknown:
+            raise pytest.UsageError(f"Unknown benchmark size: {', '.join(unknown)}")
+        metafunc.parametrize('size', sizes, scope='session')
+
+
+# --- Data ---
+@pytest.fixture(scope='session')
+def emr(size):
+    """The synthetic EMR frame for the current size, generated once per session."""
+    return generate_emr(SIZES[size])
+
+
+@pytest.fixture(scope='session')
+def scored(emr):
+    """`emr` scored with the default profile, for the filtering and aggregation benchmarks."""
+    return process_dataframe(emr)
+
+
+# --- Measurement ---
+def _saved_peaks(config):
+    """Peak memory per benchmark from the most recent run saved under --benchmark-storage."""
+    storage = config.getoption('benchmark_storage')
+    if not storage.startswith('file://'):
+        return {}
+    paths = glob.glob(os.path.join(storage[len('file://'):], '*', '*.json'))
+    if not paths:
+        return {}
+    with open(max(paths, key=os.path.basename)) as f:
+        saved = json.load(f)
+    return {bench['fullname']: bench['extra_info'].get('peak_bytes') for bench in saved['benchmarks']}
+
+
+@pytest.fixture(scope='session')
+def saved_peaks(request):
+    return _saved_peaks(request.config)
+
+
+@pytest.fixture
+def measure(benchmark, request, saved_peaks):
+    """
+    Benchmarks a callable and records its throughput and peak memory.
+
+    Returns:
+        callable: `measure(rows, func)` times `func` with pytest-benchmark, then
+        runs it once more under tracemalloc (tracing slows the code under test,
+        so it is kept out of the timed rounds) and returns the timed result.
+    """
+    def run(rows, func):
+        result = benchmark(func)
+        if benchmark.disabled:
+            return result
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info.update(rows=rows, peak_bytes=peak, rows_per_second=rows / benchmark.stats.stats.min)
+
+        tolerance = request.config.getoption('memory_tolerance')
+        before = saved_peaks.get(request.node.nodeid)
+        if tolerance is not None and before:
+            growth = peak - before
+            assert growth <= MEMORY_NOISE_BYTES or peak <= before * (1 + tolerance), (
+                f"peak memory {before / 2 ** 20:.1f} -> {peak / 2 ** 20:.1f} MiB")
+        return result
+    return run
@@ -0,0 +1,95 @@
+"""
+Startup import-time check for the core package.
+
+Usage:
+    python benchmarks/import_time.py [--budget 1.5] [--repeat 5]
+
+Imports each core module in a fresh interpreter, reports the best wall time,
+and exits non-zero if a module pulls in a UI library (Streamlit, Plotly) or
+takes longer than the budget. Run it before merging changes to `src/`.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = [
+    'src.mhabi_algorithm',
+    'src.parallel',
+    'src.scoring_config',
+    'src.ingest',
+    'src.storage',
+    'src.patient_store',
+    'src.materialize',
+    'src.cube',
+    'src.compact',
+    'src.history',
+    'src.bulk_import',
+    'src.cache',
+    'src.instrumentation',
+    'src.data_loader',
+    'src.population',
+    'src.score',
+    'src.service',
+]
+
+# Modules that must never be imported by the core package
+FORBIDDEN_MODULES = ['streamlit', 'plotly']
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'modules': sorted(m for m in {forbidden!r} if m in sys.modules)}}))
+"""
+
+
+def measure(module, repeat=5):
+    """
+    Imports a module in fresh interpreters.
+
+    Returns:
+        dict: 'seconds' (best of `repeat` runs) and 'forbidden' (UI modules it imported).
+    """
+    best, forbidden = None, []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result['seconds'] if best is None else min(best, result['seconds'])
+        forbidden = result['modules']
+    return {'seconds': best, 'forbidden': forbidden}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that core modules import quickly and without UI libraries.")
+    parser.add_argument('--budget', type=float, default=1.5, help="Maximum import time per module in seconds.")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per module (best time is kept).")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in CORE_MODULES:
+        result = measure(module, args.repeat)
+        status = 'ok'
+        if result['forbidden']:
+            status = f"imports {', '.join(result['forbidden'])}"
+        elif result['seconds'] > args.budget:
+            status = 'over budget'
+        if status != 'ok':
+            failures.append(module)
+        print(f"{module:<24} {result['seconds'] * 1000:8.1f} ms  {status}")
+
+    if failures:
+        print(f"\n{len(failures)} module(s) failed the import check.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
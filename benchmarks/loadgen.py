@@ -0,0 +1,141 @@
+"""
+Local load generator for the scoring service (`src.service`).
+
+Usage:
+    python benchmarks/loadgen.py --spawn --concurrency 64 --requests 20000
+    python benchmarks/loadgen.py --port 8080 --bulk 1000 --requests 200
+
+With --spawn the service is started in-process on a free port, so no other
+process is needed. Each client keeps one HTTP/1.1 connection open and sends
+requests back to back. The script reports throughput, client-side p50/p99
+latency and the server's own /metrics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scoring_config import DEFAULT_CONFIG_PATH, load_scoring_config  # noqa: E402
+from src.service import ScoringService  # noqa: E402
+
+
+def synthetic_patients(n, seed=0):
+    """Random patient payloads covering every scoring tier."""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'wait_time_days': rng.integers(0, 120, n),
+        'dalys': rng.uniform(0, 0.5, n).round(2),
+        'er_visits_last_year': rng.integers(0, 5, n),
+        'missed_work_school_days': rng.integers(0, 30, n),
+        'suicide_risk_score': rng.integers(1, 11, n),
+    }
+    values = {column: array.tolist() for column, array in columns.items()}
+    return [
+        {'patient_id': f"L{i:07d}", **{column: values[column][i] for column in columns}}
+        for i in range(n)
+    ]
+
+
+async def _request(reader, writer, method, path, body=b'', content_type='application/json'):
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host, port, payloads, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path, body, content_type in payloads:
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, 'POST', path, body, content_type)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, requests, bulk, ndjson):
+    patients = synthetic_patients(max(requests * bulk, 1))
+    if bulk == 1:
+        payloads = [('/score', json.dumps(patient).encode(), 'application/json') for patient in patients[:requests]]
+    elif ndjson:
+        payloads = [
+            ('/score/batch', b'\n'.join(json.dumps(p).encode() for p in patients[i * bulk:(i + 1) * bulk]),
+             'application/x-ndjson')
+            for i in range(requests)
+        ]
+    else:
+        payloads = [
+            ('/score/batch', json.dumps(patients[i * bulk:(i + 1) * bulk]).encode(), 'application/json')
+            for i in range(requests)
+        ]
+
+    latencies, failures = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, payloads[i::concurrency], latencies, failures) for i in range(concurrency)
+    ))
+    seconds = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await _request(reader, writer, 'GET', '/metrics')
+    writer.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{len(latencies):,} requests ({len(latencies) * bulk:,} patients) in {seconds:.2f}s, "
+          f"{len(failures)} failed")
+    print(f"throughput: {len(latencies) / seconds:,.0f} req/s, {len(latencies) * bulk / seconds:,.0f} patients/s")
+    print(f"client latency: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"server metrics: {json.dumps(json.loads(metrics), indent=2)}")
+    return 1 if failures else 0
+
+
+async def _spawn_and_run(args):
+    service = ScoringService(load_scoring_config(args.profile), args.max_batch, args.max_delay_ms / 1000)
+    await service.start('127.0.0.1', 0)
+    try:
+        return await run('127.0.0.1', service.port, args.concurrency, args.requests, args.bulk, args.ndjson)
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against the MHABI scoring service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--spawn', action='store_true', help="Start the service in-process on a free port.")
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent client connections.")
+    parser.add_argument('--requests', type=int, default=5000, help="Total requests to send.")
+    parser.add_argument('--bulk', type=int, default=1, help="Patients per request (>1 uses /score/batch).")
+    parser.add_argument('--ndjson', action='store_true', help="Send bulk payloads as NDJSON.")
+    parser.add_argument('--profile', default=DEFAULT_CONFIG_PATH, help="Scoring profile for --spawn.")
+    parser.add_argument('--max-batch', type=int, default=512, help="Micro-batch size for --spawn.")
+    parser.add_argument('--max-delay-ms', type=float, default=2.0, help="Micro-batch delay for --spawn.")
+    args = parser.parse_args(argv)
+
+    if args.spawn:
+        return asyncio.run(_spawn_and_run(args))
+    return asyncio.run(run(args.host, args.port, args.concurrency, args.requests, args.bulk, args.ndjson))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
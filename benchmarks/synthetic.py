@@ -0,0 +1,74 @@
+"""
+Synthetic EMR extracts for benchmarks and load tests.
+
+Usage:
+    python benchmarks/synthetic.py 1000000 data/synthetic_1m.csv [--seed 0]
+
+Generated frames have exactly the columns `load_emr_data` requires
+(`src.ingest.REQUIRED_COLUMNS`) with value ranges that exercise every scoring
+tier and the risk amplification rule.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ingest import REQUIRED_COLUMNS  # noqa: E402
+
+REGIONS = ['North', 'South', 'East', 'West']
+AGE_GROUPS = ['18-24', '25-34', '35-44', '45-54', '55+']
+GENDERS = ['Female', 'Male', 'Non-binary']
+
+
+def generate_emr(n, seed=0, start_id=1):
+    """
+    Generates `n` synthetic patient records.
+
+    Args:
+        n (int): Number of records.
+        seed (int): Random seed; the same seed always yields the same frame.
+        start_id (int): Number of the first patient ID (P001, P002, ...).
+
+    Returns:
+        pd.DataFrame: Records with the REQUIRED_COLUMNS columns.
+    """
+    rng = np.random.default_rng(seed)
+    numbers = pd.Series(np.arange(start_id, start_id + n)).astype(str).str.zfill(3)
+    df = pd.DataFrame({
+        'patient_id': 'P' + numbers,
+        'region': np.asarray(REGIONS)[rng.integers(0, len(REGIONS), n)],
+        'age_group': np.asarray(AGE_GROUPS)[rng.integers(0, len(AGE_GROUPS), n)],
+        'gender': np.asarray(GENDERS)[rng.integers(0, len(GENDERS), n)],
+        'wait_time_days': rng.integers(0, 180, n),
+        'dalys': rng.uniform(0, 0.5, n).round(2),
+        'er_visits_last_year': rng.integers(0, 6, n),
+        'missed_work_school_days': rng.integers(0, 40, n),
+        'suicide_risk_score': rng.integers(1, 11, n),
+    })
+    return df[REQUIRED_COLUMNS]
+
+
+def write_emr_csv(path, n, seed=0, chunksize=1_000_000):
+    """Writes `n` synthetic records to a CSV file in chunks so memory stays bounded."""
+    for start in range(0, n, chunksize):
+        chunk = generate_emr(min(chunksize, n - start), seed=seed + start, start_id=start + 1)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic EMR extract to CSV.")
+    parser.add_argument('rows', type=int, help="Number of patient records.")
+    parser.add_argument('output_path', help="Destination CSV file.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+    args = parser.parse_args(argv)
+    write_emr_csv(args.output_path, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} records to {args.output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Benchmarks for the scoring, loading, filtering and aggregation hot paths.
+
+Run with `python -m pytest benchmarks`; see `benchmarks/conftest.py` for the
+size, history and regression options.
+"""
+import os
+
+from src.cube import AggregateCube
+from src.data_loader import load_emr_data
+from src.mhabi_algorithm import calculate_mhabi, process_dataframe
+from src.storage import apply_filters
+
+# The row-at-a-time scorer is timed on a sample; its throughput does not depend on population size
+SCALAR_SAMPLE_ROWS = 20_000
+
+# A typical sidebar selection: two regions, three age groups, every gender
+BENCHMARK_FILTERS = {'region': ('North', 'East'), 'age_group': ('18-24', '25-34', '35-44'), 'gender': None}
+
+
+def test_calculate_mhabi(measure, emr):
+    records = emr.head(SCALAR_SAMPLE_ROWS).to_dict('records')
+    measure(len(records), lambda: [calculate_mhabi(record) for record in records])
+
+
+def test_process_dataframe(measure, emr):
+    measure(len(emr), lambda: process_dataframe(emr))
+
+
+def test_process_dataframe_parallel(measure, emr):
+    measure(len(emr), lambda: process_dataframe(emr, parallel=True))
+
+
+def test_csv_load(measure, emr, tmp_path):
+    path = os.path.join(tmp_path, 'emr.csv')
+    emr.to_csv(path, index=False)
+
+    def load():
+        load_emr_data.clear()
+        return load_emr_data(path)
+    assert len(measure(len(emr), load)) == len(emr)
+
+
+def test_filtering(measure, scored):
+    measure(len(scored), lambda: apply_filters(scored, BENCHMARK_FILTERS))
+
+
+def test_aggregation(measure, scored):
+    measure(len(scored), lambda: AggregateCube.from_frame(scored).query(BENCHMARK_FILTERS).by('region'))
@@ -3,33 +3,113 @@ import pandas as pd
 import os
 import plotly.express as px
 
-from src.data_loader import load_emr_data
-from src.mhabi_algorithm import calculate_mhabi
+from src.bulk_import import AGE_GROUPS, GENDERS, REGIONS, UPLOAD_TYPES, BulkImportError, import_records, read_upload
+from src.cache import use_streamlit_cache
+from src.data_loader import DEFAULT_DATA_PATH, get_store, load_emr_data, load_filter_options
+from src.ingest import REQUIRED_COLUMNS
+from src.patient_store import DuplicatePatientError
+from src.mhabi_algorithm import process_dataframe, normalized_scores_from_row
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Add & Assess Patient", page_icon="➕")
 
+# Share loader caches across sessions and pages
+use_streamlit_cache()
+
 # --- Constants ---
-DATA_FILE_PATH = 'data/sample_emr_data.csv'
+# A SQLite patient database, CSV file or partitioned Parquet dataset directory
+DATA_FILE_PATH = os.environ.get('MHABI_DATA_PATH', DEFAULT_DATA_PATH)
+# Rejected rows shown on the page; the download holds all of them
+REJECTED_PREVIEW_ROWS = 1000
 
-# Initialize session state to hold the single patient report
+# Initialize session state to hold the single patient report and the last bulk import summary
 if 'new_patient_report' not in st.session_state:
     st.session_state.new_patient_report = None
+if 'bulk_import_result' not in st.session_state:
+    st.session_state.bulk_import_result = None
 
 def reset_form():
     """Resets the session state to show the form again."""
     st.session_state.new_patient_report = None
 
+def keeps_history(store):
+    """True for stores that log every assessment, so a known patient ID records a re-assessment."""
+    return hasattr(store, 'save_assessments')
+
+def render_bulk_import(store):
+    """Upload form for CSV/Parquet files and the summary of the last import."""
+    columns = "Upload a CSV or Parquet file with the columns `" + "`, `".join(REQUIRED_COLUMNS) + "`. "
+    if keeps_history(store):
+        st.markdown(
+            columns + "Valid rows are scored and saved in one batch. Rows for existing patient IDs are recorded "
+            "as new assessments; add an optional `assessed_at` column to backfill past assessments. "
+            "Rows that fail validation are listed below instead of being saved."
+        )
+    else:
+        st.markdown(
+            columns + "Valid rows are scored and saved in one batch; rows that fail validation or reuse an "
+            "existing patient ID are listed below instead of being saved."
+        )
+    uploaded = st.file_uploader("Patient file", type=UPLOAD_TYPES)
+    if st.button("Validate & Import", disabled=uploaded is None):
+        progress_bar = st.progress(0.0, text="Reading file")
+        try:
+            upload = read_upload(uploaded, uploaded.name)
+            result = import_records(store, upload, progress=lambda fraction, message: progress_bar.progress(fraction, text=message))
+        except BulkImportError as e:
+            st.error(str(e))
+            st.stop()
+        except Exception as e:
+            st.error(f"Failed to import patient records: {e}")
+            st.stop()
+        if result['inserted']:
+            load_emr_data.clear()
+            load_filter_options.clear()
+        st.session_state.bulk_import_result = {'file': uploaded.name, **result}
+
+    result = st.session_state.bulk_import_result
+    if result is None:
+        return
+    st.subheader(f"Import Summary: {result['file']}")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Records Imported", f"{result['inserted']:,}",
+              delta=f"{result['reassessed']:,} re-assessments" if result['reassessed'] else None, delta_color="off")
+    c2.metric("Rows Rejected", f"{len(result['rejected']):,}")
+    c3.metric("Import Time", f"{result['seconds']:.2f}s")
+
+    scored = result['scored']
+    if len(scored):
+        c4, c5 = st.columns(2)
+        c4.metric("Mean MHABI Score", f"{scored['mhabi_score'].mean():.2f}")
+        c5.metric("Risk Amplified", f"{int(scored['risk_amplified'].sum()):,}")
+        st.success(f"{result['inserted']:,} patient records were scored and saved to the dataset.")
+
+    rejected = result['rejected']
+    if len(rejected):
+        st.warning(f"{len(rejected):,} rows were not imported.")
+        st.dataframe(rejected.head(REJECTED_PREVIEW_ROWS), hide_index=True, use_container_width=True)
+        if len(rejected) > REJECTED_PREVIEW_ROWS:
+            st.caption(f"Showing the first {REJECTED_PREVIEW_ROWS:,} rejected rows; download the file for all of them.")
+        st.download_button(
+            "📥 Download Rejected Rows", rejected.to_csv(index=False).encode('utf-8'),
+            file_name='rejected_rows.csv', mime='text/csv'
+        )
+
 # --- Main Page Logic ---
 st.title("➕ Add & Assess New Patient")
 
+store = get_store(DATA_FILE_PATH)
+
 # --- STATE 2: Display the Patient Report ---
 if st.session_state.new_patient_report:
     report = st.session_state.new_patient_report
     patient_id = report['patient_id']
     
     st.header(f"Patient Report: {patient_id}")
-    st.success("Patient record has been calculated and saved to the dataset.")
+    if report.get('reassessment'):
+        st.success("A new assessment has been calculated and added to this patient's history.")
+    else:
+        st.success("Patient record has been calculated and saved to the dataset.")
     
     c1, c2, c3 = st.columns(3)
     c1.metric(label="Calculated MHABI Score", value=f"{report['mhabi_score']:.2f}")
@@ -37,7 +117,7 @@ if st.session_state.new_patient_report:
     c3.metric(label="Risk Amplified?", value="✔️ Yes" if report['risk_amplified'] else "❌ No")
 
     st.subheader("Diagnostic Sub-Score Breakdown")
-    norm_scores = report['normalized_scores']
+    norm_scores = normalized_scores_from_row(report)
     df_scores = pd.DataFrame(list(norm_scores.items()), columns=['Factor', 'Normalized Score'])
     fig_sub_scores = px.bar(
         df_scores, x='Normalized Score', y='Factor', orientation='h',
@@ -47,68 +127,110 @@ if st.session_state.new_patient_report:
     fig_sub_scores.update_layout(xaxis_title="Normalized Score (0-100)", yaxis_title="Component")
     st.plotly_chart(fig_sub_scores, use_container_width=True)
 
+    if keeps_history(store):
+        history = process_dataframe(store.assessments(patient_id))
+        if len(history) > 1:
+            st.subheader("Assessment History")
+            history['assessed_at'] = pd.to_datetime(history['assessed_at'])
+            fig_history = px.line(
+                history, x='assessed_at', y='mhabi_score', markers=True, title=f"MHABI Score over Time for {patient_id}",
+                hover_data=['suicide_risk_score', 'risk_amplified']
+            )
+            fig_history.update_layout(xaxis_title="Assessed At (UTC)", yaxis_title="MHABI Score")
+            st.plotly_chart(fig_history, use_container_width=True)
+
     st.button("Add Another Patient", on_click=reset_form)
 
 # --- STATE 1: Display the Input Form ---
 else:
-    st.markdown("Use this form to enter a patient's details and a clinically assessed suicide risk score.")
-    
-    existing_data = load_emr_data(DATA_FILE_PATH)
-    
-    with st.form(key="new_patient_form"):
-        st.subheader("Enter Patient Details")
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            if not existing_data.empty:
-                last_id = existing_data['patient_id'].str.extract(r'(\d+)').astype(int).max().values[0]
-                suggested_id = f"P{last_id + 1:03d}"
-            else:
-                suggested_id = "P001"
-            patient_id = st.text_input("Patient ID", value=suggested_id)
-            region = st.selectbox("Region", options=["North", "South", "East", "West"])
+    mode = st.radio("Mode", ["Single Patient", "Bulk Import"], horizontal=True, label_visibility="collapsed")
+
+    if mode == "Bulk Import":
+        render_bulk_import(store)
+    else:
+        st.markdown("Use this form to enter a patient's details and a clinically assessed suicide risk score.")
+        # Re-assessing is chosen explicitly, so a mistyped or stale ID never merges a new patient into an existing one
+        reassessing = keeps_history(store) and st.radio(
+            "Patient", ["New patient", "Re-assess existing patient"], horizontal=True,
+            help="A re-assessment adds to an existing patient's history and updates their current record."
+        ) == "Re-assess existing patient"
+
+        with st.form(key="new_patient_form"):
+            st.subheader("Enter Patient Details")
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                if reassessing:
+                    patient_id = st.text_input("Existing Patient ID")
+                else:
+                    patient_id = st.text_input(
+                        "Patient ID", placeholder=f"Blank for the next free ID ({store.next_patient_id()})",
+                        help="Leave blank to assign the next free ID when the record is saved."
+                    )
+                region = st.selectbox("Region", options=REGIONS)
             
-        with c2:
-            age_group = st.selectbox("Age Group", options=["18-24", "25-34", "35-44", "45-54", "55+"])
-            gender = st.selectbox("Gender", options=["Female", "Male", "Non-binary"])
+            with c2:
+                age_group = st.selectbox("Age Group", options=AGE_GROUPS)
+                gender = st.selectbox("Gender", options=GENDERS)
             
-        with c3:
-            wait_time_days = st.number_input("Wait Time (days)", min_value=0, step=1)
-            dalys = st.number_input("DALYs Score", min_value=0.0, format="%.2f", step=0.01)
+            with c3:
+                wait_time_days = st.number_input("Wait Time (days)", min_value=0, step=1)
+                dalys = st.number_input("DALYs Score", min_value=0.0, format="%.2f", step=0.01)
             
-        st.divider()
-        c4, c5 = st.columns(2)
-        with c4:
-            er_visits_last_year = st.number_input("ER Visits (last year)", min_value=0, step=1)
-            missed_work_school_days = st.number_input("Missed Work/School (days)", min_value=0, step=1)
-        with c5:
-            # Re-introducing the manual suicide risk score slider
-            suicide_risk_score = st.slider("Clinician Assessed Suicide Risk Score", min_value=1, max_value=10, value=5, step=1)
-
-        submitted = st.form_submit_button("Calculate & View Patient Report")
-
-        if submitted:
-            if not existing_data.empty and patient_id in existing_data['patient_id'].values:
-                st.error(f"Patient ID '{patient_id}' already exists. Please use a unique ID.")
-            else:
-                # This dictionary now contains all the raw data needed for calculation and saving
-                new_patient_input = {
-                    'patient_id': patient_id, 'region': region, 'age_group': age_group, 'gender': gender,
-                    'wait_time_days': wait_time_days, 'dalys': dalys, 'er_visits_last_year': er_visits_last_year,
-                    'missed_work_school_days': missed_work_school_days,
-                    'suicide_risk_score': suicide_risk_score  
-                }
-                
-                mhabi_result = calculate_mhabi(new_patient_input)
+            st.divider()
+            c4, c5 = st.columns(2)
+            with c4:
+                er_visits_last_year = st.number_input("ER Visits (last year)", min_value=0, step=1)
+                missed_work_school_days = st.number_input("Missed Work/School (days)", min_value=0, step=1)
+            with c5:
+                # Re-introducing the manual suicide risk score slider
+                suicide_risk_score = st.slider("Clinician Assessed Suicide Risk Score", min_value=1, max_value=10, value=5, step=1)
+
+            submitted = st.form_submit_button("Calculate & View Patient Report")
+
+            if submitted:
+                patient_id = patient_id.strip()
+                is_existing = bool(patient_id) and store.contains(patient_id)
+                if reassessing and not is_existing:
+                    st.error(f"No patient with ID '{patient_id}' is on file. Choose 'New patient' to add them.")
+                elif is_existing and not reassessing:
+                    hint = " Choose 'Re-assess existing patient' to add an assessment." if keeps_history(store) else ""
+                    st.error(f"Patient ID '{patient_id}' already exists. Please use a unique ID.{hint}")
+                else:
+                    if not patient_id:
+                        # Reserved atomically in a patient database, so concurrent sessions never get the same ID
+                        patient_id = store.reserve_patient_id() if hasattr(store, 'reserve_patient_id') else store.next_patient_id()
+
+                    # This dictionary now contains all the raw data needed for calculation and saving
+                    new_patient_input = {
+                        'patient_id': patient_id, 'region': region, 'age_group': age_group, 'gender': gender,
+                        'wait_time_days': wait_time_days, 'dalys': dalys, 'er_visits_last_year': er_visits_last_year,
+                        'missed_work_school_days': missed_work_school_days,
+                        'suicide_risk_score': suicide_risk_score  
+                    }
                 
-                try:
                     df_to_save = pd.DataFrame([new_patient_input])
-                    df_to_save.to_csv(DATA_FILE_PATH, mode='a', header=not os.path.exists(DATA_FILE_PATH) or os.path.getsize(DATA_FILE_PATH) == 0, index=False)
-                    st.cache_data.clear()
-                except Exception as e:
-                    st.error(f"Failed to write to CSV file: {e}")
-                    st.stop()
+                    scored_patient = process_dataframe(df_to_save).iloc[0]
+                
+                    try:
+                        if reassessing:
+                            # Logs the assessment and updates the patient's current record
+                            store.save_assessments(df_to_save)
+                        else:
+                            # Rejects the record if the ID was taken meanwhile, rather than merging into that patient
+                            store.append(df_to_save)
+                        # Scores for a patient database are picked up incrementally on the dashboard's
+                        # next refresh; only the plain loader caches derived from the store are stale
+                        load_emr_data.clear()
+                        load_filter_options.clear()
+                    except DuplicatePatientError:
+                        # Another session saved this ID after the check above
+                        st.error(f"Patient ID '{patient_id}' already exists. Please use a unique ID.")
+                        st.stop()
+                    except Exception as e:
+                        st.error(f"Failed to save patient record: {e}")
+                        st.stop()
                 
-                # Combine the raw input with the calculated results for the report
-                full_report = {**new_patient_input, **mhabi_result}
-                st.session_state.new_patient_report = full_report
-                st.rerun()
\ No newline at end of file
+                    # Combine the raw input with the calculated results for the report
+                    full_report = {**new_patient_input, **scored_patient.to_dict(), 'reassessment': reassessing}
+                    st.session_state.new_patient_report = full_report
+                    st.rerun()
@@ -0,0 +1,259 @@
+"""
+Bulk import of patient records from uploaded CSV or Parquet files.
+
+An upload is validated with column-wise checks over the whole frame, checked
+for patient IDs repeated within the file or already in the store, scored in a
+single vectorized pass and written in one call (one transaction for a
+patient database). Rows that fail a check are returned with the reason
+instead of aborting the import.
+
+A patient database keeps an assessment history, so there a known patient ID
+records a new assessment instead of being rejected, and an optional
+'assessed_at' column backfills past assessments. Rows repeating an
+assessment already on file, such as a file uploaded twice, are rejected.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.ingest import REQUIRED_COLUMNS
+from src.instrumentation import instrumented
+from src.mhabi_algorithm import process_dataframe
+from src.patient_store import DuplicateAssessmentError, DuplicatePatientError, assessment_times
+
+REGIONS = ['North', 'South', 'East', 'West']
+AGE_GROUPS = ['18-24', '25-34', '35-44', '45-54', '55+']
+GENDERS = ['Female', 'Male', 'Non-binary']
+
+CATEGORY_VALUES = {'region': REGIONS, 'age_group': AGE_GROUPS, 'gender': GENDERS}
+
+# Inclusive (minimum, maximum) bounds, matching the single-patient form; None leaves a side open
+VALUE_RANGES = {
+    'wait_time_days': (0, None),
+    'dalys': (0, None),
+    'er_visits_last_year': (0, None),
+    'missed_work_school_days': (0, None),
+    'suicide_risk_score': (1, 10),
+}
+INTEGER_COLUMNS = ['wait_time_days', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score']
+
+# Backfills past assessments into stores that keep an assessment history
+OPTIONAL_COLUMNS = ['assessed_at']
+
+UPLOAD_TYPES = ['csv', 'parquet']
+
+
+class BulkImportError(ValueError):
+    """Raised when an upload cannot be imported at all (unreadable file or missing columns)."""
+
+
+def read_upload(source, filename):
+    """
+    Reads an uploaded CSV or Parquet file.
+
+    Args:
+        source: A path or binary file-like object.
+        filename (str): The file's name; its extension selects the format.
+
+    Returns:
+        pd.DataFrame: The uploaded records, with text columns read as strings.
+
+    Raises:
+        BulkImportError: If the format is unsupported, the file cannot be
+            parsed or required columns are missing.
+    """
+    extension = filename.lower().rsplit('.', 1)[-1]
+    if extension not in UPLOAD_TYPES:
+        raise BulkImportError(f"Unsupported file type '.{extension}'. Upload a CSV or Parquet file.")
+    try:
+        if extension == 'csv':
+            text_columns = ['patient_id', *CATEGORY_VALUES]
+            df = pd.read_csv(source, dtype={column: str for column in text_columns})
+        else:
+            df = pd.read_parquet(source)
+    except ImportError as e:
+        raise BulkImportError(f"Reading Parquet files requires pyarrow: {e}") from e
+    except (ValueError, OSError, pd.errors.ParserError) as e:
+        raise BulkImportError(f"Could not read {filename}: {e}") from e
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise BulkImportError(f"File is missing required columns: {', '.join(missing)}")
+    return df
+
+
+def _upload_columns(df):
+    """The required columns plus the optional 'assessed_at' column, if the upload has it."""
+    return REQUIRED_COLUMNS + [column for column in OPTIONAL_COLUMNS if column in df.columns]
+
+
+def _rejected(df, index, reasons):
+    """Returns the given rows as uploaded, numbered from 1 in file order, with a 'reason' column."""
+    rows = df.loc[index, _upload_columns(df)].copy()
+    rows.insert(0, 'row', df.index.get_indexer(index) + 1)
+    rows['reason'] = reasons
+    return rows.reset_index(drop=True)
+
+
+def validate_records(df, history=False):
+    """
+    Checks every row of an upload against the patient schema.
+
+    Each check is one vectorized comparison over a column. A row collects the
+    reasons of every check it fails.
+
+    Args:
+        df (pd.DataFrame): Uploaded records with the REQUIRED_COLUMNS columns,
+            and optionally 'assessed_at'.
+        history (bool): The target store keeps an assessment history, so a
+            patient may appear several times with different 'assessed_at' values.
+
+    Returns:
+        tuple: (valid, rejected). `valid` holds the passing rows with clean
+        dtypes, indexed as in `df`. `rejected` holds the failing rows as
+        uploaded, with their 1-based 'row' number and a 'reason'.
+    """
+    clean = pd.DataFrame(index=df.index)
+    checks = []
+
+    patient_ids = df['patient_id'].astype('string').str.strip()
+    blank = patient_ids.isna() | (patient_ids == '')
+    checks.append((blank, "missing patient ID"))
+    clean['patient_id'] = patient_ids
+
+    if 'assessed_at' in df.columns:
+        assessed_at = pd.to_datetime(df['assessed_at'], errors='coerce', utc=True, format='mixed')
+        checks.append((assessed_at.isna(), "assessed_at is not a valid date"))
+        checks.append((assessed_at > pd.Timestamp.now(tz='UTC'), "assessed_at is in the future"))
+        clean['assessed_at'] = assessed_at
+    if history and 'assessed_at' in df.columns:
+        checks.append((~blank & clean.duplicated(['patient_id', 'assessed_at']), "assessment repeated in file"))
+    else:
+        checks.append((~blank & patient_ids.duplicated(keep='first'), "patient ID repeated in file"))
+
+    for column, allowed in CATEGORY_VALUES.items():
+        values = df[column].astype('string').str.strip()
+        checks.append((~values.isin(allowed).fillna(False).astype(bool), f"{column} must be one of {', '.join(allowed)}"))
+        clean[column] = values
+
+    for column, (minimum, maximum) in VALUE_RANGES.items():
+        values = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        not_number = values.isna()
+        checks.append((not_number, f"{column} is not a number"))
+        if column in INTEGER_COLUMNS:
+            checks.append((~not_number & (values % 1 != 0), f"{column} must be a whole number"))
+        if minimum is not None:
+            checks.append((values < minimum, f"{column} must be at least {minimum}"))
+        if maximum is not None:
+            checks.append((values > maximum, f"{column} must be at most {maximum}"))
+        clean[column] = values
+
+    masks = [mask.to_numpy(dtype=bool) for mask, _ in checks]
+    invalid = np.logical_or.reduce(masks)
+    # Reasons are only assembled for the failing rows, which are usually few
+    reasons = pd.Series('', index=range(int(invalid.sum())), dtype=object)
+    for mask, (_, reason) in zip(masks, checks):
+        failed = mask[invalid]
+        reasons = reasons.mask(failed, reasons + reason + '; ')
+
+    valid = clean[~invalid].astype({column: 'int64' for column in INTEGER_COLUMNS})
+    valid = valid.astype({column: str for column in ['patient_id', *CATEGORY_VALUES]})
+    rejected = _rejected(df, df.index[invalid], reasons.str.rstrip('; ').to_numpy())
+    return valid[_upload_columns(df)], rejected
+
+
+def _drop_ids(df, valid, patient_ids):
+    """Splits rows whose patient ID is already stored out of `valid`; returns (remaining, rejected)."""
+    duplicate = valid['patient_id'].isin(list(patient_ids)).to_numpy()
+    return valid[~duplicate], _rejected(df, valid.index[duplicate], "patient ID already exists")
+
+
+def _assessment_keys(valid):
+    """(patient_id, assessed_at) of each row, with times formatted as in the assessment log."""
+    times, _ = assessment_times(valid)
+    return list(zip(valid['patient_id'].tolist(), times))
+
+
+def _drop_assessments(df, valid, assessments):
+    """Splits rows repeating an already logged assessment out of `valid`; returns (remaining, rejected)."""
+    assessments = set(assessments)
+    recorded = np.array([key in assessments for key in _assessment_keys(valid)], dtype=bool)
+    return valid[~recorded], _rejected(df, valid.index[recorded], "assessment already recorded")
+
+
+@instrumented('bulk_import')
+def import_records(store, df, config=None, progress=None):
+    """
+    Validates, scores and saves an uploaded batch of patient records.
+
+    Args:
+        store: A storage backend (see `src.storage.open_store`).
+        df (pd.DataFrame): Uploaded records (see `read_upload`).
+        config (ScoringConfig, optional): The profile to score with. Defaults
+            to config/scoring/default.toml.
+        progress (callable, optional): Called as progress(fraction, message)
+            as each step starts, and with 1.0 when the import is done.
+
+    Returns:
+        dict: 'inserted' (records saved), 'reassessed' (saved records of
+        patients already on file), 'scored' (the saved records with their
+        scores), 'rejected' (failing rows, see `validate_records`) and 'seconds'.
+    """
+    start = time.perf_counter()
+
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+
+    # Stores with an assessment history record known patients as re-assessments
+    history = hasattr(store, 'save_assessments')
+
+    report(0.0, f"Validating {len(df):,} rows")
+    valid, rejected = validate_records(df, history=history)
+    rejections = [rejected]
+
+    report(0.25, "Checking for existing patient IDs")
+    existing = set()
+    if store.exists() and len(valid):
+        existing = store.existing_ids(valid['patient_id'].tolist())
+        if not history:
+            valid, duplicates = _drop_ids(df, valid, existing)
+            rejections.append(duplicates)
+        elif 'assessed_at' in valid.columns:
+            valid, recorded = _drop_assessments(df, valid, store.existing_assessments(_assessment_keys(valid)))
+            rejections.append(recorded)
+
+    report(0.5, f"Scoring {len(valid):,} records")
+    scored = process_dataframe(valid, config=config)
+
+    report(0.75, f"Saving {len(valid):,} records")
+    while len(valid):
+        try:
+            if history:
+                store.save_assessments(valid)
+            else:
+                store.append(valid[REQUIRED_COLUMNS])
+            break
+        except (DuplicatePatientError, DuplicateAssessmentError) as e:
+            # Another session saved some of these IDs or assessments after the check above.
+            # The batch was rolled back as a whole, so retry without them until it goes in.
+            if isinstance(e, DuplicateAssessmentError):
+                valid, duplicates = _drop_assessments(df, valid, e.assessments)
+            else:
+                valid, duplicates = _drop_ids(df, valid, e.patient_ids)
+            if duplicates.empty:
+                raise
+            rejections.append(duplicates)
+    # process_dataframe keeps the input index, so the saved rows select their own scores
+    scored = scored.loc[valid.index]
+    reassessed = int(valid['patient_id'].isin(list(existing)).sum()) if history else 0
+
+    report(1.0, f"Imported {len(valid):,} records")
+    return {
+        'inserted': len(valid),
+        'reassessed': reassessed,
+        'scored': scored.reset_index(drop=True),
+        'rejected': pd.concat(rejections, ignore_index=True),
+        'seconds': time.perf_counter() - start,
+    }
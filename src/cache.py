@@ -0,0 +1,223 @@
+"""
+Pluggable caching for the data-loading functions in `src.data_loader`.
+
+The core package must not depend on Streamlit, so loaders are decorated with
+`cache_data` / `cache_resource` from this module instead of the `st.cache_*`
+decorators. Which backend actually memoizes them is chosen at runtime:
+
+    from src.cache import use_streamlit_cache
+    use_streamlit_cache()
+
+`cache_data` results are plain values that may be copied or persisted (LRU,
+on-disk or Streamlit's cache_data); every caller gets its own copy, so
+changing a returned frame never changes what later callers see. Under pandas
+Copy-on-Write that copy is shallow, so a cache hit does not copy the data. Their keys
+include the size and modification time of any argument naming an existing
+file or directory, so editing a source file invalidates its entries.
+`cache_resource` results are shared live objects such as database handles
+and must stay in-process.
+"""
+import collections
+import copy
+import functools
+import hashlib
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+
+def make_key(args, kwargs):
+    """Builds a stable cache key from call arguments (which must be picklable)."""
+    payload = pickle.dumps((args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _path_fingerprint(path):
+    if os.path.isdir(path):
+        # Appends add files to (partition) directories, which updates their modification time
+        return max(os.stat(root).st_mtime_ns for root, _, _ in os.walk(path)), None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def source_fingerprint(args, kwargs):
+    """
+    Fingerprints the files and directories named by call arguments.
+
+    Returns:
+        tuple: (path, modification time, size) for each string argument that
+        names an existing path, in argument order.
+    """
+    fingerprint = []
+    for value in [*args, *(value for _, value in sorted(kwargs.items()))]:
+        if isinstance(value, str) and os.path.exists(value):
+            fingerprint.append((value, *_path_fingerprint(value)))
+    return tuple(fingerprint)
+
+
+class LRUCache:
+    """
+    In-process least-recently-used cache, one bounded table per function.
+
+    Hits return the stored object itself, so `cache_data` hands callers a
+    copy (see `_detached`; the other data backends unpickle a fresh one
+    anyway), while `cache_resource` shares it.
+    """
+
+    shares_values = True
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+
+    def memoize(self, func):
+        entries = collections.OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            with lock:
+                if key in entries:
+                    entries.move_to_end(key)
+                    return entries[key]
+            value = func(*args, **kwargs)
+            with lock:
+                entries[key] = value
+                entries.move_to_end(key)
+                while len(entries) > self.maxsize:
+                    entries.popitem(last=False)
+            return value
+
+        wrapper.clear = entries.clear
+        return wrapper
+
+
+class DiskCache:
+    """Pickles results under a directory so they survive process restarts."""
+
+    def __init__(self, directory='.cache/mhabi'):
+        self.directory = directory
+
+    def memoize(self, func):
+        directory = os.path.join(self.directory, f"{func.__module__}.{func.__qualname__}")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            path = os.path.join(directory, make_key(args, kwargs) + '.pkl')
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                pass
+            value = func(*args, **kwargs)
+            os.makedirs(directory, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            return value
+
+        def clear():
+            if os.path.isdir(directory):
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+
+        wrapper.clear = clear
+        return wrapper
+
+
+class StreamlitCache:
+    """Delegates to st.cache_data or st.cache_resource; Streamlit is imported only when used."""
+
+    def __init__(self, kind='data'):
+        if kind not in ('data', 'resource'):
+            raise ValueError("kind must be 'data' or 'resource'")
+        self.kind = kind
+
+    def memoize(self, func):
+        import streamlit as st
+
+        decorator = st.cache_data if self.kind == 'data' else st.cache_resource
+        return decorator(func)
+
+
+_backends = {'data': LRUCache(), 'resource': LRUCache()}
+
+
+def configure_cache(data=None, resource=None):
+    """Selects the backends used by `cache_data` and `cache_resource` functions."""
+    if data is not None:
+        _backends['data'] = data
+    if resource is not None:
+        _backends['resource'] = resource
+
+
+_streamlit_backends = {}
+
+
+def use_streamlit_cache():
+    """Routes both cache kinds through Streamlit so entries are shared across sessions and pages."""
+    # Reuse one pair of backends across script reruns so each function is wrapped only once
+    if not _streamlit_backends:
+        _streamlit_backends.update(data=StreamlitCache('data'), resource=StreamlitCache('resource'))
+    configure_cache(**_streamlit_backends)
+
+
+# pandas >= 3 always copies on write, so a shallow copy of a frame is independent of it
+COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+
+def _detached(value):
+    """
+    Returns a copy of a cached value that callers may change freely.
+
+    Frames and series are copied shallowly under Copy-on-Write: the copy shares
+    the cached column buffers until either side writes, so a hit costs O(columns)
+    instead of O(rows). Other values (filter options, aggregate cubes) are
+    small and deep-copied.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not COPY_ON_WRITE)
+    return copy.deepcopy(value)
+
+
+def _cached(kind, func):
+    # Memoized wrappers are built lazily, once per backend, so configure_cache()
+    # can run after the decorated functions have been imported.
+    memoized = {}
+    keyed = func
+    if kind == 'data':
+        # Data is keyed on the state of its source files as well as on the arguments
+        @functools.wraps(func)
+        def keyed(fingerprint, *args, **kwargs):
+            return func(*args, **kwargs)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        backend = _backends[kind]
+        if id(backend) not in memoized:
+            memoized[id(backend)] = (backend, backend.memoize(keyed))
+        if kind != 'data':
+            return memoized[id(backend)][1](*args, **kwargs)
+        value = memoized[id(backend)][1](source_fingerprint(args, kwargs), *args, **kwargs)
+        return _detached(value) if getattr(backend, 'shares_values', False) else value
+
+    def clear():
+        for _, memoized_func in memoized.values():
+            memoized_func.clear()
+
+    wrapper.clear = clear
+    return wrapper
+
+
+def cache_data(func):
+    """Caches a function returning plain data with the configured data backend."""
+    return _cached('data', func)
+
+
+def cache_resource(func):
+    """Caches a function returning a shared live object with the configured resource backend."""
+    return _cached('resource', func)
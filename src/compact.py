@@ -0,0 +1,238 @@
+"""
+Compact in-memory representation of patient frames.
+
+`compact_frame` dictionary-encodes the demographic columns and stores the
+count columns in the smallest integer type that holds them. DALYs and MHABI
+scores stay float64: tier edges such as 0.3 and two-decimal scores are not
+exactly representable in float32, so narrowing them could move patients
+across tiers.
+
+`MappedFrameCache` persists compact frames as uncompressed Arrow IPC files and
+maps them back into memory. Numeric and string columns are then views of the
+file, so every session and every dashboard process on a host reads the same
+physical pages from the OS page cache instead of holding a private copy.
+Enable it with `use_mapped_frames(directory)`.
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.storage import FILTER_COLUMNS
+
+# Dictionary-encoded; each holds a handful of distinct values
+CATEGORY_COLUMNS = list(FILTER_COLUMNS)
+# Stored in the smallest integer type that holds their range
+COUNT_COLUMNS = ['wait_time_days', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score']
+
+DEFAULT_FRAME_CACHE_DIR = '.cache/mhabi/frames'
+
+
+def _smallest_int_dtype(values):
+    if len(values) == 0:
+        return np.dtype(np.int8)
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def compact_frame(df):
+    """
+    Converts a patient frame to its compact dtypes.
+
+    Columns that are absent, already compact or not integer-typed (e.g. a
+    count column holding NaN) are left as they are.
+
+    Args:
+        df (pd.DataFrame): Raw or scored patient records.
+
+    Returns:
+        pd.DataFrame: The records with categorical demographics and narrowed
+        integer counts. Other columns are shared with `df`, not copied.
+    """
+    dtypes = {}
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            dtypes[column] = 'category'
+    for column in COUNT_COLUMNS:
+        if column in df.columns and df[column].dtype.kind in 'iu':
+            dtype = _smallest_int_dtype(df[column].to_numpy())
+            if dtype != df[column].dtype:
+                dtypes[column] = dtype
+    return df.astype(dtypes) if dtypes else df
+
+
+def conform(frame, rows):
+    """
+    Makes new rows assignable into, or concatenable onto, a compact frame.
+
+    Categories missing from the frame are added to it and numeric columns are
+    widened on whichever side is narrower (to float64 if either side holds
+    missing counts), so patching never fails on an unseen region or a count
+    that outgrows its dtype.
+
+    Args:
+        frame (pd.DataFrame): A compact frame. It is not modified, so a frame
+            other sessions are reading can be passed safely.
+        rows (pd.DataFrame): Records to merge into `frame`; not modified either.
+
+    Returns:
+        tuple: New (frame, rows) with matching dtypes. Unchanged columns are
+        shared with the inputs, not copied.
+    """
+    # Shallow copies: replacing a column below must not touch the caller's frames
+    frame = frame.copy(deep=False)
+    rows = compact_frame(rows).copy(deep=False)
+    for column in rows.columns.intersection(frame.columns):
+        ours, theirs = frame[column].dtype, rows[column].dtype
+        if isinstance(ours, pd.CategoricalDtype):
+            unseen = [value for value in pd.unique(rows[column].dropna()) if value not in ours.categories]
+            if unseen:
+                # Kept sorted, as astype('category') creates them, so sorting by codes sorts by label
+                frame[column] = frame[column].cat.set_categories(sorted([*ours.categories, *unseen]))
+            rows[column] = rows[column].astype(frame[column].dtype)
+        elif ours.kind in 'iuf' and theirs.kind in 'iuf' and ours != theirs and 'f' in ours.kind + theirs.kind:
+            # A count column with missing values is float64; the frame follows it
+            if ours.kind != 'f':
+                frame[column] = frame[column].astype('float64')
+            rows[column] = rows[column].astype('float64')
+        elif ours.kind in 'iu' and theirs.kind in 'iu' and ours != theirs:
+            target = np.promote_types(ours, theirs)
+            if target != ours:
+                frame[column] = frame[column].astype(target)
+            rows[column] = rows[column].astype(target)
+    return frame, rows
+
+
+# --- Memory-mapped snapshots ---
+def write_frame(df, path):
+    """Writes a frame as an uncompressed Arrow IPC file, atomically."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_mapped_frame(path):
+    """
+    Maps an Arrow IPC file written by `write_frame` into a DataFrame.
+
+    Numeric columns without nulls and string columns reference the mapped
+    file directly and are read-only; categorical codes and booleans are
+    decoded into small private arrays.
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    # split_blocks keeps each column in its own block so pandas does not consolidate (copy) them
+    return table.to_pandas(split_blocks=True)
+
+
+class MappedFrameCache:
+    """
+    Versioned frame snapshots kept as memory-mapped Arrow IPC files.
+
+    Args:
+        directory (str): Where snapshot files are written.
+    """
+
+    def __init__(self, directory=DEFAULT_FRAME_CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha256(repr(value).encode()).hexdigest()[:16]
+
+    def path(self, name, version):
+        return os.path.join(self.directory, f"{self._digest(name)}-{self._digest(version)}.arrow")
+
+    def load(self, name, version, build):
+        """
+        Returns the snapshot of `name` at `version`, building it on a miss.
+
+        Args:
+            name: Identifies the data source (any value with a stable repr).
+            version: Token that changes whenever the source's data does.
+            build (callable): Returns the full frame when no snapshot exists.
+
+        Returns:
+            pd.DataFrame: The compact, memory-mapped frame. Treat it as read-only.
+        """
+        path = self.path(name, version)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            write_frame(compact_frame(build()), path)
+            self._remove_stale(name, path)
+        return read_mapped_frame(path)
+
+    def _remove_stale(self, name, current_path):
+        """Deletes snapshots of older versions; processes still mapping them keep their pages."""
+        prefix = self._digest(name) + '-'
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if filename.startswith(prefix) and filename.endswith('.arrow') and path != current_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Windows cannot delete a file another process still maps
+                    pass
+
+
+_mapped_cache = None
+
+
+def use_mapped_frames(directory=DEFAULT_FRAME_CACHE_DIR):
+    """Keeps shared snapshots (see `SharedFrame`) as memory-mapped files under `directory`; None turns this off."""
+    global _mapped_cache
+    _mapped_cache = MappedFrameCache(directory) if directory else None
+
+
+class SharedFrame:
+    """
+    The current compact snapshot of a data source, shared by every session.
+
+    The snapshot is rebuilt only when `get()` is called with a new version
+    token. With `use_mapped_frames()` enabled, snapshots are memory-mapped
+    Arrow files that other processes on the host share as well.
+
+    Args:
+        name: Identifies the data source in the mapped cache.
+        build (callable): Returns the full frame for the source's current data.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.version = None
+        self.frame = None
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        """
+        Returns the snapshot for `version`, rebuilding it if the version changed.
+
+        Returns:
+            pd.DataFrame: The compact frame. Treat it as read-only; it is shared.
+        """
+        with self._lock:
+            if self.frame is None or version != self.version:
+                if _mapped_cache is not None:
+                    self.frame = _mapped_cache.load(self.name, version, self.build)
+                else:
+                    self.frame = compact_frame(self.build())
+                self.version = version
+            return self.frame
+
+    def peek(self, version):
+        """Returns the snapshot if it is already built for `version`, otherwise None; never builds."""
+        with self._lock:
+            return self.frame if self.frame is not None and version == self.version else None
@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ('region', 'age_group', 'gender')
+
+# Inputs whose least-squares fit against the MHABI score each cell keeps sums for
+CORRELATION_INPUTS = ('wait_time_days', 'dalys', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score')
+# Per-cell sums for each input x against y = mhabi_score, in this order (see `CubeSlice.statistics`)
+MOMENTS = ('n', 'sum_x', 'sum_y', 'sum_xx', 'sum_xy')
+
+# Cell label for patients missing a dimension value
+MISSING_LABEL = 'Unknown'
+
+# Score histogram used for quantiles: half-point bins covering 0-100
+HISTOGRAM_BIN_WIDTH = 0.5
+HISTOGRAM_BINS = int(100 / HISTOGRAM_BIN_WIDTH) + 1
+
+
+class AggregateCube:
+    """
+    MHABI aggregates materialized over region x age_group x gender.
+
+    Each cell holds the patient count, score sum, sum of squares, amplified
+    count, a half-point score histogram and, for each of `inputs`, the sums an
+    ordinary least squares fit of the score on that input needs. Cells are dense NumPy arrays, so
+    any combination of sidebar filters is answered by slicing and summing a
+    few dozen cells rather than scanning patients. The cube is maintained
+    incrementally with `add()` and `remove()`, which modify it in place; a
+    cube that other threads query is updated through `copy()`.
+    """
+
+    def __init__(self, dimensions=CUBE_DIMENSIONS, inputs=CORRELATION_INPUTS):
+        self.dimensions = tuple(dimensions)
+        self.inputs = tuple(inputs)
+        self.labels = [[] for _ in self.dimensions]
+        self._label_index = [{} for _ in self.dimensions]
+        shape = (0,) * len(self.dimensions)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.score_sum = np.zeros(shape, dtype=float)
+        self.score_sum_sq = np.zeros(shape, dtype=float)
+        self.amplified = np.zeros(shape, dtype=np.int64)
+        self.histogram = np.zeros(shape + (HISTOGRAM_BINS,), dtype=np.int64)
+        self.moments = {column: np.zeros(shape + (len(MOMENTS),), dtype=float) for column in self.inputs}
+
+    @classmethod
+    def from_frame(cls, df, dimensions=CUBE_DIMENSIONS, inputs=CORRELATION_INPUTS):
+        """Builds a cube from a scored DataFrame (see `process_dataframe`)."""
+        cube = cls(dimensions, inputs)
+        cube.add(df)
+        return cube
+
+    # --- Maintenance ---
+    def copy(self):
+        """
+        Returns an independent copy of the cube.
+
+        A cube shared between threads is updated by changing a copy and then
+        replacing the shared reference, so `query()` never needs a lock and
+        never sees cells that are half updated or arrays of mismatched shape.
+        """
+        cube = type(self)(self.dimensions, self.inputs)
+        cube.labels = [list(labels) for labels in self.labels]
+        cube._label_index = [dict(index) for index in self._label_index]
+        cube.count = self.count.copy()
+        cube.score_sum = self.score_sum.copy()
+        cube.score_sum_sq = self.score_sum_sq.copy()
+        cube.amplified = self.amplified.copy()
+        cube.histogram = self.histogram.copy()
+        cube.moments = {column: moments.copy() for column, moments in self.moments.items()}
+        return cube
+
+    def _codes(self, axis, values):
+        """
+        Maps dimension values to cell indexes, growing the axis for unseen values.
+
+        Missing values are counted under MISSING_LABEL; factorize codes them
+        -1, which would otherwise index the last label.
+        """
+        codes, uniques = pd.factorize(values)
+        uniques = list(uniques)
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(uniques), codes)
+            uniques.append(MISSING_LABEL)
+        index = self._label_index[axis]
+        new_labels = [value for value in uniques if value not in index]
+        if new_labels:
+            for value in new_labels:
+                index[value] = len(self.labels[axis])
+                self.labels[axis].append(value)
+            self._grow(axis, len(new_labels))
+        lookup = np.array([index[value] for value in uniques], dtype=np.intp)
+        return lookup[codes]
+
+    def _grow(self, axis, extra):
+        pad = [(0, 0)] * self.count.ndim
+        pad[axis] = (0, extra)
+        self.count = np.pad(self.count, pad)
+        self.score_sum = np.pad(self.score_sum, pad)
+        self.score_sum_sq = np.pad(self.score_sum_sq, pad)
+        self.amplified = np.pad(self.amplified, pad)
+        self.histogram = np.pad(self.histogram, pad + [(0, 0)])
+        self.moments = {column: np.pad(moments, pad + [(0, 0)]) for column, moments in self.moments.items()}
+
+    def _accumulate(self, df, sign):
+        if df.empty:
+            return
+        codes = [self._codes(axis, df[dimension]) for axis, dimension in enumerate(self.dimensions)]
+        shape = self.count.shape
+        cells = int(np.prod(shape))
+        flat = np.ravel_multi_index(codes, shape)
+        scores = df['mhabi_score'].to_numpy(dtype=float)
+        bins = np.clip((scores / HISTOGRAM_BIN_WIDTH).astype(np.intp), 0, HISTOGRAM_BINS - 1)
+
+        self.count += sign * np.bincount(flat, minlength=cells).reshape(shape)
+        self.score_sum += sign * np.bincount(flat, weights=scores, minlength=cells).reshape(shape)
+        self.score_sum_sq += sign * np.bincount(flat, weights=scores * scores, minlength=cells).reshape(shape)
+        self.amplified += sign * np.bincount(flat, weights=df['risk_amplified'].to_numpy(dtype=float),
+                                             minlength=cells).astype(np.int64).reshape(shape)
+        self.histogram += sign * np.bincount(flat * HISTOGRAM_BINS + bins,
+                                             minlength=cells * HISTOGRAM_BINS).reshape(self.histogram.shape)
+        for column in self.inputs:
+            x = df[column].to_numpy(dtype=float)
+            # Rows missing the input are left out of its fit, as the scatter leaves them out
+            valid = ~(np.isnan(x) | np.isnan(scores))
+            x, y, cell = x[valid], scores[valid], flat[valid]
+            sums = [np.bincount(cell, weights=weights, minlength=cells) for weights in (np.ones(len(x)), x, y, x * x, x * y)]
+            self.moments[column] += sign * np.stack(sums, axis=-1).reshape(self.moments[column].shape)
+
+    def add(self, df):
+        """Adds scored patients to the cube."""
+        self._accumulate(df, 1)
+
+    def remove(self, df):
+        """Removes previously added scored patients (e.g. before re-adding them with new scores)."""
+        self._accumulate(df, -1)
+
+    # --- Queries ---
+    def query(self, filters=None):
+        """
+        Selects the cells matching a set of filters.
+
+        Args:
+            filters (dict, optional): Dimension -> allowed values. A value of
+                None (or a missing dimension) selects every value.
+
+        Returns:
+            CubeSlice: The selected cells.
+        """
+        selectors = []
+        for axis, dimension in enumerate(self.dimensions):
+            values = (filters or {}).get(dimension)
+            if values is None:
+                selectors.append(np.arange(len(self.labels[axis])))
+            else:
+                index = self._label_index[axis]
+                selectors.append(np.array([index[value] for value in values if value in index], dtype=np.intp))
+        return CubeSlice(self, np.ix_(*selectors), [np.asarray(self.labels[axis], dtype=object)[selector]
+                                                    for axis, selector in enumerate(selectors)])
+
+
+class CubeSlice:
+    """A filtered view of an AggregateCube that answers chart queries."""
+
+    def __init__(self, cube, index, labels):
+        self.cube = cube
+        self.dimensions = cube.dimensions
+        self.labels = labels
+        self.count = cube.count[index]
+        self.score_sum = cube.score_sum[index]
+        self.score_sum_sq = cube.score_sum_sq[index]
+        self.amplified = cube.amplified[index]
+        self.histogram = cube.histogram[index]
+        self.moments = {column: moments[index] for column, moments in cube.moments.items()}
+
+    def total(self):
+        """Returns the number of patients in the slice."""
+        return int(self.count.sum())
+
+    def amplified_counts(self):
+        """Returns patient counts keyed by risk_amplified (True/False)."""
+        amplified = int(self.amplified.sum())
+        return {False: self.total() - amplified, True: amplified}
+
+    def statistics(self, column):
+        """
+        Returns the least squares sums of mhabi_score on an input over the slice.
+
+        Returns:
+            dict: 'n', 'sum_x', 'sum_y', 'sum_xx' and 'sum_xy' (see
+            `src.plotting.ols_from_statistics`).
+        """
+        sums = self.moments[column].reshape(-1, len(MOMENTS)).sum(axis=0)
+        statistics = dict(zip(MOMENTS, sums.tolist()))
+        statistics['n'] = int(round(statistics['n']))
+        return statistics
+
+    def by(self, dimension):
+        """
+        Summarizes the slice along one dimension.
+
+        Returns:
+            pd.DataFrame: One row per non-empty value of `dimension` with count,
+            mean, std, amplified_count and the box-plot statistics min, q1,
+            median, q3, max, lowerfence and upperfence. Quantiles are read from
+            the score histograms and are accurate to the bin width.
+        """
+        axis = self.dimensions.index(dimension)
+        other_axes = tuple(i for i in range(len(self.dimensions)) if i != axis)
+        count = self.count.sum(axis=other_axes)
+        score_sum = self.score_sum.sum(axis=other_axes)
+        score_sum_sq = self.score_sum_sq.sum(axis=other_axes)
+        histogram = self.histogram.sum(axis=other_axes)
+        present = count > 0
+
+        count, score_sum, score_sum_sq, histogram = count[present], score_sum[present], score_sum_sq[present], histogram[present]
+        mean = score_sum / count
+        std = np.sqrt(np.maximum(score_sum_sq / count - mean * mean, 0.0))
+        stats = _histogram_stats(histogram)
+        summary = pd.DataFrame({
+            dimension: self.labels[axis][present],
+            'count': count,
+            'mean': mean,
+            'std': std,
+            'amplified_count': self.amplified.sum(axis=other_axes)[present],
+            **stats,
+        })
+        return summary.sort_values(dimension, ignore_index=True)
+
+
+def _histogram_stats(histogram):
+    """Box-plot statistics for each row of a (groups x bins) histogram."""
+    cumulative = np.cumsum(histogram, axis=1)
+    totals = cumulative[:, -1:]
+    centers = np.minimum((np.arange(HISTOGRAM_BINS) + 0.5) * HISTOGRAM_BIN_WIDTH, 100)
+
+    def quantile(q):
+        # First bin whose cumulative count reaches the q-th fraction of patients
+        return centers[np.argmax(cumulative >= np.maximum(q * totals, 1), axis=1)]
+
+    nonzero = histogram > 0
+    minimum = centers[np.argmax(nonzero, axis=1)]
+    maximum = centers[HISTOGRAM_BINS - 1 - np.argmax(nonzero[:, ::-1], axis=1)]
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    return {
+        'min': minimum,
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'max': maximum,
+        'lowerfence': np.maximum(q1 - 1.5 * iqr, minimum),
+        'upperfence': np.minimum(q3 + 1.5 * iqr, maximum),
+    }
@@ -1,35 +1,238 @@
-import pandas as pd
-import streamlit as st
 import os
 
-@st.cache_data
-def load_emr_data(file_path='data/sample_emr_data.csv'):
+from src.cache import cache_data, cache_resource
+from src.compact import SharedFrame, compact_frame
+from src.cube import AggregateCube
+from src.history import TrendRollups
+from src.ingest import REQUIRED_COLUMNS, iter_emr_chunks
+from src.instrumentation import instrumented
+from src.materialize import ScoreMaterializer
+from src.mhabi_algorithm import process_dataframe
+from src.patient_store import PatientRepository
+from src.scoring_config import DEFAULT_CONFIG_PATH, load_scoring_config
+from src.storage import FILTER_COLUMNS, CsvStore, apply_filters, open_store, store_type
+
+DEFAULT_DATA_PATH = 'data/patients.db'
+SEED_CSV_PATH = 'data/sample_emr_data.csv'
+
+
+class DataLoadError(Exception):
+    """Raised when EMR data cannot be found, read or validated."""
+
+@cache_resource
+def get_store(file_path=DEFAULT_DATA_PATH, seed_csv_path=SEED_CSV_PATH):
     """
-    Loads EMR data from a specified CSV file path.
-    Uses Streamlit's caching to improve performance.
+    Opens the storage backend shared by every page and session.
+
+    A SQLite patient database that does not exist yet is created and seeded
+    from `seed_csv_path`.
 
     Args:
-        file_path (str): The path to the CSV data file.
+        file_path (str): A `.db` patient database, CSV file or Parquet dataset.
+        seed_csv_path (str, optional): CSV imported into a newly created database.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the EMR data.
+        The storage backend (see `src.storage.open_store`).
     """
+    is_new = not os.path.exists(file_path)
+    store = open_store(file_path)
+    if is_new and isinstance(store, PatientRepository) and seed_csv_path and os.path.exists(seed_csv_path):
+        for chunk in iter_emr_chunks(seed_csv_path):
+            store.insert_many(chunk, skip_duplicates=True)
+    return store
+
+def _read_emr(file_path, filters=None):
+    """Reads and validates records from any backend (uncached, see `load_emr_data`)."""
     if not os.path.exists(file_path):
-        st.error(f"Data file not found at: {file_path}")
-        return pd.DataFrame()
-        
+        raise DataLoadError(f"Data file not found at: {file_path}")
+
     try:
-        df = pd.read_csv(file_path)
-        # Basic validation
-        required_columns = [
-            'patient_id', 'region', 'age_group', 'gender', 'wait_time_days',
-            'dalys', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score'
-        ]
-        if not all(col in df.columns for col in required_columns):
-            st.error("CSV file is missing one or more required columns.")
-            return pd.DataFrame()
-            
-        return df
+        # The shared store: opening a patient database again would re-run its schema
+        df = get_store(file_path).read(filters)
     except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+        raise DataLoadError(f"Error loading data: {e}") from e
+
+    # Basic validation
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise DataLoadError("Data file is missing one or more required columns.")
+    return compact_frame(df)
+
+@cache_data
+def _load_emr_frame(file_path, filters=None):
+    return _read_emr(file_path, filters)
+
+@instrumented('load_emr_data')
+def load_emr_data(file_path=DEFAULT_DATA_PATH, filters=None):
+    """
+    Loads EMR data from a patient database, CSV file or partitioned Parquet dataset.
+    Results are cached with the configured data cache backend (see `src.cache`).
+
+    Args:
+        file_path (str): The path to the `.db` file, CSV file or Parquet dataset directory.
+        filters (dict, optional): Column -> allowed values. For SQLite and
+            Parquet the filters are pushed down to the reader so non-matching
+            rows, partitions and row groups are never decoded. A CSV file has
+            to be parsed in full anyway, so it is parsed and cached once and
+            every filter combination is applied to the cached frame.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the EMR data, with categorical
+        demographics and narrowed count columns (see `src.compact`).
+
+    Raises:
+        DataLoadError: If the data is missing, unreadable or lacks required columns.
+    """
+    if store_type(file_path) is CsvStore:
+        return apply_filters(_load_emr_frame(file_path), filters)
+    return _load_emr_frame(file_path, filters)
+
+load_emr_data.clear = _load_emr_frame.clear
+
+@cache_resource
+def get_score_materializer(file_path=DEFAULT_DATA_PATH, config_path=DEFAULT_CONFIG_PATH):
+    """Returns the incrementally maintained scores for a patient database, shared across sessions."""
+    return ScoreMaterializer(get_store(file_path), load_scoring_config(config_path))
+
+@cache_resource
+def get_shared_frame(file_path=DEFAULT_DATA_PATH, config_path=DEFAULT_CONFIG_PATH):
+    """Returns the scored snapshot of a CSV file or Parquet dataset shared by every session (see `SharedFrame`)."""
+    config = load_scoring_config(config_path)
+
+    def build():
+        return process_dataframe(_read_emr(file_path), config=config)
+    return SharedFrame((os.path.abspath(file_path), config.content_hash), build)
+
+@cache_data
+def _load_scored_frame(file_path, filters, config_path=DEFAULT_CONFIG_PATH):
+    """Scores only the records matching `filters`, which are pushed down to the reader."""
+    return compact_frame(process_dataframe(_read_emr(file_path, filters), config=load_scoring_config(config_path)))
+
+@instrumented('load_scored_data')
+def load_scored_data(file_path=DEFAULT_DATA_PATH, filters=None, config_path=DEFAULT_CONFIG_PATH):
+    """
+    Loads EMR data together with its MHABI scores.
+
+    For a SQLite patient database the scores come from a persisted score table
+    that is refreshed incrementally: only patients added or changed since the
+    last call are rescored. Its filters are deliberately not pushed into SQL:
+    the materialized frame already holds every scored patient in memory, and
+    a categorical mask over it is cheaper than a filtered query joined to the
+    score table on every rerun. Other backends are loaded and scored in full once
+    per change to the file, into a compact snapshot shared by every session,
+    and filtered with a mask over it. Until that snapshot exists, filtered
+    reads of a Parquet dataset are pushed down to the reader instead, so a
+    session that starts filtered decodes only the matching partitions and
+    row groups. A patient database that does not exist yet is created and
+    seeded (see `get_store`); a missing CSV file or dataset raises.
+
+    Args:
+        file_path (str): The path to the `.db` file, CSV file or Parquet dataset directory.
+        filters (dict, optional): Column -> allowed values.
+        config_path (str): The scoring profile to score with.
+
+    Returns:
+        pd.DataFrame: The matching records with score columns (see
+        `process_dataframe`), in the compact dtypes of `src.compact`. Without
+        filters this is the shared frame itself; treat it as read-only.
+
+    Raises:
+        DataLoadError: If the data cannot be loaded.
+    """
+    store = get_store(file_path)
+    if isinstance(store, PatientRepository):
+        try:
+            scored = get_score_materializer(file_path, config_path).refresh()
+        except Exception as e:
+            raise DataLoadError(f"Error loading data: {e}") from e
+        return apply_filters(scored, filters)
+
+    shared = get_shared_frame(file_path, config_path)
+    version = data_version(file_path, config_path)
+    scored = shared.peek(version)
+    if scored is None:
+        if not isinstance(store, CsvStore) and any(values is not None for values in (filters or {}).values()):
+            return _load_scored_frame(file_path, filters, config_path)
+        scored = shared.get(version)
+    return apply_filters(scored, filters)
+
+@cache_data
+def _snapshot_cube(file_path, filters=None, config_path=DEFAULT_CONFIG_PATH):
+    return AggregateCube.from_frame(load_scored_data(file_path, filters, config_path))
+
+def get_cohort_cube(file_path=DEFAULT_DATA_PATH, config_path=DEFAULT_CONFIG_PATH, filters=None):
+    """
+    Returns the cohort aggregate cube for a data source.
+
+    For a patient database this is the cube the score materializer maintains
+    incrementally, covering every patient. For a CSV file or Parquet dataset
+    it is built from the records matching `filters` and cached on the state
+    of the source files, so reruns with unchanged data and filters reuse it.
+
+    Returns:
+        AggregateCube: Query it with the same `filters`.
+    """
+    if store_type(file_path) is not PatientRepository:
+        return _snapshot_cube(file_path, filters, config_path)
+    materializer = get_score_materializer(file_path, config_path)
+    materializer.refresh()
+    return materializer.cube
+
+@cache_resource
+def get_trend_rollups(file_path=DEFAULT_DATA_PATH, config_path=DEFAULT_CONFIG_PATH):
+    """Returns the weekly trend rollups of a patient database, shared across sessions."""
+    return TrendRollups(get_store(file_path), load_scoring_config(config_path))
+
+def get_trends(file_path=DEFAULT_DATA_PATH, config_path=DEFAULT_CONFIG_PATH):
+    """
+    Returns the incrementally maintained weekly trend rollups for a patient database.
+
+    Returns:
+        TrendRollups or None: None for backends without an assessment history.
+    """
+    if store_type(file_path) is not PatientRepository:
+        return None
+    rollups = get_trend_rollups(file_path, config_path)
+    rollups.refresh()
+    return rollups
+
+def data_version(file_path=DEFAULT_DATA_PATH, config_path=DEFAULT_CONFIG_PATH):
+    """
+    Returns a token that changes whenever the scored data for a source changes.
+
+    Use it to key derived state (sort indexes, lookups) that should be rebuilt
+    only when the data does.
+
+    Returns:
+        tuple: The materializer revision for a patient database, otherwise
+        the latest modification time of the file or of any directory in the
+        dataset (appends add files to partition directories, not the root).
+    """
+    if store_type(file_path) is PatientRepository:
+        materializer = get_score_materializer(file_path, config_path)
+        materializer.refresh()
+        return ('revision', materializer.revision)
+    if not os.path.exists(file_path):
+        return ('mtime', None)
+    if os.path.isdir(file_path):
+        return ('mtime', max(os.path.getmtime(root) for root, _, _ in os.walk(file_path)))
+    return ('mtime', os.path.getmtime(file_path))
+
+@cache_data
+def load_filter_options(file_path=DEFAULT_DATA_PATH):
+    """
+    Reads the distinct values of each sidebar filter column without loading
+    full records (for a CSV file, from the cached parsed frame).
+
+    Returns:
+        dict: Column -> sorted distinct values. Empty if the data cannot be read.
+    """
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        if store_type(file_path) is CsvStore:
+            # Reuses the parsed frame rather than re-reading the file once per column
+            frame = _load_emr_frame(file_path)
+            return {column: sorted(frame[column].dropna().unique().tolist()) for column in FILTER_COLUMNS}
+        return {column: get_store(file_path).distinct_values(column) for column in FILTER_COLUMNS}
+    except Exception:
+        return {}
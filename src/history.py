@@ -0,0 +1,172 @@
+"""
+Assessment history analytics over the log kept by `PatientRepository`.
+
+`TrendRollups` keeps weekly MHABI aggregates per region in a per-profile
+table (`trends_<config hash>`). Each `refresh()` scores only assessments
+logged since the last one and folds them into their (week, region) rows, so
+trend queries read a few rows per week instead of the whole log, however
+many years it spans.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.mhabi_algorithm import process_dataframe
+from src.patient_store import PATIENT_COLUMNS, read_records
+
+# Rolling windows offered for trend charts, in weeks
+TREND_WINDOWS = {'Weekly': 1, '4-week rolling': 4, '13-week rolling': 13, '52-week rolling': 52}
+
+_SUM_COLUMNS = ['assessments', 'score_sum', 'score_sum_sq', 'amplified']
+
+
+class TrendRollups:
+    """
+    Weekly MHABI aggregates per region, maintained incrementally from the assessment log.
+
+    Each (week, region) row holds the assessment count, score sum, sum of
+    squares and amplified count. Folding in new assessments and advancing the
+    watermark (the last revision folded in, kept in the `sequences` table)
+    happen in one write transaction, so concurrent refreshes from several
+    processes never count an assessment twice.
+
+    Args:
+        repository (PatientRepository): The database holding the assessment log.
+        config (ScoringConfig): The profile assessments are scored with.
+    """
+
+    def __init__(self, repository, config):
+        self.repository = repository
+        self.config = config
+        self.table = f"trends_{config.content_hash[:16]}"
+        self.revision = -1
+        self.last_folded = 0
+        self._lock = threading.Lock()
+        with repository.connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "week_start TEXT NOT NULL, region TEXT NOT NULL, assessments INTEGER NOT NULL, "
+                "score_sum REAL NOT NULL, score_sum_sq REAL NOT NULL, amplified INTEGER NOT NULL, "
+                "PRIMARY KEY (week_start, region)) WITHOUT ROWID"
+            )
+            conn.execute("INSERT OR IGNORE INTO sequences (name, value) VALUES (?, 0)", (self.table,))
+
+    def refresh(self):
+        """
+        Folds assessments logged since the last refresh into the weekly rows.
+
+        Returns:
+            int: The number of assessments folded in.
+        """
+        with self._lock:
+            if self.repository.current_revision() == self.revision:
+                self.last_folded = 0
+                return 0
+
+            with self.repository.transaction() as conn:
+                watermark = conn.execute("SELECT value FROM sequences WHERE name = ?", (self.table,)).fetchone()[0]
+                current = conn.execute("SELECT value FROM sequences WHERE name = 'revision'").fetchone()[0]
+                new = read_records(
+                    conn, f"SELECT week_start, {', '.join(PATIENT_COLUMNS[1:])} FROM assessments WHERE revision > ?",
+                    (watermark,)
+                )
+                if not new.empty:
+                    conn.executemany(
+                        f"INSERT INTO {self.table} (week_start, region, {', '.join(_SUM_COLUMNS)}) "
+                        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (week_start, region) DO UPDATE SET "
+                        + ', '.join(f"{column} = {column} + excluded.{column}" for column in _SUM_COLUMNS),
+                        self._weekly_sums(new)
+                    )
+                conn.execute("UPDATE sequences SET value = ? WHERE name = ?", (current, self.table))
+
+            self.revision = current
+            self.last_folded = len(new)
+            return self.last_folded
+
+    def _weekly_sums(self, assessments):
+        scored = process_dataframe(assessments, config=self.config)
+        scores = scored['mhabi_score'].to_numpy(dtype=float)
+        sums = pd.DataFrame({
+            'week_start': scored['week_start'], 'region': scored['region'].astype(str),
+            'assessments': 1, 'score_sum': scores, 'score_sum_sq': scores * scores,
+            'amplified': scored['risk_amplified'].to_numpy(dtype=np.int64),
+        }).groupby(['week_start', 'region'], sort=False).sum().reset_index()
+        # tolist() yields Python scalars, which sqlite3 can bind directly
+        return list(zip(*(sums[column].tolist() for column in ['week_start', 'region', *_SUM_COLUMNS])))
+
+    def weekly(self, regions=None, start=None, end=None):
+        """
+        Reads the stored weekly rows.
+
+        Args:
+            regions (list, optional): Regions to include. Defaults to all.
+            start, end (optional): First and last week (dates or strings) to include.
+
+        Returns:
+            pd.DataFrame: 'week_start' (Timestamp), 'region' and the summed
+            'assessments', 'score_sum', 'score_sum_sq' and 'amplified', sorted by week.
+        """
+        clauses, params = [], []
+        if regions is not None:
+            regions = list(regions)
+            clauses.append(f"region IN ({', '.join('?' * len(regions))})" if regions else "0")
+            params.extend(regions)
+        if start is not None:
+            clauses.append("week_start >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            clauses.append("week_start <= ?")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        query = f"SELECT week_start, region, {', '.join(_SUM_COLUMNS)} FROM {self.table}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self.repository.connect() as conn:
+            df = pd.read_sql_query(query + " ORDER BY week_start, region", conn, params=params)
+        df['week_start'] = pd.to_datetime(df['week_start'])
+        return df
+
+    def trend(self, window=1, regions=None, by_region=True, start=None, end=None):
+        """
+        Computes MHABI trends over trailing windows of whole weeks.
+
+        Weeks without assessments count as empty, so a 4-week window always
+        spans four calendar weeks.
+
+        Args:
+            window (int): Weeks per trailing window; 1 gives plain weekly values.
+            regions (list, optional): Regions to include. Defaults to all.
+            by_region (bool): One series per region; False pools the regions.
+            start, end (optional): Range of weeks to report.
+
+        Returns:
+            pd.DataFrame: 'week_start', 'region' (or 'All regions' when pooled),
+            'assessments', 'mean_score', 'std_score' and 'amplified_rate' for
+            every week whose window holds at least one assessment.
+        """
+        # Read enough weeks before `start` to fill its first window
+        read_start = None if start is None else pd.Timestamp(start) - pd.Timedelta(weeks=window - 1)
+        weekly = self.weekly(regions, read_start, end)
+        if not by_region:
+            weekly = weekly.assign(region='All regions').groupby(['week_start', 'region'], as_index=False)[_SUM_COLUMNS].sum()
+        if weekly.empty:
+            return pd.DataFrame(columns=['week_start', 'region', 'assessments', 'mean_score', 'std_score', 'amplified_rate'])
+
+        weeks = pd.date_range(weekly['week_start'].min(), weekly['week_start'].max(), freq='W-MON')
+        frames = []
+        for region, rows in weekly.groupby('region', sort=True):
+            sums = rows.set_index('week_start')[_SUM_COLUMNS].reindex(weeks, fill_value=0)
+            rolled = sums.rolling(window, min_periods=1).sum()
+            rolled = rolled[rolled['assessments'] > 0]
+            count = rolled['assessments']
+            mean = rolled['score_sum'] / count
+            variance = (rolled['score_sum_sq'] / count - mean * mean).clip(lower=0)
+            frames.append(pd.DataFrame({
+                'week_start': rolled.index, 'region': region, 'assessments': count.astype(np.int64).to_numpy(),
+                'mean_score': mean.to_numpy(), 'std_score': np.sqrt(variance).to_numpy(),
+                'amplified_rate': (rolled['amplified'] / count).to_numpy(),
+            }))
+        trend = pd.concat(frames, ignore_index=True)
+        if start is not None:
+            trend = trend[trend['week_start'] >= pd.Timestamp(start)]
+        return trend.sort_values(['week_start', 'region'], ignore_index=True)
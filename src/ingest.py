@@ -0,0 +1,136 @@
+"""
+Streamlit-free readers for EMR extracts.
+
+Used by the dashboard loader as well as by batch jobs (see `src.score`), so
+nothing here may import the UI stack.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.patient_store import PATIENT_COLUMNS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REQUIRED_COLUMNS = PATIENT_COLUMNS
+
+# Smallest integer types that hold the count columns
+COUNT_DTYPES = {
+    'wait_time_days': 'int16',
+    'er_visits_last_year': 'int16',
+    'missed_work_school_days': 'int16',
+    'suicide_risk_score': 'int8',
+}
+
+# Compact dtypes for streamed extracts: dictionary-encoded demographics and
+# the count types above. A blank count cell cannot be held by a NumPy integer,
+# so count columns are parsed as float64 and narrowed per chunk (see `narrow_counts`).
+EMR_DTYPES = {
+    'region': 'category',
+    'age_group': 'category',
+    'gender': 'category',
+    'dalys': 'float64',
+    **COUNT_DTYPES,
+}
+_READ_DTYPES = {**EMR_DTYPES, **{column: 'float64' for column in COUNT_DTYPES}}
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def narrow_counts(df):
+    """
+    Casts float count columns to their COUNT_DTYPES type where that is lossless.
+
+    A column keeps float64 if it has missing values (which score in the top
+    tier, as in the reference scorer), fractions or values outside the type.
+
+    Returns:
+        pd.DataFrame: `df`, or a copy with the narrowed columns.
+    """
+    dtypes = {}
+    for column, dtype in COUNT_DTYPES.items():
+        if column not in df.columns or df[column].dtype.kind != 'f':
+            continue
+        values = df[column].to_numpy()
+        info = np.iinfo(dtype)
+        if len(values) and np.isfinite(values).all() and (values % 1 == 0).all() \
+                and info.min <= values.min() and values.max() <= info.max:
+            dtypes[column] = dtype
+    return df.astype(dtypes) if dtypes else df
+
+
+def iter_emr_chunks(file_path, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Streams EMR data from a CSV file in fixed-size chunks with compact dtypes.
+
+    Args:
+        file_path (str): The path to the CSV data file.
+        chunksize (int): Number of rows per chunk.
+
+    Yields:
+        pd.DataFrame: Up to `chunksize` rows typed according to EMR_DTYPES,
+        except count columns of chunks with blank cells, which stay float64.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is missing required columns.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Data file not found at: {file_path}")
+
+    header = pd.read_csv(file_path, nrows=0).columns
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"CSV file is missing required columns: {', '.join(missing)}")
+
+    for chunk in pd.read_csv(file_path, dtype=_READ_DTYPES, chunksize=chunksize):
+        yield narrow_counts(chunk)
+
+
+def peak_rss_bytes():
+    """Returns the peak resident set size of the current process in bytes, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def iter_record_chunks(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Streams EMR data from a CSV file or a Parquet file/dataset directory.
+
+    Args:
+        path (str): A `.csv` file, a `.parquet` file or a (Hive-partitioned) dataset directory.
+        chunksize (int): Maximum number of rows per chunk. Parquet chunks follow
+            row-group boundaries and may be smaller.
+
+    Yields:
+        pd.DataFrame: Chunks of patient records.
+
+    Raises:
+        FileNotFoundError: If the path does not exist.
+        ValueError: If the data is missing required columns.
+    """
+    if path.lower().endswith('.csv'):
+        yield from iter_emr_chunks(path, chunksize)
+        return
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Data file not found at: {path}")
+    try:
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError("Reading Parquet requires pyarrow (pip install pyarrow).") from e
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    missing = [col for col in REQUIRED_COLUMNS if col not in dataset.schema.names]
+    if missing:
+        raise ValueError(f"Parquet data is missing required columns: {', '.join(missing)}")
+    for batch in dataset.to_batches(batch_size=chunksize):
+        yield batch.to_pandas()
@@ -0,0 +1,202 @@
+"""
+Per-stage timing and memory instrumentation for the scoring and dashboard hot paths.
+
+Core functions are wrapped with `instrumented(...)` and dashboard sections with
+`stage(...)`. Both report to the Recorder active in the current context (see
+`recording`). When no enabled recorder is active, the default, they cost one
+context-variable lookup and no timing or memory reads.
+
+    recorder = Recorder()
+    with recording(recorder):
+        process_dataframe(df)
+    recorder.write_openmetrics('metrics.prom')
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import time
+import uuid
+
+from src.ingest import peak_rss_bytes
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def current_rss_bytes():
+    """Returns the current resident set size, falling back to the peak where /proc is unavailable."""
+    if _PAGE_SIZE is not None:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            pass
+    return peak_rss_bytes()
+
+
+class _NullStage:
+    """Shared no-op context manager handed out while instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Recorder:
+    """
+    Collects stage timings for one unit of work, such as a dashboard run.
+
+    Each record holds the stage name, wall time, the change in resident memory
+    across the stage, and any labels passed to `stage()`.
+
+    Args:
+        enabled (bool): A disabled recorder records nothing.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+
+    @contextlib.contextmanager
+    def _timed(self, name, labels):
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = current_rss_bytes()
+            self.records.append({
+                'stage': name,
+                'seconds': seconds,
+                'rss_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                'rss_bytes': rss_after,
+                'labels': labels,
+            })
+
+    def stage(self, name, **labels):
+        """Returns a context manager that times the enclosed block as `name`."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._timed(name, labels)
+
+    def summary(self):
+        """
+        Aggregates the records by stage and labels.
+
+        Returns:
+            list: One dict per stage with 'stage', 'labels', 'calls', 'seconds'
+            (total) and 'rss_delta_bytes' (total), in first-seen order.
+        """
+        totals = {}
+        for record in self.records:
+            key = (record['stage'], tuple(sorted(record['labels'].items())))
+            total = totals.setdefault(key, {
+                'stage': record['stage'], 'labels': record['labels'], 'calls': 0, 'seconds': 0.0, 'rss_delta_bytes': 0
+            })
+            total['calls'] += 1
+            total['seconds'] += record['seconds']
+            if record['rss_delta_bytes'] is not None:
+                total['rss_delta_bytes'] += record['rss_delta_bytes']
+        return list(totals.values())
+
+    # --- Export ---
+    def write_jsonl(self, path):
+        """Appends one JSON line per record (with a timestamp and run ID) to a structured log."""
+        timestamp = time.time()
+        with open(path, 'a') as f:
+            for record in self.records:
+                f.write(json.dumps({'timestamp': timestamp, 'run_id': self.run_id, **record}) + '\n')
+
+    def to_openmetrics(self, prefix='mhabi'):
+        """Renders the stage summary in the OpenMetrics text format."""
+        metrics = [
+            (f'{prefix}_stage_duration_seconds', 'seconds', 'Wall time spent in the stage during the last run.', 'seconds'),
+            (f'{prefix}_stage_rss_delta_bytes', 'bytes', 'Change in resident memory across the stage during the last run.', 'rss_delta_bytes'),
+            (f'{prefix}_stage_calls', None, 'Times the stage ran during the last run.', 'calls'),
+        ]
+        summary = self.summary()
+        lines = []
+        for name, unit, help_text, field in metrics:
+            lines.append(f"# TYPE {name} gauge")
+            if unit:
+                lines.append(f"# UNIT {name} {unit}")
+            lines.append(f"# HELP {name} {help_text}")
+            for total in summary:
+                labels = {'stage': total['stage'], **total['labels']}
+                rendered = ','.join(f'{_label_name(key)}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{name}{{{rendered}}} {total[field]}")
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def write_openmetrics(self, path, prefix='mhabi'):
+        """Writes `to_openmetrics()` to a file atomically, e.g. for a node exporter textfile collector."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_openmetrics(prefix))
+        os.replace(tmp_path, path)
+
+
+def _label_name(key):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', str(key))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+# --- Active recorder ---
+_DISABLED = Recorder(enabled=False)
+_current = contextvars.ContextVar('mhabi_recorder', default=_DISABLED)
+
+
+@contextlib.contextmanager
+def recording(recorder):
+    """Makes `recorder` the target of `stage()` and `instrumented` functions within the block."""
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+def stage(name, **labels):
+    """Times a block against the active recorder; a no-op when none is enabled."""
+    return _current.get().stage(name, **labels)
+
+
+def instrumented(name):
+    """Decorator that times every call of a function as stage `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _current.get()
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+            with recorder.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def activate(recorder):
+    """
+    Makes `recorder` active for the rest of the current context.
+
+    For scripts that cannot wrap their body in `recording()`, such as a
+    Streamlit page. Each session runs its script in its own thread, and so
+    its own context, and every run activates a fresh recorder.
+    """
+    _current.set(recorder)
+    return recorder
@@ -0,0 +1,153 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.compact import compact_frame, conform
+from src.cube import AggregateCube
+from src.instrumentation import instrumented
+from src.mhabi_algorithm import process_dataframe
+from src.patient_store import PATIENT_COLUMNS, read_records
+from src.scoring_config import NORMALIZED_SCORE_DTYPE
+
+
+def input_hashes(df, config):
+    """
+    Hashes each row's scoring inputs.
+
+    Returns:
+        np.ndarray: One int64 hash per row (signed so SQLite can store it).
+    """
+    hashed = pd.util.hash_pandas_object(df[config.input_columns].astype(float), index=False)
+    return hashed.to_numpy().view(np.int64)
+
+
+class ScoreMaterializer:
+    """
+    Keeps a scored copy of a PatientRepository up to date incrementally.
+
+    Scores are persisted in a per-profile table (`scores_<config hash>`) keyed by
+    patient_id, next to the hash of the inputs they were computed from. Each
+    `refresh()` reads only patients whose revision is newer than the last one
+    seen, rescores the rows whose input hash no longer matches, and patches the
+    frame instead of rescoring everyone. Patches are applied to a copy that
+    then replaces the shared frame, so readers never see a half-patched frame.
+    The first refresh in a process reads every patient but still only rescores
+    rows without a current score.
+
+    The cohort aggregate cube (`self.cube`) is maintained alongside the frame,
+    on a copy in the same way: changed patients are removed with their old
+    scores and re-added.
+    """
+
+    def __init__(self, repository, config):
+        self.repository = repository
+        self.config = config
+        self.table = f"scores_{config.content_hash[:16]}"
+        self.score_columns = ['mhabi_score', 'risk_amplified'] + list(config.normalized_score_columns.values())
+        self.frame = None
+        self.cube = None
+        # patient_id -> row in self.frame; rows are only ever appended, so positions never move
+        self._positions = {}
+        self.revision = -1
+        self.last_rescored = 0
+        self._lock = threading.Lock()
+        self._create_table()
+
+    def _create_table(self):
+        norm_columns = ''.join(f", {column} INTEGER NOT NULL" for column in self.score_columns[2:])
+        with self.repository.connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "patient_id TEXT PRIMARY KEY, input_hash INTEGER NOT NULL, "
+                f"mhabi_score REAL NOT NULL, risk_amplified INTEGER NOT NULL{norm_columns})"
+            )
+
+    def _read_changed(self, since_revision):
+        """Reads patients newer than `since_revision` joined with their stored scores."""
+        patient_columns = ', '.join(f"p.{column}" for column in PATIENT_COLUMNS)
+        # COALESCE keeps the joined columns NULL-free so the hashes stay exact int64
+        score_columns = ', '.join(f"COALESCE(s.{column}, 0) AS {column}" for column in self.score_columns)
+        query = (
+            f"SELECT {patient_columns}, s.patient_id IS NOT NULL AS has_score, "
+            f"COALESCE(s.input_hash, 0) AS input_hash, {score_columns} "
+            f"FROM patients p LEFT JOIN {self.table} s ON s.patient_id = p.patient_id "
+            "WHERE p.revision > ?"
+        )
+        with self.repository.connect() as conn:
+            return read_records(conn, query, (since_revision,))
+
+    def _store_scores(self, scored, hashes):
+        columns = ['patient_id', 'input_hash'] + self.score_columns
+        values = [scored['patient_id'].tolist(), hashes.tolist()] + [scored[column].tolist() for column in self.score_columns]
+        with self.repository.transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                list(zip(*values))
+            )
+
+    def _score(self, changed):
+        """Fills in scores for changed rows, rescoring only those with stale or missing scores."""
+        hashes = input_hashes(changed, self.config)
+        stale = (changed['has_score'].to_numpy() == 0) | (changed['input_hash'].to_numpy() != hashes)
+        self.last_rescored = int(stale.sum())
+
+        scored = changed[PATIENT_COLUMNS + self.score_columns].copy()
+        scored['mhabi_score'] = scored['mhabi_score'].astype(float)
+        scored['risk_amplified'] = scored['risk_amplified'].astype(bool)
+        for column in self.score_columns[2:]:
+            scored[column] = scored[column].astype(NORMALIZED_SCORE_DTYPE)
+
+        if self.last_rescored:
+            rescored = process_dataframe(
+                changed.loc[stale, PATIENT_COLUMNS].reset_index(drop=True), config=self.config
+            )
+            self._store_scores(rescored, hashes[stale])
+            for column in self.score_columns:
+                scored.loc[stale, column] = rescored[column].to_numpy()
+        return scored
+
+    @instrumented('score_refresh')
+    def refresh(self):
+        """
+        Brings the scored frame up to date with the repository.
+
+        Returns:
+            pd.DataFrame: Every patient with 'mhabi_score', 'risk_amplified' and
+            the normalized sub-score columns, in the compact dtypes of
+            `src.compact`. Treat it as read-only; it is shared. Later refreshes
+            replace it rather than modify it, so it stays consistent while in use.
+        """
+        with self._lock:
+            current = self.repository.current_revision()
+            if self.frame is not None and current == self.revision:
+                self.last_rescored = 0
+                return self.frame
+
+            changed = self._read_changed(self.revision)
+            scored = self._score(changed)
+
+            if self.frame is None:
+                self.frame = compact_frame(scored)
+                self.cube = AggregateCube.from_frame(self.frame)
+                self._positions = dict(zip(self.frame['patient_id'].tolist(), range(len(self.frame))))
+            elif not scored.empty:
+                # Sessions read the current frame and cube without taking the lock, so neither
+                # is modified. The patches go into a shallow copy, where copy-on-write duplicates
+                # only the columns written to, and a cube copy; both then replace the originals.
+                frame, scored = conform(self.frame, scored)
+                cube = self.cube.copy()
+                positions = np.array([self._positions.get(patient_id, -1) for patient_id in scored['patient_id']], dtype=np.intp)
+                updated = positions >= 0
+                cube.remove(frame.iloc[positions[updated]])
+                cube.add(scored)
+                if updated.any():
+                    for column in scored.columns.drop('patient_id'):
+                        frame.iloc[positions[updated], frame.columns.get_loc(column)] = scored.loc[updated, column].to_numpy()
+                if (~updated).any():
+                    added = scored.loc[~updated, 'patient_id'].tolist()
+                    self._positions.update(zip(added, range(len(frame), len(frame) + len(added))))
+                    frame = pd.concat([frame, scored[~updated]], ignore_index=True)
+                self.frame, self.cube = frame, cube
+            self.revision = current
+            return self.frame
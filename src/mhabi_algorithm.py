@@ -1,72 +1,44 @@
+import numpy as np
 import pandas as pd
 
-# --- Normalization Tiered Thresholds ---
-def _normalize_wait_time(days):
-    if days <= 7: return 10
-    if days <= 30: return 40
-    if days <= 90: return 70
-    return 100
-
-def _normalize_dalys(daly_score):
-    if daly_score < 0.1: return 10
-    if daly_score < 0.2: return 40
-    if daly_score < 0.3: return 70
-    return 100
-
-def _normalize_er_visits(visits):
-    if visits == 0: return 0
-    if visits == 1: return 40
-    if visits == 2: return 70
-    return 100
-
-def _normalize_missed_work(days):
-    if days <= 5: return 10
-    if days <= 10: return 40
-    if days <= 20: return 70
-    return 100
-
-def _normalize_suicide_risk(risk_score):
-    if risk_score <= 3: return 10
-    if risk_score <= 6: return 50
-    if risk_score <= 8: return 80
-    return 100
-
-def calculate_mhabi(patient_data_row):
+from src.instrumentation import instrumented
+from src.scoring_config import NORMALIZED_SCORE_DTYPE, load_scoring_config
+
+# --- Scoring Profile ---
+# Tier thresholds, weights and the amplification rule live in config/scoring/*.toml.
+# Every scoring function accepts an optional compiled profile and falls back to the default,
+# which is compiled once here rather than re-read and re-hashed on every (per-row) call.
+DEFAULT_CONFIG = load_scoring_config()
+
+def _resolve_config(config):
+    return config if config is not None else DEFAULT_CONFIG
+
+# Typed sub-score columns written by process_dataframe under the default profile
+NORMALIZED_SCORE_COLUMNS = DEFAULT_CONFIG.normalized_score_columns
+
+def calculate_mhabi(patient_data_row, config=None):
     """
     Calculates the MHABI score for a single patient using user-provided inputs.
     """
-    # --- Raw Input Values ---
-    raw_wait_time = patient_data_row['wait_time_days']
-    raw_dalys = patient_data_row['dalys']
-    raw_er_visits = patient_data_row['er_visits_last_year']
-    raw_missed_work = patient_data_row['missed_work_school_days']
-    # Suicide risk is now taken directly from the input
-    raw_suicide_risk = patient_data_row['suicide_risk_score']
+    config = _resolve_config(config)
 
     # --- Step 1: Normalization ---
     norm_scores = {
-        "Wait Time": _normalize_wait_time(raw_wait_time),
-        "DALYs/YLDs": _normalize_dalys(raw_dalys),
-        "ER Utilization": _normalize_er_visits(raw_er_visits),
-        "Missed Work/School": _normalize_missed_work(raw_missed_work),
-        "Suicide Risk": _normalize_suicide_risk(raw_suicide_risk)
+        factor.label: factor.normalize_scalar(patient_data_row[factor.column])
+        for factor in config.factors
     }
 
     # --- Step 2: Weighted Composite Score ---
-    weights = {
-        "Wait Time": 0.25, "DALYs/YLDs": 0.20, "ER Utilization": 0.20,
-        "Missed Work/School": 0.15, "Suicide Risk": 0.20
-    }
-    subtotal = sum(norm_scores[key] * weights[key] for key in norm_scores)
+    subtotal = sum(norm_scores[factor.label] * factor.weight for factor in config.factors)
 
     # --- Step 3: Risk Amplification Logic ---
     amplified = False
     final_score = subtotal
-    if raw_suicide_risk >= 7 and raw_er_visits >= 2:
-        final_score *= 1.1
+    if all(patient_data_row[column] >= minimum for column, minimum in config.amplification_minimums):
+        final_score *= config.amplification_factor
         amplified = True
     
-    final_score = min(final_score, 100)
+    final_score = min(final_score, config.cap)
     
     # Return the calculated values
     return {
@@ -75,18 +47,129 @@ def calculate_mhabi(patient_data_row):
         "risk_amplified": amplified
     }
 
-def process_dataframe(df):
-    """Applies the MHABI calculation to an entire DataFrame."""
+def round_like_python(values, ndigits=2):
+    """
+    Rounds an array with Python's round() semantics.
+
+    np.round scales by 10**ndigits before rounding, which can disagree with the
+    built-in round() on values that sit near a half. Only those values are
+    rounded again with the built-in; the composite score takes few distinct
+    values, so that is done once per unique value and scattered back.
+    """
+    scaled = values * 10.0 ** ndigits
+    rounded = np.round(values, ndigits)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        uniques, inverse = np.unique(values[near_half], return_inverse=True)
+        rounded[near_half] = np.array([round(float(v), ndigits) for v in uniques], dtype=float)[inverse]
+    return rounded
+
+def calculate_mhabi_vectorized(df, config=None):
+    """
+    Calculates MHABI scores for every row of a DataFrame in whole-column operations.
+
+    Produces the same results as calling `calculate_mhabi` on each row.
+
+    Args:
+        df (pd.DataFrame): Raw patient inputs with the scoring profile's input columns.
+        config (ScoringConfig, optional): Compiled scoring profile. Defaults to
+            config/scoring/default.toml.
+
+    Returns:
+        dict: 'normalized_scores' (dict of factor name -> uint8 array),
+              'mhabi_score' (float64 array) and 'risk_amplified' (bool array).
+    """
+    config = _resolve_config(config)
+
+    # --- Step 1: Normalization ---
+    norm_scores = {
+        factor.label: factor.normalize(df[factor.column].to_numpy())
+        for factor in config.factors
+    }
+
+    # --- Step 2: Weighted Composite Score ---
+    # Accumulated in the same order as the scalar sum() so float results match bit for bit.
+    subtotal = np.zeros(len(df), dtype=float)
+    for factor in config.factors:
+        subtotal = subtotal + norm_scores[factor.label] * factor.weight
+
+    # --- Step 3: Risk Amplification Logic ---
+    amplified = np.ones(len(df), dtype=bool)
+    for column, minimum in config.amplification_minimums:
+        amplified &= df[column].to_numpy() >= minimum
+    final_score = np.where(amplified, subtotal * config.amplification_factor, subtotal)
+    final_score = np.minimum(final_score, config.cap)
+
+    return {
+        "mhabi_score": round_like_python(final_score, 2),
+        "normalized_scores": norm_scores,
+        "risk_amplified": amplified
+    }
+
+def normalized_scores_from_row(row, config=None):
+    """
+    Builds the factor name -> normalized score mapping for one processed row.
+
+    Args:
+        row (pd.Series or dict): A row produced by `process_dataframe`.
+        config (ScoringConfig, optional): The profile the row was scored with.
+
+    Returns:
+        dict: Normalized score per factor, in display order.
+    """
+    columns = _resolve_config(config).normalized_score_columns
+    return {name: int(row[column]) for name, column in columns.items()}
+
+@instrumented('process_dataframe')
+def process_dataframe(df, include_score_dicts=False, config=None, parallel=False, workers=None):
+    """
+    Applies the MHABI calculation to an entire DataFrame.
+
+    Sub-scores are written as one uint8 column per factor (see
+    NORMALIZED_SCORE_COLUMNS). The result is a shallow copy of `df` with the
+    score columns added, so the input columns are shared rather than copied.
+
+    Args:
+        df (pd.DataFrame): Raw patient inputs.
+        include_score_dicts (bool): Also add the legacy 'normalized_scores'
+            column holding one dict per row. Off by default because it is an
+            object column that cannot be persisted to Arrow/Parquet.
+        config (ScoringConfig, optional): Compiled scoring profile. Defaults to
+            config/scoring/default.toml.
+        parallel (bool): Score across processes (see `src.parallel`) when the
+            frame has at least PARALLEL_MIN_ROWS rows and more than one worker
+            is available; smaller frames are scored serially.
+        workers (int, optional): Worker processes for the parallel path.
+            Defaults to the usable CPU count.
+
+    Returns:
+        pd.DataFrame: The input columns plus 'mhabi_score', 'risk_amplified'
+        and the normalized sub-score columns.
+    """
     if df.empty:
         return df
 
-    # Use the more efficient .apply method now that calculation is stateless
-    results_series = df.apply(calculate_mhabi, axis=1)
+    config = _resolve_config(config)
+    results = None
+    if parallel:
+        from src.parallel import calculate_mhabi_parallel, should_parallelize
+
+        if should_parallelize(len(df), workers):
+            results = calculate_mhabi_parallel(df, config, workers)
+    if results is None:
+        results = calculate_mhabi_vectorized(df, config)
+
+    # Combine results with the original dataframe; the input columns are not copied
+    processed_df = df.copy(deep=False)
+    processed_df['mhabi_score'] = results['mhabi_score']
+    processed_df['risk_amplified'] = results['risk_amplified']
+    score_columns = config.normalized_score_columns
+    for name, column in score_columns.items():
+        processed_df[column] = results['normalized_scores'][name].astype(NORMALIZED_SCORE_DTYPE, copy=False)
 
-    # Combine results with the original dataframe
-    processed_df = df.copy()
-    processed_df['mhabi_score'] = results_series.apply(lambda x: x['mhabi_score'])
-    processed_df['risk_amplified'] = results_series.apply(lambda x: x['risk_amplified'])
-    processed_df['normalized_scores'] = results_series.apply(lambda x: x['normalized_scores'])
+    if include_score_dicts:
+        processed_df['normalized_scores'] = [
+            normalized_scores_from_row(row, config) for row in processed_df[list(score_columns.values())].to_dict('records')
+        ]
 
-    return processed_df
\ No newline at end of file
+    return processed_df
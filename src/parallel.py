@@ -0,0 +1,127 @@
+"""
+Multi-core scoring of very large frames over shared memory.
+
+The scoring inputs are packed once into a shared-memory block. Worker
+processes read their shard as zero-copy NumPy views, score it with
+`calculate_mhabi_vectorized` and write the results into a second
+shared-memory block, so neither the inputs nor the results are pickled
+between processes. Use it through `process_dataframe(df, parallel=True)`,
+which keeps the serial path for frames below PARALLEL_MIN_ROWS.
+
+The pool forks its workers, so call it only from single-threaded headless
+processes such as `src.score` and the benchmarks, never from the Streamlit
+server: a forked child inherits locks held by the server's other threads.
+"""
+import concurrent.futures
+import math
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.mhabi_algorithm import calculate_mhabi_vectorized
+
+# Below this many rows, process start-up costs more than a second core saves
+PARALLEL_MIN_ROWS = 2_000_000
+
+
+def default_workers():
+    """Usable CPU count for the current process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def should_parallelize(n_rows, workers=None, min_rows=PARALLEL_MIN_ROWS):
+    return n_rows >= min_rows and (workers or default_workers()) > 1
+
+
+def _output_layout(n_rows, n_factors):
+    """Byte offsets of the result arrays inside the output block: scores, flags, sub-scores."""
+    scores_end = n_rows * 8
+    flags_end = scores_end + n_rows
+    return scores_end, flags_end, flags_end + n_rows * n_factors
+
+
+def _output_views(buffer, n_rows, n_factors):
+    scores_end, flags_end, total = _output_layout(n_rows, n_factors)
+    scores = np.ndarray((n_rows,), dtype=np.float64, buffer=buffer, offset=0)
+    flags = np.ndarray((n_rows,), dtype=np.bool_, buffer=buffer, offset=scores_end)
+    sub_scores = np.ndarray((n_factors, n_rows), dtype=np.uint8, buffer=buffer, offset=flags_end)
+    return scores, flags, sub_scores
+
+
+def _score_shard(input_name, output_name, columns, n_rows, start, stop, config):
+    """Worker entry point: scores rows [start, stop) in place in shared memory."""
+    inputs = shared_memory.SharedMemory(name=input_name)
+    outputs = shared_memory.SharedMemory(name=output_name)
+    try:
+        matrix = np.ndarray((len(columns), n_rows), dtype=np.float64, buffer=inputs.buf)
+        # Each column is a view into the shared block, so building the frame copies nothing large
+        shard = pd.DataFrame({column: matrix[i, start:stop] for i, column in enumerate(columns)}, copy=False)
+        results = calculate_mhabi_vectorized(shard, config)
+
+        scores, flags, sub_scores = _output_views(outputs.buf, n_rows, len(config.factors))
+        scores[start:stop] = results['mhabi_score']
+        flags[start:stop] = results['risk_amplified']
+        for i, factor in enumerate(config.factors):
+            sub_scores[i, start:stop] = results['normalized_scores'][factor.label]
+        del matrix, shard, scores, flags, sub_scores
+    finally:
+        inputs.close()
+        outputs.close()
+
+
+def calculate_mhabi_parallel(df, config, workers=None, shard_rows=None):
+    """
+    Scores a frame across processes; the drop-in parallel counterpart of
+    `calculate_mhabi_vectorized`.
+
+    Args:
+        df (pd.DataFrame): Raw patient inputs with the profile's input columns.
+        config (ScoringConfig): Compiled scoring profile.
+        workers (int, optional): Worker processes. Defaults to the usable CPU count.
+        shard_rows (int, optional): Rows scored per task. Defaults to an even
+            split across the workers.
+
+    Returns:
+        dict: 'normalized_scores' (dict of factor name -> uint8 array),
+              'mhabi_score' (float64 array) and 'risk_amplified' (bool array).
+    """
+    workers = workers or default_workers()
+    columns = list(config.input_columns)
+    n_rows, n_factors = len(df), len(config.factors)
+    shard_rows = shard_rows or max(math.ceil(n_rows / workers), 1)
+
+    inputs = shared_memory.SharedMemory(create=True, size=max(len(columns) * n_rows * 8, 1))
+    outputs = shared_memory.SharedMemory(create=True, size=max(_output_layout(n_rows, n_factors)[2], 1))
+    try:
+        matrix = np.ndarray((len(columns), n_rows), dtype=np.float64, buffer=inputs.buf)
+        for i, column in enumerate(columns):
+            matrix[i] = df[column].to_numpy(dtype=np.float64)
+        del matrix
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_score_shard, inputs.name, outputs.name, columns, n_rows, start, min(start + shard_rows, n_rows), config)
+                for start in range(0, n_rows, shard_rows)
+            ]
+            for future in futures:
+                future.result()
+
+        # Copy the results out so the shared block can be released
+        scores, flags, sub_scores = _output_views(outputs.buf, n_rows, n_factors)
+        results = {
+            'mhabi_score': scores.copy(),
+            'normalized_scores': {factor.label: sub_scores[i].copy() for i, factor in enumerate(config.factors)},
+            'risk_amplified': flags.copy(),
+        }
+        del scores, flags, sub_scores
+        return results
+    finally:
+        inputs.close()
+        inputs.unlink()
+        outputs.close()
+        outputs.unlink()
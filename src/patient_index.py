@@ -0,0 +1,71 @@
+import numpy as np
+
+from src.mhabi_algorithm import normalized_scores_from_row
+
+DEFAULT_SEARCH_LIMIT = 20
+
+
+class PatientIndex:
+    """
+    Lookup structures over a scored patient frame for the drill-down.
+
+    A hash map from patient_id to row position gives O(1) retrieval, and a
+    sorted array of upper-cased IDs answers case-insensitive prefix
+    (typeahead) searches with two binary searches, so neither operation
+    scans the population.
+
+    Args:
+        df (pd.DataFrame): Scored patients (see `process_dataframe`). Treated
+            as read-only and not copied.
+        config (ScoringConfig, optional): The profile the frame was scored with.
+    """
+
+    def __init__(self, df, config=None):
+        self.df = df
+        self.config = config
+        ids = df['patient_id'].astype(str)
+        self._positions = dict(zip(ids.tolist(), range(len(ids))))
+        keys = ids.str.upper().to_numpy().astype(np.str_)
+        ids = ids.to_numpy()
+        order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[order]
+        self._sorted_ids = ids[order]
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._positions
+
+    def search(self, prefix, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Finds patient IDs starting with a prefix (case-insensitive).
+
+        Args:
+            prefix (str): Typed text; surrounding whitespace is ignored. An
+                empty prefix matches every patient.
+            limit (int): Maximum number of IDs returned.
+
+        Returns:
+            list: Up to `limit` matching IDs in sorted order.
+        """
+        prefix = prefix.strip().upper()
+        start = np.searchsorted(self._sorted_keys, prefix, side='left')
+        # Every key with the prefix sorts before prefix + the highest code point
+        stop = np.searchsorted(self._sorted_keys, prefix + '\U0010ffff', side='left')
+        return self._sorted_ids[start:min(stop, start + limit)].tolist()
+
+    def get(self, patient_id):
+        """Returns the scored record for a patient ID as a Series, or None."""
+        position = self._positions.get(patient_id)
+        return self.df.iloc[position] if position is not None else None
+
+    def sub_scores(self, patient_id):
+        """Returns the factor name -> normalized score mapping for a patient, or None."""
+        record = self.get(patient_id)
+        return normalized_scores_from_row(record, self.config) if record is not None else None
+
+    def records(self, patient_ids):
+        """Returns the scored records for several IDs, skipping unknown ones."""
+        positions = [self._positions[patient_id] for patient_id in patient_ids if patient_id in self._positions]
+        return self.df.iloc[positions] if positions else self.df.iloc[:0]
@@ -0,0 +1,449 @@
+import contextlib
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+PATIENT_COLUMNS = [
+    'patient_id', 'region', 'age_group', 'gender', 'wait_time_days',
+    'dalys', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score'
+]
+
+# Scoring inputs may be NULL: extracts can leave a cell blank, and a missing input scores in the top tier
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    age_group TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    wait_time_days INTEGER,
+    dalys REAL,
+    er_visits_last_year INTEGER,
+    missed_work_school_days INTEGER,
+    suicide_risk_score INTEGER,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_patient_id ON patients (patient_id);
+CREATE INDEX IF NOT EXISTS idx_patients_demographics ON patients (region, age_group, gender);
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO sequences (name, value) VALUES ('patient_id', 0);
+INSERT OR IGNORE INTO sequences (name, value) VALUES ('revision', 0);
+CREATE TABLE IF NOT EXISTS assessments (
+    week_start TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    assessed_at TEXT NOT NULL,
+    region TEXT NOT NULL,
+    age_group TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    wait_time_days INTEGER,
+    dalys REAL,
+    er_visits_last_year INTEGER,
+    missed_work_school_days INTEGER,
+    suicide_risk_score INTEGER,
+    revision INTEGER NOT NULL,
+    PRIMARY KEY (week_start, patient_id, assessed_at)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_assessments_patient ON assessments (patient_id, assessed_at);
+CREATE INDEX IF NOT EXISTS idx_assessments_revision ON assessments (revision);
+"""
+
+# Columns of the assessment log, which is keyed by (patient_id, assessed_at)
+ASSESSMENT_COLUMNS = ['patient_id', 'assessed_at'] + PATIENT_COLUMNS[1:]
+
+# UTC timestamps are stored as fixed-width ISO-8601 text, so they sort chronologically
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+WEEK_FORMAT = '%Y-%m-%d'
+
+# Run after _SCHEMA so databases created before a column existed pick it up
+_MIGRATIONS = {
+    'revision': "ALTER TABLE patients ADD COLUMN revision INTEGER NOT NULL DEFAULT 0",
+}
+_POST_MIGRATION = "CREATE INDEX IF NOT EXISTS idx_patients_revision ON patients (revision);"
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 900
+_ID_NUMBER = re.compile(r'(\d+)')
+
+
+class DuplicatePatientError(ValueError):
+    """Raised when inserted records reuse existing patient IDs."""
+
+    def __init__(self, patient_ids):
+        self.patient_ids = sorted(patient_ids)
+        preview = ', '.join(self.patient_ids[:5]) + (' ...' if len(self.patient_ids) > 5 else '')
+        super().__init__(f"Patient ID(s) already exist: {preview}")
+
+
+class DuplicateAssessmentError(ValueError):
+    """Raised when saved assessments repeat a (patient ID, assessment time) already in the log."""
+
+    def __init__(self, assessments):
+        self.assessments = sorted(assessments)
+        preview = ', '.join(f"{patient_id} at {assessed_at}" for patient_id, assessed_at in self.assessments[:5])
+        super().__init__(f"Assessment(s) already recorded: {preview}" + (' ...' if len(self.assessments) > 5 else ''))
+
+
+def format_patient_id(number):
+    return f"P{number:03d}"
+
+
+def next_patient_id_from(patient_ids):
+    """Suggests the ID after the highest numbered one in an iterable of IDs."""
+    return format_patient_id(max((_id_number(patient_id) for patient_id in patient_ids), default=0) + 1)
+
+
+def _id_number(patient_id):
+    match = _ID_NUMBER.search(str(patient_id))
+    return int(match.group(1)) if match else 0
+
+
+def assessment_times(df, assessed_at=None):
+    """
+    Resolves the assessment time of each record.
+
+    Args:
+        df (pd.DataFrame): Records, optionally with an 'assessed_at' column.
+            Times without a timezone are taken as UTC.
+        assessed_at (optional): Time used for every record when the frame has
+            no 'assessed_at' column. Defaults to now.
+
+    Returns:
+        tuple: (assessed_at, week_start) lists of strings in TIMESTAMP_FORMAT
+        and WEEK_FORMAT, where week_start is the Monday of the record's week.
+    """
+    if 'assessed_at' in df.columns:
+        times = pd.to_datetime(df['assessed_at'], utc=True)
+    else:
+        time = pd.Timestamp.now(tz='UTC') if assessed_at is None else pd.Timestamp(assessed_at)
+        time = time.tz_localize('UTC') if time.tzinfo is None else time.tz_convert('UTC')
+        times = pd.Series([time] * len(df), index=df.index)
+    times = times.dt.tz_convert(None)
+    weeks = times.dt.normalize() - pd.to_timedelta(times.dt.weekday, unit='D')
+    return times.dt.strftime(TIMESTAMP_FORMAT).tolist(), weeks.dt.strftime(WEEK_FORMAT).tolist()
+
+
+def read_records(conn, query, params=()):
+    """
+    Runs a query with `pd.read_sql_query`, keeping the scoring inputs numeric.
+
+    A result in which an input column is entirely NULL would otherwise come
+    back as an object column of None; it is returned as float64 NaN instead.
+    """
+    df = pd.read_sql_query(query, conn, params=params)
+    for column in PATIENT_COLUMNS[4:]:
+        if column in df.columns and df[column].dtype == object:
+            df[column] = pd.to_numeric(df[column]).astype('float64')
+    return df
+
+
+def _chunks(values, size=_MAX_PARAMS):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class PatientRepository:
+    """
+    Patient records in an embedded SQLite database (WAL mode).
+
+    patient_id has a unique index, so lookups and duplicate checks are index
+    seeks rather than scans. The next suggested ID comes from a sequence row
+    that is advanced inside the same transaction as each insert. Every write
+    stamps the affected rows with a new revision number, so consumers can pick
+    up changes with an indexed `revision > ?` query. Every inserted or updated
+    record is also appended to the `assessments` log, keyed by (patient_id,
+    assessed_at) and clustered by week, so the history of a patient survives
+    re-assessment. A new connection is opened
+    per operation so the repository can be shared across Streamlit sessions and
+    threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(patients)")}
+            for column, statement in _MIGRATIONS.items():
+                if column not in existing:
+                    conn.execute(statement)
+            conn.executescript(_POST_MIGRATION)
+
+    @contextlib.contextmanager
+    def connect(self):
+        """Opens a connection in autocommit mode."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs a write transaction that takes the database write lock up front."""
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # --- Lookups ---
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def count(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    def contains(self, patient_id):
+        """Returns True if a record with this patient ID exists."""
+        with self.connect() as conn:
+            row = conn.execute("SELECT 1 FROM patients WHERE patient_id = ?", (patient_id,)).fetchone()
+        return row is not None
+
+    def get(self, patient_id):
+        """Returns the record for a patient ID as a dict, or None."""
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def existing_ids(self, patient_ids, conn=None):
+        """Returns the subset of the given patient IDs that are already stored."""
+        patient_ids = list(dict.fromkeys(patient_ids))
+        if conn is None:
+            with self.connect() as conn:
+                return self.existing_ids(patient_ids, conn)
+        found = set()
+        for batch in _chunks(patient_ids):
+            placeholders = ', '.join('?' * len(batch))
+            rows = conn.execute(f"SELECT patient_id FROM patients WHERE patient_id IN ({placeholders})", batch)
+            found.update(row[0] for row in rows)
+        return found
+
+    def existing_assessments(self, assessments, conn=None):
+        """
+        Returns the subset of the given assessments that are already logged.
+
+        Args:
+            assessments (list): (patient_id, assessed_at) pairs, with times
+                formatted as by `assessment_times`.
+
+        Returns:
+            set: The pairs found in the assessment log.
+        """
+        assessments = list(dict.fromkeys(assessments))
+        if conn is None:
+            with self.connect() as conn:
+                return self.existing_assessments(assessments, conn)
+        found = set()
+        for batch in _chunks(assessments, _MAX_PARAMS // 2):
+            # A join (unlike a row-value IN) looks each pair up in the unique (patient_id, assessed_at) index
+            placeholders = ', '.join(['(?, ?)'] * len(batch))
+            rows = conn.execute(
+                f"SELECT a.patient_id, a.assessed_at FROM (VALUES {placeholders}) AS v "
+                "JOIN assessments AS a ON a.patient_id = v.column1 AND a.assessed_at = v.column2",
+                [value for assessment in batch for value in assessment]
+            )
+            found.update((patient_id, assessed_at) for patient_id, assessed_at in rows)
+        return found
+
+    def next_patient_id(self):
+        """Suggests the next patient ID without reserving it."""
+        with self.connect() as conn:
+            value = conn.execute("SELECT value FROM sequences WHERE name = 'patient_id'").fetchone()[0]
+        return format_patient_id(value + 1)
+
+    def current_revision(self):
+        """Returns the revision stamped on the most recent write."""
+        with self.connect() as conn:
+            return conn.execute("SELECT value FROM sequences WHERE name = 'revision'").fetchone()[0]
+
+    def reserve_patient_id(self):
+        """Atomically advances the ID sequence and returns the reserved ID."""
+        with self.transaction() as conn:
+            conn.execute("UPDATE sequences SET value = value + 1 WHERE name = 'patient_id'")
+            value = conn.execute("SELECT value FROM sequences WHERE name = 'patient_id'").fetchone()[0]
+        return format_patient_id(value)
+
+    # --- Reads (storage backend interface, see src.storage) ---
+    def read(self, filters=None):
+        """
+        Reads patient records, filtering in SQL.
+
+        Args:
+            filters (dict, optional): Column -> allowed values. A value of None
+                leaves that column unfiltered.
+
+        Returns:
+            pd.DataFrame: The matching records.
+        """
+        clauses, params = [], []
+        for column, values in (filters or {}).items():
+            if values is None:
+                continue
+            if column not in PATIENT_COLUMNS:
+                raise ValueError(f"Unknown filter column: {column}")
+            values = list(values)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+            params.extend(values)
+        query = f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self.connect() as conn:
+            return read_records(conn, query, params)
+
+    def distinct_values(self, column):
+        """Returns the sorted distinct values of a column."""
+        if column not in PATIENT_COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        with self.connect() as conn:
+            return [row[0] for row in conn.execute(f"SELECT DISTINCT {column} FROM patients ORDER BY {column}")]
+
+    # --- Writes ---
+    @staticmethod
+    def _next_revision(conn):
+        conn.execute("UPDATE sequences SET value = value + 1 WHERE name = 'revision'")
+        return conn.execute("SELECT value FROM sequences WHERE name = 'revision'").fetchone()[0]
+
+    @staticmethod
+    def _insert_rows(conn, df, revision, skip_duplicates=False):
+        ids = df['patient_id'].astype(str).tolist()
+        # tolist() yields Python scalars, which sqlite3 can bind directly
+        rows = list(zip(ids, *(df[column].tolist() for column in PATIENT_COLUMNS[1:])))
+        verb = "INSERT OR IGNORE" if skip_duplicates else "INSERT"
+        before = conn.total_changes
+        conn.executemany(
+            f"{verb} INTO patients ({', '.join(PATIENT_COLUMNS)}, revision) "
+            f"VALUES ({', '.join('?' * len(PATIENT_COLUMNS))}, {revision})",
+            rows
+        )
+        inserted = conn.total_changes - before
+        conn.execute(
+            "UPDATE sequences SET value = MAX(value, ?) WHERE name = 'patient_id'",
+            (max(_id_number(patient_id) for patient_id in ids),)
+        )
+        return inserted
+
+    @staticmethod
+    def _log_assessments(conn, df, revision, assessed_at=None):
+        """Appends records to the assessment log, stamped with the transaction's revision."""
+        if df.empty:
+            return
+        times, weeks = assessment_times(df, assessed_at)
+        rows = zip(weeks, df['patient_id'].astype(str).tolist(), times, *(df[column].tolist() for column in PATIENT_COLUMNS[1:]))
+        conn.executemany(
+            f"INSERT INTO assessments (week_start, {', '.join(ASSESSMENT_COLUMNS)}, revision) "
+            f"VALUES (?, {', '.join('?' * len(ASSESSMENT_COLUMNS))}, {revision})",
+            rows
+        )
+
+    def insert_many(self, df, skip_duplicates=False, assessed_at=None):
+        """
+        Inserts a batch of records in a single transaction and logs them as assessments.
+
+        Args:
+            df (pd.DataFrame): Records with the PATIENT_COLUMNS columns, and
+                optionally 'assessed_at' (see `assessment_times`).
+            skip_duplicates (bool): Silently skip records whose patient ID
+                already exists instead of rejecting the whole batch.
+            assessed_at (optional): Assessment time for every record. Defaults to now.
+
+        Returns:
+            int: The number of records inserted.
+
+        Raises:
+            DuplicatePatientError: If any patient ID already exists (or repeats
+                within the batch) and skip_duplicates is False.
+        """
+        if df.empty:
+            return 0
+        ids = df['patient_id'].astype(str)
+
+        repeated = ids.duplicated().to_numpy()
+
+        with self.transaction() as conn:
+            stored = self.existing_ids(ids.tolist(), conn)
+            if (stored or repeated.any()) and not skip_duplicates:
+                raise DuplicatePatientError(stored | set(ids[repeated]))
+            revision = self._next_revision(conn)
+            inserted = self._insert_rows(conn, df, revision, skip_duplicates)
+            # Only the records actually inserted (the first of any repeats) start a history
+            self._log_assessments(conn, df[~ids.isin(stored).to_numpy() & ~repeated], revision, assessed_at)
+        return inserted
+
+    def save_assessments(self, df, assessed_at=None):
+        """
+        Records an assessment per record, whether or not the patient is new.
+
+        New patients are inserted; existing patients have their current inputs
+        replaced unless a later assessment is already on file. Every record is
+        appended to the assessment log. All of it happens in one transaction.
+
+        Args:
+            df (pd.DataFrame): Records with the PATIENT_COLUMNS columns, and
+                optionally 'assessed_at' (see `assessment_times`). A patient
+                may appear several times at different times.
+            assessed_at (optional): Assessment time for every record. Defaults to now.
+
+        Returns:
+            tuple: (patients inserted, patients updated).
+
+        Raises:
+            DuplicateAssessmentError: If any record repeats an assessment that
+                is already logged; nothing is saved.
+        """
+        if df.empty:
+            return 0, 0
+        times, _ = assessment_times(df, assessed_at)
+        ordered = df.assign(assessed_at=times).sort_values('assessed_at', kind='stable')
+        # The latest assessment of each patient in the batch becomes their current record
+        latest = ordered.drop_duplicates('patient_id', keep='last')
+        ids = latest['patient_id'].astype(str)
+        columns = PATIENT_COLUMNS[1:]
+
+        with self.transaction() as conn:
+            recorded = self.existing_assessments(zip(ordered['patient_id'].astype(str), ordered['assessed_at']), conn)
+            if recorded:
+                raise DuplicateAssessmentError(recorded)
+            existing = ids.isin(self.existing_ids(ids.tolist(), conn)).to_numpy()
+            revision = self._next_revision(conn)
+            inserted = self._insert_rows(conn, latest[~existing], revision) if (~existing).any() else 0
+            before = conn.total_changes
+            conn.executemany(
+                f"UPDATE patients SET {', '.join(f'{column} = ?' for column in columns)}, revision = {revision} "
+                "WHERE patient_id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM assessments WHERE patient_id = ? AND assessed_at > ?)",
+                list(zip(*(latest.loc[existing, column].tolist() for column in columns),
+                         ids[existing].tolist(), ids[existing].tolist(), latest.loc[existing, 'assessed_at'].tolist()))
+            )
+            updated = conn.total_changes - before
+            self._log_assessments(conn, ordered, revision)
+        return inserted, updated
+
+    def assessments(self, patient_id):
+        """Returns a patient's assessment history (ASSESSMENT_COLUMNS), oldest first."""
+        with self.connect() as conn:
+            return read_records(
+                conn, f"SELECT {', '.join(ASSESSMENT_COLUMNS)} FROM assessments WHERE patient_id = ? ORDER BY assessed_at",
+                (patient_id,)
+            )
+
+    def insert(self, record):
+        """Inserts a single record given as a dict."""
+        return self.insert_many(pd.DataFrame([record]))
+
+    def append(self, df):
+        return self.insert_many(df)
@@ -0,0 +1,154 @@
+import numpy as np
+import plotly.graph_objects as go
+
+
+def box_from_summary(summary, dimension, title, labels):
+    """
+    Draws a box plot from precomputed quartiles and fences instead of raw points.
+
+    Args:
+        summary (pd.DataFrame): Output of `CubeSlice.by(dimension)`.
+        dimension (str): The column holding the category of each box.
+        title (str): Figure title.
+        labels (dict): Axis titles keyed by column name ('mhabi_score' and `dimension`).
+
+    Returns:
+        go.Figure: One box trace per category, so each gets its own colour.
+    """
+    fig = go.Figure()
+    for row in summary.itertuples(index=False):
+        category = getattr(row, dimension)
+        fig.add_trace(go.Box(
+            name=str(category), x=[category], q1=[row.q1], median=[row.median], q3=[row.q3],
+            lowerfence=[row.lowerfence], upperfence=[row.upperfence], mean=[row.mean], sd=[row.std],
+            boxpoints=False
+        ))
+    fig.update_layout(
+        title=title, xaxis_title=labels.get(dimension, dimension),
+        yaxis_title=labels.get('mhabi_score', 'mhabi_score'), legend_title_text=labels.get(dimension, dimension)
+    )
+    return fig
+
+
+# --- Large-cohort scatter plots ---
+# Above this many rows the scatter is drawn as binned densities rather than points;
+# the dashboard reads an override from MHABI_SCATTER_MAX_POINTS
+DEFAULT_MAX_POINTS = 5000
+DEFAULT_DENSITY_BINS = 80
+
+
+def sufficient_statistics(x, y):
+    """
+    Computes the sums an ordinary least squares fit of y on x needs.
+
+    Sums from separate chunks or cohorts can be added together before calling
+    `ols_from_statistics`, so the fit never has to revisit the rows.
+
+    Returns:
+        dict: 'n', 'sum_x', 'sum_y', 'sum_xx' and 'sum_xy'.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return {
+        'n': len(x), 'sum_x': x.sum(), 'sum_y': y.sum(),
+        'sum_xx': np.dot(x, x), 'sum_xy': np.dot(x, y),
+    }
+
+
+def ols_from_statistics(stats):
+    """
+    Fits y = intercept + slope * x from sufficient statistics.
+
+    Returns:
+        tuple: (slope, intercept), or None if x has no variance.
+    """
+    n = stats['n']
+    denominator = n * stats['sum_xx'] - stats['sum_x'] ** 2
+    if n < 2 or denominator <= 0:
+        return None
+    slope = (n * stats['sum_xy'] - stats['sum_x'] * stats['sum_y']) / denominator
+    intercept = (stats['sum_y'] - slope * stats['sum_x']) / n
+    return slope, intercept
+
+
+def _bin_edges(values, bins):
+    """Bin edges centred on the distinct values of discrete data, otherwise evenly spaced."""
+    uniques = np.unique(values)
+    if len(uniques) <= bins:
+        midpoints = (uniques[1:] + uniques[:-1]) / 2
+        return np.concatenate(([uniques[0] - 0.5], midpoints, [uniques[-1] + 0.5]))
+    return np.linspace(uniques[0], uniques[-1], bins + 1)
+
+
+def scatter_with_trendline(df, x, y, title, labels, max_points=DEFAULT_MAX_POINTS, bins=DEFAULT_DENSITY_BINS,
+                           statistics=None):
+    """
+    Draws y against x with an OLS trendline, using WebGL traces.
+
+    Cohorts of up to `max_points` rows are drawn point by point. Larger ones
+    are aggregated into at most `bins` x `bins` density cells, each drawn as
+    one marker coloured by its patient count, so the figure payload is
+    bounded regardless of the number of rows. The trendline is always fitted
+    on every row, from sufficient statistics: precomputed ones when given
+    (e.g. `CubeSlice.statistics`), otherwise sums over the rows.
+
+    Args:
+        df (pd.DataFrame): Rows with columns `x` and `y`.
+        x (str): Column on the horizontal axis.
+        y (str): Column on the vertical axis.
+        title (str): Figure title.
+        labels (dict): Axis titles keyed by column name.
+        max_points (int): Largest cohort drawn as individual points.
+        bins (int): Density cells per axis for larger cohorts.
+        statistics (dict, optional): Sufficient statistics of `y` on `x` for
+            the same rows (see `sufficient_statistics`).
+
+    Returns:
+        go.Figure: The scatter (or density) trace plus a trendline trace.
+    """
+    x_values = df[x].to_numpy(dtype=float)
+    y_values = df[y].to_numpy(dtype=float)
+    valid = ~(np.isnan(x_values) | np.isnan(y_values))
+    x_values, y_values = x_values[valid], y_values[valid]
+
+    fig = go.Figure()
+    if len(x_values) <= max_points:
+        fig.add_trace(go.Scattergl(
+            x=x_values, y=y_values, mode='markers', name='Patients', marker={'opacity': 0.6}
+        ))
+    elif len(x_values):
+        counts, x_edges, y_edges = np.histogram2d(
+            x_values, y_values, bins=[_bin_edges(x_values, bins), _bin_edges(y_values, bins)]
+        )
+        x_index, y_index = np.nonzero(counts)
+        cell_counts = counts[x_index, y_index]
+        # Colour on a log scale so sparse cells stay visible next to dense ones
+        decades = np.arange(int(np.log10(cell_counts.max())) + 1)
+        fig.add_trace(go.Scattergl(
+            x=(x_edges[x_index] + x_edges[x_index + 1]) / 2,
+            y=(y_edges[y_index] + y_edges[y_index + 1]) / 2,
+            mode='markers', name='Patients (binned)',
+            marker={
+                'color': np.log10(cell_counts), 'colorscale': 'Blues', 'size': 8, 'symbol': 'square',
+                'colorbar': {'title': 'Patients', 'tickvals': decades,
+                             'ticktext': [f"{10 ** power:,}" for power in decades]},
+            },
+            customdata=cell_counts, hovertemplate='%{x}, %{y}<br>%{customdata:,} patients<extra></extra>'
+        ))
+
+    if statistics is None:
+        statistics = sufficient_statistics(x_values, y_values)
+    fit = ols_from_statistics(statistics)
+    if fit is not None and len(x_values):
+        slope, intercept = fit
+        line_x = np.array([x_values.min(), x_values.max()])
+        fig.add_trace(go.Scattergl(
+            x=line_x, y=intercept + slope * line_x, mode='lines', name=f"OLS trend (slope {slope:.3g})",
+            line={'color': 'red'}
+        ))
+
+    fig.update_layout(
+        title=title, xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y),
+        legend={'orientation': 'h', 'y': -0.2}
+    )
+    return fig
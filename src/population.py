@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+
+from src.ingest import DEFAULT_CHUNK_SIZE, iter_emr_chunks, peak_rss_bytes
+from src.mhabi_algorithm import calculate_mhabi_vectorized
+
+
+class RunningSummary:
+    """
+    Running MHABI aggregates that can be updated one chunk at a time.
+
+    Only counts, sums and extremes are kept, so memory use does not grow with
+    the number of patients.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.score_sum_sq = 0.0
+        self.amplified_count = 0
+        self.min_score = math.inf
+        self.max_score = -math.inf
+
+    def update(self, scores, amplified):
+        """
+        Folds a batch of scores into the running totals.
+
+        Args:
+            scores (np.ndarray): MHABI scores for the batch.
+            amplified (np.ndarray): Boolean amplification flags for the batch.
+        """
+        if len(scores) == 0:
+            return
+        self.count += len(scores)
+        self.score_sum += float(scores.sum())
+        self.score_sum_sq += float(np.square(scores).sum())
+        self.amplified_count += int(amplified.sum())
+        self.min_score = min(self.min_score, float(scores.min()))
+        self.max_score = max(self.max_score, float(scores.max()))
+
+    def to_dict(self):
+        """Returns the aggregates as plain values (mean/std are population statistics)."""
+        if self.count == 0:
+            return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None,
+                    'amplified_count': 0, 'amplified_rate': None}
+        mean = self.score_sum / self.count
+        variance = max(self.score_sum_sq / self.count - mean * mean, 0.0)
+        return {
+            'count': self.count,
+            'mean': mean,
+            'std': math.sqrt(variance),
+            'min': self.min_score,
+            'max': self.max_score,
+            'amplified_count': self.amplified_count,
+            'amplified_rate': self.amplified_count / self.count,
+        }
+
+
+def summarize_emr_file(file_path, chunksize=DEFAULT_CHUNK_SIZE, group_by='region', config=None):
+    """
+    Computes a full-population MHABI summary by scoring a CSV extract chunk by chunk.
+
+    Each chunk is scored as it arrives and then discarded; only the running
+    aggregates are kept, so memory stays bounded by the chunk size.
+
+    Args:
+        file_path (str): The path to the CSV data file.
+        chunksize (int): Number of rows scored at a time.
+        group_by (str, optional): Column to break the summary down by.
+        config (ScoringConfig, optional): Compiled scoring profile.
+
+    Returns:
+        dict: 'overall' and 'groups' (group value -> aggregates) summaries,
+        'chunks' processed and the process 'peak_rss_bytes'.
+    """
+    overall = RunningSummary()
+    groups = {}
+    chunks = 0
+
+    for chunk in iter_emr_chunks(file_path, chunksize=chunksize):
+        results = calculate_mhabi_vectorized(chunk, config)
+        scores = results['mhabi_score']
+        amplified = results['risk_amplified']
+        overall.update(scores, amplified)
+
+        if group_by:
+            codes, uniques = chunk[group_by].factorize()
+            for code, value in enumerate(uniques):
+                mask = codes == code
+                groups.setdefault(value, RunningSummary()).update(scores[mask], amplified[mask])
+        chunks += 1
+
+    return {
+        'overall': overall.to_dict(),
+        'groups': {value: summary.to_dict() for value, summary in sorted(groups.items())},
+        'chunks': chunks,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
@@ -0,0 +1,155 @@
+"""
+Headless batch scoring for CSV and Parquet extracts.
+
+Usage:
+    python -m src.score data/extract.csv scored.parquet --workers 8
+
+Input chunks are scored in a process pool and written to the output in input
+order. Only the scoring stack (pandas, NumPy) is imported, never Streamlit or
+Plotly, so batch jobs start quickly.
+"""
+import argparse
+import concurrent.futures
+import functools
+import os
+import sys
+import time
+
+import pandas as pd
+
+from src.ingest import DEFAULT_CHUNK_SIZE, iter_record_chunks
+from src.mhabi_algorithm import process_dataframe
+from src.scoring_config import DEFAULT_CONFIG_PATH, load_scoring_config
+
+
+def _score_chunk(chunk, config_path):
+    """Worker entry point: scores one chunk with the given profile."""
+    return process_dataframe(chunk, config=load_scoring_config(config_path))
+
+
+class _OutputWriter:
+    """Writes scored chunks to a CSV file or a single Parquet file, one chunk at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        # Categorical dictionaries differ between chunks; write plain values so every chunk shares a schema
+        categorical = [column for column, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+        if categorical:
+            df = df.astype({column: str for column in categorical})
+
+        if self.is_csv:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(input_path, output_path, workers=None, chunksize=DEFAULT_CHUNK_SIZE,
+               config_path=DEFAULT_CONFIG_PATH, progress=None):
+    """
+    Scores a CSV or Parquet extract and writes the scored records.
+
+    Args:
+        input_path (str): A `.csv` file, a `.parquet` file or a Parquet dataset directory.
+        output_path (str): Destination `.csv` or `.parquet` file.
+        workers (int, optional): Worker processes. Defaults to the CPU count;
+            1 scores in the calling process.
+        chunksize (int): Rows per chunk handed to a worker.
+        config_path (str): The scoring profile to score with.
+        progress (callable, optional): Called as progress(rows_done, elapsed_seconds)
+            after each chunk is written.
+
+    Returns:
+        dict: 'rows', 'chunks', 'seconds' and 'rows_per_second'.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Validate the profile up front so a bad file fails before any work is queued
+    load_scoring_config(config_path)
+    score = functools.partial(_score_chunk, config_path=config_path)
+
+    writer = _OutputWriter(output_path)
+    rows = chunks = 0
+    start = time.perf_counter()
+
+    def emit(scored):
+        nonlocal rows, chunks
+        writer.write(scored)
+        rows += len(scored)
+        chunks += 1
+        if progress is not None:
+            progress(rows, time.perf_counter() - start)
+
+    try:
+        if workers == 1:
+            for chunk in iter_record_chunks(input_path, chunksize):
+                emit(score(chunk))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                # Bound the chunks in flight so memory stays proportional to the worker count
+                pending = []
+                for chunk in iter_record_chunks(input_path, chunksize):
+                    pending.append(pool.submit(score, chunk))
+                    if len(pending) >= 2 * workers:
+                        emit(pending.pop(0).result())
+                for future in pending:
+                    emit(future.result())
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def _print_progress(rows, elapsed):
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"\rScored {rows:,} rows ({rate:,.0f} rows/s)", end='', file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet EMR extract with the MHABI algorithm.")
+    parser.add_argument('input_path', help="Input .csv file, .parquet file or Parquet dataset directory.")
+    parser.add_argument('output_path', help="Output .csv or .parquet file.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk.")
+    parser.add_argument('--profile', default=DEFAULT_CONFIG_PATH, help="Scoring profile (TOML).")
+    parser.add_argument('--quiet', action='store_true', help="Do not report progress.")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = score_file(
+            args.input_path, args.output_path, workers=args.workers, chunksize=args.chunksize,
+            config_path=args.profile, progress=None if args.quiet else _print_progress
+        )
+    except (FileNotFoundError, ValueError, ImportError) as e:
+        print(f"Scoring failed: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Scored {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s) -> {args.output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
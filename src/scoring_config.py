@@ -0,0 +1,185 @@
+import functools
+import hashlib
+import operator
+import os
+import tomllib
+from dataclasses import dataclass
+
+import numpy as np
+
+# --- Locations ---
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'scoring')
+DEFAULT_CONFIG_PATH = os.path.join(CONFIG_DIR, 'default.toml')
+
+# Every tier score lies in 0-100
+NORMALIZED_SCORE_DTYPE = np.uint8
+
+# comparison -> (scalar operator, np.searchsorted side)
+_COMPARISONS = {
+    'le': (operator.le, 'left'),
+    'lt': (operator.lt, 'right'),
+    'eq': (operator.eq, 'left'),
+}
+
+
+class ScoringConfigError(ValueError):
+    """Raised when a scoring profile is malformed."""
+
+
+@dataclass(frozen=True, eq=False)
+class Factor:
+    """One compiled input factor: tier edges and the score for each tier."""
+    key: str
+    label: str
+    column: str
+    weight: float
+    comparison: str
+    edges: np.ndarray
+    scores: np.ndarray
+
+    @property
+    def output_column(self):
+        return f"norm_{self.key}"
+
+    def normalize(self, values):
+        """
+        Maps a whole column of raw values onto tier scores.
+
+        Args:
+            values (array-like): Raw input values.
+
+        Returns:
+            np.ndarray: uint8 tier scores.
+        """
+        values = np.asarray(values)
+        side = _COMPARISONS[self.comparison][1]
+        tiers = np.searchsorted(self.edges, values, side=side)
+        if self.comparison == 'eq':
+            # searchsorted finds the candidate edge; only an exact hit selects its tier
+            candidate = np.minimum(tiers, len(self.edges) - 1)
+            tiers = np.where(self.edges[candidate] == values, candidate, len(self.edges))
+        return self.scores[tiers]
+
+    def normalize_scalar(self, value):
+        """Maps a single raw value onto its tier score."""
+        compare = _COMPARISONS[self.comparison][0]
+        for edge, score in zip(self.edge_values, self.score_values):
+            if compare(value, edge):
+                return score
+        return self.score_values[-1]
+
+    @functools.cached_property
+    def edge_values(self):
+        return self.edges.tolist()
+
+    @functools.cached_property
+    def score_values(self):
+        return self.scores.tolist()
+
+
+@dataclass(frozen=True, eq=False)
+class ScoringConfig:
+    """A scoring profile compiled into arrays the scorer can evaluate in bulk."""
+    name: str
+    version: str
+    content_hash: str
+    factors: tuple
+    amplification_factor: float
+    amplification_minimums: tuple
+    cap: float
+
+    @property
+    def weights(self):
+        return np.array([factor.weight for factor in self.factors], dtype=float)
+
+    @property
+    def input_columns(self):
+        """Every column the profile reads: factor inputs, then amplification-only inputs."""
+        columns = [factor.column for factor in self.factors]
+        return columns + [column for column, _ in self.amplification_minimums if column not in columns]
+
+    @property
+    def normalized_score_columns(self):
+        """Factor label -> output column name, in scoring order."""
+        return {factor.label: factor.output_column for factor in self.factors}
+
+
+def _compile_factor(raw):
+    try:
+        factor = Factor(
+            key=raw['key'],
+            label=raw['label'],
+            column=raw['column'],
+            weight=float(raw['weight']),
+            comparison=raw.get('comparison', 'le'),
+            edges=np.asarray(raw['edges'], dtype=float),
+            scores=np.asarray(raw['scores'], dtype=NORMALIZED_SCORE_DTYPE),
+        )
+    except KeyError as e:
+        raise ScoringConfigError(f"Factor is missing required key {e}") from e
+
+    if factor.comparison not in _COMPARISONS:
+        raise ScoringConfigError(f"Factor '{factor.key}' has unknown comparison '{factor.comparison}'")
+    if len(factor.scores) != len(factor.edges) + 1:
+        raise ScoringConfigError(f"Factor '{factor.key}' needs exactly one more score than edges")
+    if np.any(np.diff(factor.edges) <= 0):
+        raise ScoringConfigError(f"Factor '{factor.key}' edges must be strictly increasing")
+    return factor
+
+
+@functools.lru_cache(maxsize=32)
+def _compile(content_hash, text):
+    try:
+        raw = tomllib.loads(text)
+    except tomllib.TOMLDecodeError as e:
+        raise ScoringConfigError(f"Invalid scoring profile: {e}") from e
+
+    factors = tuple(_compile_factor(factor) for factor in raw.get('factors', []))
+    if not factors:
+        raise ScoringConfigError("Scoring profile defines no factors")
+
+    amplification = raw.get('amplification', {})
+    return ScoringConfig(
+        name=raw.get('name', 'unnamed'),
+        version=str(raw.get('version', '0')),
+        content_hash=content_hash,
+        factors=factors,
+        amplification_factor=float(amplification.get('factor', 1.0)),
+        amplification_minimums=tuple(amplification.get('minimums', {}).items()),
+        cap=float(raw.get('composite', {}).get('cap', 100)),
+    )
+
+
+def load_scoring_config(path=DEFAULT_CONFIG_PATH):
+    """
+    Loads and compiles a scoring profile.
+
+    Compiled profiles are cached by the SHA-256 of the file contents, so
+    reloading an unchanged file (or switching back to a previously used
+    profile) does not recompile it.
+
+    Args:
+        path (str): Path to a TOML scoring profile.
+
+    Returns:
+        ScoringConfig: The compiled profile.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    return _compile(content_hash, content.decode('utf-8'))
+
+
+def list_scoring_profiles(directory=CONFIG_DIR):
+    """
+    Lists the scoring profiles available in a directory.
+
+    Returns:
+        dict: Profile name (file stem) -> path, sorted by name.
+    """
+    if not os.path.isdir(directory):
+        return {}
+    return {
+        os.path.splitext(name)[0]: os.path.join(directory, name)
+        for name in sorted(os.listdir(directory)) if name.endswith('.toml')
+    }
@@ -0,0 +1,378 @@
+"""
+MHABI scoring over HTTP for EHR integrations.
+
+Usage:
+    python -m src.service --port 8080 [--profile config/scoring/default.toml]
+
+Endpoints:
+    POST /score        One patient as a JSON object; returns one result object.
+    POST /score/batch  A JSON array of patients, or NDJSON (one patient per line)
+                       when sent with `Content-Type: application/x-ndjson`.
+                       Results come back in the same format and order.
+    GET  /metrics      Request counts and p50/p99 latency per endpoint, plus
+                       micro-batch statistics.
+    GET  /health       Liveness check.
+
+Concurrent single-patient requests are coalesced by a MicroBatcher and scored
+together with `calculate_mhabi_vectorized`, so per-request overhead stays flat
+under load. The server uses only the standard library's asyncio streams.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.mhabi_algorithm import calculate_mhabi_vectorized
+from src.scoring_config import DEFAULT_CONFIG_PATH, load_scoring_config
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class RequestError(Exception):
+    """An invalid request, reported to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Scoring ---
+def validate_patient(record, config):
+    """
+    Checks that a payload has a numeric value for every scoring input.
+
+    Raises:
+        RequestError: With status 400 if the record is unusable.
+    """
+    if not isinstance(record, dict):
+        raise RequestError(400, "Each patient must be a JSON object.")
+    for column in config.input_columns:
+        value = record.get(column)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RequestError(400, f"Field '{column}' must be a number.")
+
+
+def score_records(records, config):
+    """
+    Scores a list of validated patient payloads in one vectorized pass.
+
+    Returns:
+        list: One dict per record with 'mhabi_score', 'risk_amplified' and
+        'normalized_scores' (as returned by `calculate_mhabi`), plus
+        'patient_id' when the payload carried one.
+    """
+    df = pd.DataFrame.from_records(records, columns=config.input_columns)
+    results = calculate_mhabi_vectorized(df, config)
+    labels = list(results['normalized_scores'])
+    normalized = zip(*(results['normalized_scores'][label].tolist() for label in labels))
+    scored = []
+    for record, score, amplified, sub_scores in zip(
+        records, results['mhabi_score'].tolist(), results['risk_amplified'].tolist(), normalized
+    ):
+        result = {
+            'mhabi_score': score,
+            'normalized_scores': dict(zip(labels, sub_scores)),
+            'risk_amplified': amplified,
+        }
+        if 'patient_id' in record:
+            result = {'patient_id': record['patient_id'], **result}
+        scored.append(result)
+    return scored
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-patient requests into vectorized batches.
+
+    The first queued request starts a batch. The batcher then waits up to
+    `max_delay` seconds for more requests, up to `max_batch_size`, and scores
+    the whole batch in a worker thread. Requests that arrive while a batch is
+    being scored queue up for the next one, so batches grow with load.
+    """
+
+    def __init__(self, config, max_batch_size=512, max_delay=0.002):
+        self.config = config
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.batches = 0
+        self.records = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, record):
+        """Queues one validated patient and waits for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch_size and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                self._drain(batch)
+
+            records = [record for record, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, score_records, records, self.config)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.records += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'records': self.records,
+            'mean_batch_size': self.records / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+
+# --- Metrics ---
+class LatencyRecorder:
+    """Request count plus latency percentiles over a rolling window of recent requests."""
+
+    def __init__(self, window=10_000):
+        self.count = 0
+        self.errors = 0
+        self._latencies = collections.deque(maxlen=window)
+
+    def record(self, seconds, error=False):
+        self.count += 1
+        self.errors += int(error)
+        self._latencies.append(seconds)
+
+    def summary(self):
+        if not self._latencies:
+            return {'count': self.count, 'errors': self.errors, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+        return {'count': self.count, 'errors': self.errors, 'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3)}
+
+
+# --- HTTP ---
+class ScoringService:
+    """
+    A minimal HTTP/1.1 server (keep-alive, Content-Length bodies) for MHABI scoring.
+
+    Args:
+        config (ScoringConfig): The compiled scoring profile to score with.
+        max_batch_size (int): Largest micro-batch of single-patient requests.
+        max_delay (float): Seconds to wait for a micro-batch to fill.
+    """
+
+    def __init__(self, config, max_batch_size=512, max_delay=0.002):
+        self.config = config
+        self.batcher = MicroBatcher(config, max_batch_size, max_delay)
+        self.latency = collections.defaultdict(LatencyRecorder)
+        self.server = None
+        self._connections = set()
+        self._routes = {
+            ('POST', '/score'): self._score_one,
+            ('POST', '/score/batch'): self._score_batch,
+            ('GET', '/metrics'): self._metrics,
+            ('GET', '/health'): self._health,
+        }
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Starts listening; port 0 picks a free port (see `self.port`)."""
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            # Idle keep-alive connections would otherwise hold wait_closed() open
+            for writer in list(self._connections):
+                writer.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle_connection(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                keep_alive = True
+                route = None
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    headers = await self._read_headers(reader)
+                    keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                    body = await self._read_body(reader, headers)
+                    route = path.split('?', 1)[0]
+                    handler = self._routes.get((method, route))
+                    if handler is None:
+                        known = any(known_path == route for _, known_path in self._routes)
+                        raise RequestError(405 if known else 404, f"No route for {method} {route}")
+                    status, content_type, payload = await handler(body, headers)
+                except RequestError as e:
+                    status, content_type, payload = e.status, 'application/json', _json_bytes({'error': str(e)})
+                except ValueError:
+                    status, content_type, payload = 400, 'application/json', _json_bytes({'error': "Malformed request."})
+                    keep_alive = False
+                except Exception as e:
+                    status, content_type, payload = 500, 'application/json', _json_bytes({'error': str(e)})
+
+                self._write_response(writer, status, content_type, payload, keep_alive)
+                await writer.drain()
+                if route in ('/score', '/score/batch'):
+                    self.latency[route].record(time.perf_counter() - start, error=status != 200)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _read_body(reader, headers):
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise RequestError(411, "Chunked bodies are not supported; send Content-Length.")
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, f"Body exceeds {MAX_BODY_BYTES} bytes.")
+        return await reader.readexactly(length) if length else b''
+
+    @staticmethod
+    def _write_response(writer, status, content_type, payload, keep_alive):
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + payload)
+
+    # --- Handlers ---
+    async def _score_one(self, body, headers):
+        record = _parse_json(body)
+        validate_patient(record, self.config)
+        result = await self.batcher.submit(record)
+        return 200, 'application/json', _json_bytes(result)
+
+    async def _score_batch(self, body, headers):
+        ndjson = headers.get('content-type', '').startswith(NDJSON_CONTENT_TYPE)
+        if ndjson:
+            records = [_parse_json(line) for line in body.splitlines() if line.strip()]
+        else:
+            records = _parse_json(body)
+            if not isinstance(records, list):
+                raise RequestError(400, "Expected a JSON array of patients.")
+        for index, record in enumerate(records):
+            try:
+                validate_patient(record, self.config)
+            except RequestError as e:
+                raise RequestError(400, f"Patient {index}: {e}") from e
+
+        # A bulk payload is already a batch, so it bypasses the micro-batcher
+        results = await asyncio.get_running_loop().run_in_executor(None, score_records, records, self.config) if records else []
+        if ndjson:
+            return 200, NDJSON_CONTENT_TYPE, b''.join(_json_bytes(result) + b'\n' for result in results)
+        return 200, 'application/json', _json_bytes(results)
+
+    async def _metrics(self, body, headers):
+        return 200, 'application/json', _json_bytes({
+            'profile': self.config.name,
+            'endpoints': {route: recorder.summary() for route, recorder in self.latency.items()},
+            'batching': self.batcher.stats(),
+        })
+
+    async def _health(self, body, headers):
+        return 200, 'application/json', _json_bytes({'status': 'ok'})
+
+
+def _parse_json(data):
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError as e:
+        raise RequestError(400, f"Invalid JSON: {e}") from e
+
+
+def _json_bytes(value):
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+async def serve(host, port, config, max_batch_size, max_delay):
+    service = ScoringService(config, max_batch_size, max_delay)
+    server = await service.start(host, port)
+    print(f"Scoring with profile '{config.name}' on http://{host}:{service.port}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve MHABI scoring over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind.")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on.")
+    parser.add_argument('--profile', default=DEFAULT_CONFIG_PATH, help="Scoring profile (TOML).")
+    parser.add_argument('--max-batch', type=int, default=512, help="Largest micro-batch of single requests.")
+    parser.add_argument('--max-delay-ms', type=float, default=2.0, help="Milliseconds to wait for a micro-batch to fill.")
+    args = parser.parse_args(argv)
+
+    config = load_scoring_config(args.profile)
+    try:
+        asyncio.run(serve(args.host, args.port, config, args.max_batch, args.max_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import os
+import uuid
+
+import pandas as pd
+
+from src.instrumentation import instrumented
+from src.patient_store import PatientRepository, next_patient_id_from
+
+# Columns the dashboard sidebar filters on
+FILTER_COLUMNS = ['region', 'age_group', 'gender']
+
+
+def _normalize_filters(filters):
+    """Drops unset filters and turns the remaining value collections into lists."""
+    return {column: list(values) for column, values in (filters or {}).items() if values is not None}
+
+
+@instrumented('filter_mask')
+def apply_filters(df, filters):
+    """
+    Filters an in-memory frame.
+
+    Args:
+        df (pd.DataFrame): Records to filter.
+        filters (dict, optional): Column -> allowed values. A value of None
+            leaves that column unfiltered.
+
+    Returns:
+        pd.DataFrame: The matching records.
+    """
+    filters = _normalize_filters(filters)
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, values in filters.items():
+        mask &= df[column].isin(values)
+    return df[mask]
+
+
+class CsvStore:
+    """Patient records kept in a single CSV file. Filters are applied after parsing."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read(self, filters=None):
+        """
+        Reads patient records.
+
+        Args:
+            filters (dict, optional): Column -> allowed values. A value of None
+                leaves that column unfiltered.
+
+        Returns:
+            pd.DataFrame: The matching records.
+        """
+        return apply_filters(pd.read_csv(self.path), filters)
+
+    def distinct_values(self, column):
+        """Returns the sorted distinct values of a column."""
+        return sorted(pd.read_csv(self.path, usecols=[column])[column].dropna().unique())
+
+    def contains(self, patient_id):
+        """Returns True if a record with this patient ID exists (scans the ID column)."""
+        if not self.exists() or os.path.getsize(self.path) == 0:
+            return False
+        stored = pd.read_csv(self.path, usecols=['patient_id'], dtype={'patient_id': str})['patient_id']
+        return bool((stored == str(patient_id)).any())
+
+    def existing_ids(self, patient_ids):
+        """Returns the subset of the given patient IDs that are already stored (one scan of the ID column)."""
+        if not self.exists() or os.path.getsize(self.path) == 0:
+            return set()
+        stored = pd.read_csv(self.path, usecols=['patient_id'], dtype={'patient_id': str})['patient_id']
+        return set(stored[stored.isin(list(patient_ids))])
+
+    def next_patient_id(self):
+        """Suggests the next patient ID (scans the ID column)."""
+        if not self.exists() or os.path.getsize(self.path) == 0:
+            return next_patient_id_from([])
+        return next_patient_id_from(pd.read_csv(self.path, usecols=['patient_id'])['patient_id'])
+
+    def append(self, df):
+        """Appends records to the file, writing a header if the file is new or empty."""
+        write_header = not self.exists() or os.path.getsize(self.path) == 0
+        df.to_csv(self.path, mode='a', header=write_header, index=False)
+
+
+class ParquetStore:
+    """
+    Patient records kept as a Hive-partitioned Parquet dataset.
+
+    Filters are pushed down to the Arrow reader: partitions that cannot match
+    are never opened and row groups are skipped using their column statistics.
+    """
+
+    def __init__(self, path, partition_cols=('region',), row_group_size=64 * 1024):
+        self.path = path
+        self.partition_cols = list(partition_cols)
+        self.row_group_size = row_group_size
+
+    @staticmethod
+    def _arrow():
+        try:
+            import pyarrow.dataset as ds
+        except ImportError as e:
+            raise ImportError("Parquet storage requires pyarrow (pip install pyarrow).") from e
+        return ds
+
+    def _dataset(self):
+        ds = self._arrow()
+        return ds.dataset(self.path, format='parquet', partitioning='hive')
+
+    def exists(self):
+        return os.path.isdir(self.path) and any(
+            name.endswith('.parquet') for _, _, files in os.walk(self.path) for name in files
+        )
+
+    def read(self, filters=None):
+        """
+        Reads patient records, decoding only partitions and row groups that can match.
+
+        Args:
+            filters (dict, optional): Column -> allowed values. A value of None
+                leaves that column unfiltered.
+
+        Returns:
+            pd.DataFrame: The matching records.
+        """
+        ds = self._arrow()
+        expression = None
+        for column, values in _normalize_filters(filters).items():
+            condition = ds.field(column).isin(values)
+            expression = condition if expression is None else expression & condition
+        table = self._dataset().to_table(filter=expression)
+        df = table.to_pandas()
+        # Partition keys come back as dictionary-encoded categories; keep the plain string form
+        for column in self.partition_cols:
+            if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(str)
+        return df
+
+    def distinct_values(self, column):
+        """Returns the sorted distinct values of a column."""
+        values = self._dataset().to_table(columns=[column]).column(column).unique().to_pylist()
+        return sorted(str(value) for value in values if value is not None)
+
+    def contains(self, patient_id):
+        """Returns True if a record with this patient ID exists."""
+        if not self.exists():
+            return False
+        ds = self._arrow()
+        return self._dataset().count_rows(filter=ds.field('patient_id') == patient_id) > 0
+
+    def existing_ids(self, patient_ids):
+        """Returns the subset of the given patient IDs that are already stored."""
+        if not self.exists():
+            return set()
+        ds = self._arrow()
+        table = self._dataset().to_table(columns=['patient_id'], filter=ds.field('patient_id').isin(list(patient_ids)))
+        return set(table.column('patient_id').to_pylist())
+
+    def next_patient_id(self):
+        """Suggests the next patient ID (scans the ID column)."""
+        if not self.exists():
+            return next_patient_id_from([])
+        return next_patient_id_from(self._dataset().to_table(columns=['patient_id']).column('patient_id').to_pylist())
+
+    def append(self, df):
+        """Writes records as new files in their partitions; existing files are left untouched."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(
+            table, self.path, partition_cols=self.partition_cols,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet", row_group_size=self.row_group_size,
+            existing_data_behavior='overwrite_or_ignore'
+        )
+
+
+def store_type(path):
+    """
+    Returns the storage backend class for a path, without opening it.
+
+    A `.csv` file is read as CSV, a `.db`/`.sqlite` file as a SQLite patient
+    repository; anything else (a directory or `.parquet` path) is treated as a
+    partitioned Parquet dataset.
+    """
+    if path.lower().endswith('.csv'):
+        return CsvStore
+    if path.lower().endswith(('.db', '.sqlite')):
+        return PatientRepository
+    return ParquetStore
+
+
+def open_store(path):
+    """
+    Returns the storage backend for a path (see `store_type`).
+
+    Opening a patient database creates it, with its schema, if it does not exist.
+    """
+    return store_type(path)(path)
+
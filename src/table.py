@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+AMPLIFIED_ROW_STYLE = 'background-color: #ffcccc; color: black;'
+DEFAULT_SORT_COLUMN = 'mhabi_score'
+
+
+def amplified_row_styles(page, style=AMPLIFIED_ROW_STYLE):
+    """
+    Builds cell styles that highlight rows with amplified risk.
+
+    The mask is computed once over the 'risk_amplified' column and broadcast
+    across the columns, instead of styling row by row.
+
+    Returns:
+        pd.DataFrame: CSS strings shaped like `page`, for `Styler.apply(..., axis=None)`.
+    """
+    mask = page['risk_amplified'].to_numpy(dtype=bool)
+    styles = np.where(mask, style, '')
+    return pd.DataFrame(
+        np.broadcast_to(styles[:, None], page.shape), index=page.index, columns=page.columns
+    )
+
+
+class PatientTable:
+    """
+    A sortable, paginated view over a scored patient frame.
+
+    Sort orders are stable argsort indexes computed once per column and
+    direction (mhabi_score descending up front, others on first use) and
+    reused for every page, so paging never re-sorts. Only the rows of the
+    requested page are materialized.
+
+    Args:
+        df (pd.DataFrame): Scored patients (see `process_dataframe`). Treated
+            as read-only and not copied.
+        columns (list, optional): Columns to display. Defaults to all.
+    """
+
+    def __init__(self, df, columns=None):
+        self.df = df
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self._orders = {}
+        if DEFAULT_SORT_COLUMN in df.columns:
+            self.sort_order(DEFAULT_SORT_COLUMN, descending=True)
+
+    def __len__(self):
+        return len(self.df)
+
+    def page_count(self, page_size):
+        return max(math.ceil(len(self.df) / page_size), 1)
+
+    def sort_order(self, column, descending=False):
+        """Returns row positions that sort the frame by `column`; ties keep frame order and missing values go last."""
+        key = (column, descending)
+        if key not in self._orders:
+            keys = self._sort_keys(column)
+            # Negating the keys, rather than reversing the ascending order, keeps ties in frame order
+            self._orders[key] = np.argsort(-keys if descending else keys, kind='stable')
+        return self._orders[key]
+
+    def _sort_keys(self, column):
+        """Float keys that order like `column`, with NaN for missing values (argsort puts NaN last)."""
+        values = self.df[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            return values.to_numpy(dtype='float64', na_value=np.nan)
+        # Sorting integer codes is much faster than comparing Python objects
+        codes = pd.factorize(values, sort=True)[0].astype('float64')
+        codes[codes < 0] = np.nan
+        return codes
+
+    def page(self, page_number, page_size=50, sort_by=DEFAULT_SORT_COLUMN, descending=True):
+        """
+        Materializes one page of the table.
+
+        Args:
+            page_number (int): 1-based page number; clamped to the valid range.
+            page_size (int): Rows per page.
+            sort_by (str, optional): Column to sort by, or None for frame order.
+            descending (bool): Sort direction.
+
+        Returns:
+            pd.DataFrame: The page's rows in the display columns.
+        """
+        page_number = min(max(page_number, 1), self.page_count(page_size))
+        start = (page_number - 1) * page_size
+        if sort_by is None:
+            rows = np.arange(start, min(start + page_size, len(self.df)))
+        else:
+            rows = self.sort_order(sort_by, descending)[start:start + page_size]
+        return self.df.iloc[rows][self.columns]
+
+    def styled_page(self, page_number, page_size=50, sort_by=DEFAULT_SORT_COLUMN, descending=True):
+        """Returns `page(...)` as a Styler with amplified rows highlighted."""
+        page = self.page(page_number, page_size, sort_by, descending)
+        return page.style.apply(amplified_row_styles, axis=None)
@@ -0,0 +1,97 @@
+import numpy as np
+
+from src.mhabi_algorithm import round_like_python
+
+# Score histogram bin width used for before/after distributions
+DISTRIBUTION_BIN_WIDTH = 2
+
+
+class WhatIfModel:
+    """
+    Rescores a scored population under alternative weights at interactive speed.
+
+    The normalized sub-scores do not depend on the weights, so they are cached
+    once as a (factors x patients) matrix alongside the amplification mask.
+    A new weight vector is then a weighted sum of its rows plus the
+    amplification and cap, with no re-normalization of the raw inputs.
+
+    Args:
+        df (pd.DataFrame): Patients scored with `config` (see `process_dataframe`).
+        config (ScoringConfig): The profile the frame was scored with; supplies
+            the baseline weights, amplification factor and cap.
+    """
+
+    def __init__(self, df, config):
+        self.config = config
+        self.labels = [factor.label for factor in config.factors]
+        columns = [factor.output_column for factor in config.factors]
+        self.components = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64).T)
+        self.amplified = df['risk_amplified'].to_numpy(dtype=bool)
+        self.baseline = df['mhabi_score'].to_numpy(dtype=np.float64)
+
+    def __len__(self):
+        return len(self.baseline)
+
+    @property
+    def baseline_weights(self):
+        """Factor label -> weight under the scoring profile."""
+        return dict(zip(self.labels, self.config.weights.tolist()))
+
+    def rescore(self, weights=None, amplification_factor=None):
+        """
+        Computes every patient's score under alternative parameters.
+
+        Args:
+            weights (dict, optional): Factor label -> weight. Factors left out
+                keep their profile weight.
+            amplification_factor (float, optional): Multiplier for patients
+                meeting the amplification rule. Defaults to the profile's.
+
+        Returns:
+            np.ndarray: Scores rounded to two decimals, in frame order.
+        """
+        weight_vector = np.array(
+            [(weights or {}).get(label, weight) for label, weight in self.baseline_weights.items()], dtype=np.float64
+        )
+        if amplification_factor is None:
+            amplification_factor = self.config.amplification_factor
+        # Summed and rounded like calculate_mhabi_vectorized rather than with a
+        # matrix product, so a scenario equal to some profile scores identically to it
+        scores = np.zeros(len(self), dtype=np.float64)
+        for components, weight in zip(self.components, weight_vector):
+            scores = scores + components * weight
+        scores = np.where(self.amplified, scores * amplification_factor, scores)
+        return round_like_python(np.minimum(scores, self.config.cap), 2)
+
+    def compare(self, weights=None, amplification_factor=None, bin_width=DISTRIBUTION_BIN_WIDTH):
+        """
+        Summarizes how a what-if scenario shifts the score distribution.
+
+        Returns:
+            dict: 'scores' (the scenario scores), 'before' and 'after' (each
+            with 'mean', 'median', 'p90' and the histogram 'counts'), 'bins'
+            (histogram edges shared by both), 'changed' (patients whose score
+            moved) and 'mean_change'.
+        """
+        scores = self.rescore(weights, amplification_factor)
+        upper = max(self.config.cap, float(self.baseline.max(initial=0)), float(scores.max(initial=0)))
+        bins = np.arange(0, upper + bin_width, bin_width)
+
+        def describe(values):
+            if len(values) == 0:
+                return {'mean': None, 'median': None, 'p90': None, 'counts': np.zeros(len(bins) - 1, dtype=np.int64)}
+            median, p90 = np.percentile(values, [50, 90])
+            return {
+                'mean': float(values.mean()), 'median': float(median), 'p90': float(p90),
+                'counts': np.histogram(values, bins=bins)[0],
+            }
+
+        delta = scores - self.baseline
+        return {
+            'scores': scores,
+            'before': describe(self.baseline),
+            'after': describe(scores),
+            'bins': bins,
+            'changed': int(np.count_nonzero(np.abs(delta) >= 0.005)),
+            'mean_change': float(delta.mean()) if len(delta) else 0.0,
+        }
@@ -0,0 +1,76 @@
+"""Shared assertions for the test suite."""
+import numpy as np
+import pandas as pd
+
+from src.mhabi_algorithm import calculate_mhabi, normalized_scores_from_row
+
+# A two-factor profile whose amplification reads an input that is not one of its factors
+REGIONAL_PROFILE = '''
+name = "regional"
+version = "2"
+
+[[factors]]
+key = "wait_time"
+label = "Wait Time"
+column = "wait_time_days"
+weight = 0.5
+comparison = "lt"
+edges = [14, 60]
+scores = [20, 60, 100]
+
+[[factors]]
+key = "er_visits"
+label = "ER Utilization"
+column = "er_visits_last_year"
+weight = 0.5
+comparison = "eq"
+edges = [0, 1]
+scores = [0, 50, 100]
+
+[amplification]
+factor = 1.25
+
+[amplification.minimums]
+suicide_risk_score = 8
+
+[composite]
+cap = 90
+'''
+
+
+def score_rowwise(df, config=None):
+    """Scores every row with the scalar `calculate_mhabi`, the reference implementation."""
+    return [calculate_mhabi(row, config) for row in df.to_dict('records')]
+
+
+def assert_matches_rowwise(df, scored, config=None):
+    """
+    Asserts that a scored frame agrees exactly with per-row `calculate_mhabi`.
+
+    Args:
+        df (pd.DataFrame): The raw inputs.
+        scored (pd.DataFrame): The output of `process_dataframe` for `df`.
+        config (ScoringConfig, optional): The profile `scored` was produced with.
+    """
+    expected = score_rowwise(df, config)
+    assert len(scored) == len(expected)
+    np.testing.assert_array_equal(scored['mhabi_score'].to_numpy(dtype=float), [r['mhabi_score'] for r in expected])
+    np.testing.assert_array_equal(scored['risk_amplified'].to_numpy(dtype=bool), [r['risk_amplified'] for r in expected])
+    rows = scored.to_dict('records')
+    assert [normalized_scores_from_row(row, config) for row in rows] == [r['normalized_scores'] for r in expected]
+
+
+def patients(n, seed=0):
+    """Random raw patient inputs spanning every tier of the default profile."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'patient_id': [f"P{i:06d}" for i in range(n)],
+        'region': rng.choice(['North', 'South', 'East', 'West'], n),
+        'age_group': rng.choice(['18-24', '25-34', '35-44', '45-54', '55+'], n),
+        'gender': rng.choice(['Female', 'Male', 'Non-binary'], n),
+        'wait_time_days': rng.integers(0, 200, n),
+        'dalys': rng.integers(0, 50, n) / 100,
+        'er_visits_last_year': rng.integers(0, 6, n),
+        'missed_work_school_days': rng.integers(0, 40, n),
+        'suicide_risk_score': rng.integers(1, 11, n),
+    })
@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from src.bulk_import import import_records
+from src.patient_store import DuplicatePatientError, PatientRepository
+from tests.helpers import patients
+
+
+class RacingStore:
+    """A store without assessment history where other sessions save `races` IDs between our check and append."""
+
+    def __init__(self, races):
+        self.races = list(races)
+        self.saved = []
+        self.appends = 0
+
+    def exists(self):
+        return True
+
+    def existing_ids(self, patient_ids):
+        return set()
+
+    def append(self, df):
+        self.appends += 1
+        if self.races:
+            raise DuplicatePatientError(self.races.pop(0))
+        self.saved.append(df)
+
+
+def test_retries_until_the_batch_is_clean():
+    df = patients(10)
+    store = RacingStore([['P000002', 'P000005'], ['P000007']])
+    result = import_records(store, df)
+
+    assert store.appends == 3
+    assert result['inserted'] == 7
+    assert list(result['rejected']['patient_id']) == ['P000002', 'P000005', 'P000007']
+    assert set(result['rejected']['reason']) == {"patient ID already exists"}
+    saved = pd.concat(store.saved)
+    assert list(saved['patient_id']) == list(result['scored']['patient_id'])
+    assert set(saved['patient_id']).isdisjoint(result['rejected']['patient_id'])
+
+
+def test_every_id_taken_saves_nothing():
+    df = patients(3)
+    store = RacingStore([['P000000'], ['P000001', 'P000002']])
+    result = import_records(store, df)
+
+    assert store.saved == [] and store.appends == 2
+    assert result['inserted'] == 0 and result['scored'].empty
+    assert len(result['rejected']) == 3
+
+
+def test_conflict_outside_the_batch_is_raised():
+    store = RacingStore([['P999999']])
+    with pytest.raises(DuplicatePatientError):
+        import_records(store, patients(3))
+
+
+def upload(n, seed=0):
+    """An upload backfilling one assessment per patient, as read from CSV."""
+    times = pd.Timestamp('2025-02-03 09:00') + pd.to_timedelta(range(n), unit='D')
+    return patients(n, seed=seed).assign(assessed_at=times.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def test_uploading_the_same_assessments_twice_rejects_the_repeats(tmp_path):
+    repository = PatientRepository(str(tmp_path / 'patients.db'))
+    first = import_records(repository, upload(20))
+    assert first['inserted'] == 20 and first['rejected'].empty
+
+    later = upload(25, seed=1).tail(5).assign(patient_id=lambda df: ['P000001', 'P000002', 'N1', 'N2', 'N3'])
+    again = import_records(repository, pd.concat([upload(20), later], ignore_index=True))
+    assert again['inserted'] == 5
+    assert again['reassessed'] == 2
+    assert len(again['rejected']) == 20
+    assert set(again['rejected']['reason']) == {"assessment already recorded"}
+    assert list(again['rejected']['row']) == list(range(1, 21))
+    assert len(repository.assessments('P000001')) == 2
+
+
+def test_assessments_saved_by_another_session_are_rejected_on_retry(tmp_path, monkeypatch):
+    repository = PatientRepository(str(tmp_path / 'patients.db'))
+    import_records(repository, upload(3))
+    # The pre-check misses them, as if another session saved them in between
+    check = PatientRepository.existing_assessments
+    monkeypatch.setattr(repository, 'existing_assessments',
+                        lambda assessments, conn=None: check(repository, assessments, conn) if conn else set())
+
+    result = import_records(repository, pd.concat([upload(3), upload(4).tail(1)], ignore_index=True))
+    assert result['inserted'] == 1
+    assert list(result['rejected']['patient_id']) == ['P000000', 'P000001', 'P000002']
+    assert list(result['scored']['patient_id']) == ['P000003']
+
+
+def test_scores_cover_only_the_saved_rows_of_a_repeated_patient(tmp_path, monkeypatch):
+    repository = PatientRepository(str(tmp_path / 'patients.db'))
+    import_records(repository, upload(1))
+    check = PatientRepository.existing_assessments
+    monkeypatch.setattr(repository, 'existing_assessments',
+                        lambda assessments, conn=None: check(repository, assessments, conn) if conn else set())
+
+    # P000000 again at the time another session just saved, and once more a week later
+    later = upload(1).assign(assessed_at='2025-02-10 09:00:00', suicide_risk_score=10)
+    result = import_records(repository, pd.concat([upload(1), later], ignore_index=True))
+    assert result['inserted'] == 1
+    assert list(result['rejected']['row']) == [1]
+    assert len(result['scored']) == 1
+    assert result['scored'].iloc[0]['suicide_risk_score'] == 10
+    assert len(repository.assessments('P000000')) == 2
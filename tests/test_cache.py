@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import DiskCache, LRUCache, cache_data, cache_resource, configure_cache, make_key, source_fingerprint
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def read_csv(calls):
+    def read_csv(path):
+        calls.append(path)
+        return pd.read_csv(path)
+    return read_csv
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'patients.csv'
+    pd.DataFrame({'patient_id': ['P001', 'P002'], 'score': [1.0, 2.0]}).to_csv(path, index=False)
+    return str(path)
+
+
+def touch_later(path):
+    """Moves a file's modification time forward, as a later edit would."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture(params=['lru', 'disk'])
+def backend(request, tmp_path):
+    return LRUCache() if request.param == 'lru' else DiskCache(str(tmp_path / 'cache'))
+
+
+@pytest.fixture
+def cached_read(backend, read_csv):
+    configure_cache(data=backend)
+    yield cache_data(read_csv)
+    configure_cache(data=LRUCache())
+
+
+def test_results_are_memoized(cached_read, source, calls):
+    first = cached_read(source)
+    second = cached_read(source)
+    assert calls == [source]
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_returned_frames_are_independent(cached_read, source):
+    first = cached_read(source)
+    first.loc[0, 'score'] = 99.0
+    first['extra'] = 1
+    assert cached_read(source)['score'].tolist() == [1.0, 2.0]
+    assert 'extra' not in cached_read(source)
+
+
+def test_lru_hits_share_frame_buffers(read_csv, source):
+    configure_cache(data=LRUCache())
+    cached = cache_data(read_csv)
+    first, second = cached(source), cached(source)
+    assert first is not second
+    assert np.shares_memory(first['score'].to_numpy(), second['score'].to_numpy())
+    second.loc[0, 'score'] = 99.0
+    assert cached(source)['score'].tolist() == [1.0, 2.0]
+
+
+def test_editing_the_source_invalidates(cached_read, source, calls):
+    cached_read(source)
+    with open(source, 'a') as f:
+        f.write('P003,3.0\n')
+    assert len(cached_read(source)) == 3
+    touch_later(source)
+    cached_read(source)
+    assert calls == [source] * 3
+
+
+def test_clear(cached_read, source, calls):
+    cached_read(source)
+    cached_read.clear()
+    cached_read(source)
+    assert calls == [source] * 2
+
+
+def test_lru_evicts_least_recently_used(read_csv, calls, tmp_path):
+    memoized = LRUCache(maxsize=2).memoize(lambda key: calls.append(key) or key)
+    for key in ['a', 'b', 'a', 'c', 'a', 'b']:
+        memoized(key)
+    assert calls == ['a', 'b', 'c', 'b']
+
+
+def test_disk_cache_survives_a_new_backend(source, read_csv, calls, tmp_path):
+    directory = str(tmp_path / 'cache')
+    DiskCache(directory).memoize(read_csv)(source)
+    DiskCache(directory).memoize(read_csv)(source)
+    assert calls == [source]
+
+
+def test_resources_are_shared_not_copied():
+    configure_cache(resource=LRUCache())
+    opened = cache_resource(lambda name: {'name': name})
+    assert opened('db') is opened('db')
+
+
+def test_source_fingerprint(tmp_path, source):
+    dataset = tmp_path / 'dataset'
+    (dataset / 'region=North').mkdir(parents=True)
+    fingerprint = source_fingerprint((source, 'not-a-path', 3), {'dataset': str(dataset)})
+    assert [entry[0] for entry in fingerprint] == [source, str(dataset)]
+    before = source_fingerprint((str(dataset),), {})
+    os.utime(dataset / 'region=North', ns=(0, os.stat(dataset).st_mtime_ns + 10**9))
+    assert source_fingerprint((str(dataset),), {}) != before
+    assert make_key(('a',), {'b': 1}) == make_key(('a',), {'b': 1})
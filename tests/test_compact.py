@@ -0,0 +1,132 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import compact
+from src.cache import LRUCache, configure_cache
+from src.compact import MappedFrameCache, SharedFrame, compact_frame, conform, read_mapped_frame, use_mapped_frames, write_frame
+from src.data_loader import load_scored_data
+from src.mhabi_algorithm import process_dataframe
+from tests.helpers import patients
+
+
+@pytest.fixture
+def builds():
+    return []
+
+
+@pytest.fixture
+def build(builds):
+    """Builds a scored frame, recording each build."""
+    def build(n=200):
+        builds.append(n)
+        return process_dataframe(patients(n))
+    return build
+
+
+@pytest.fixture
+def fresh_cache():
+    configure_cache(data=LRUCache(), resource=LRUCache())
+    yield
+    configure_cache(data=LRUCache(), resource=LRUCache())
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    directory = str(tmp_path / 'frames')
+    use_mapped_frames(directory)
+    yield directory
+    use_mapped_frames(None)
+
+
+def test_conform_leaves_its_inputs_untouched():
+    frame = compact_frame(pd.DataFrame({'region': ['North', 'South'], 'wait_time_days': [3, 40]}))
+    rows = pd.DataFrame({'region': ['Central'], 'wait_time_days': [float('nan')]})
+    before_frame, before_rows = frame.copy(), rows.copy()
+
+    conformed, conformed_rows = conform(frame, rows)
+
+    pd.testing.assert_frame_equal(frame, before_frame)
+    pd.testing.assert_frame_equal(rows, before_rows)
+    assert list(conformed['region'].cat.categories) == ['Central', 'North', 'South']
+    assert conformed['wait_time_days'].dtype == conformed_rows['wait_time_days'].dtype == 'float64'
+    assert conformed_rows['region'].dtype == conformed['region'].dtype
+    combined = pd.concat([conformed, conformed_rows], ignore_index=True)
+    assert isinstance(combined['region'].dtype, pd.CategoricalDtype)
+
+
+def test_conform_widens_narrow_counts():
+    frame = compact_frame(pd.DataFrame({'wait_time_days': [3, 40]}))
+    assert frame['wait_time_days'].dtype == 'int8'
+    conformed, rows = conform(frame, pd.DataFrame({'wait_time_days': [1000]}))
+    assert conformed['wait_time_days'].dtype == rows['wait_time_days'].dtype == 'int16'
+    assert frame['wait_time_days'].dtype == 'int8'
+
+
+# --- Memory-mapped snapshots ---
+def test_mapped_frame_round_trip_shares_the_file(tmp_path):
+    import pyarrow as pa
+
+    df = compact_frame(process_dataframe(patients(20_000)))
+    path = str(tmp_path / 'frame.arrow')
+    write_frame(df, path)
+    allocated = pa.total_allocated_bytes()
+    mapped = read_mapped_frame(path)
+
+    pd.testing.assert_frame_equal(mapped, df)
+    # Only categorical codes and booleans are decoded; a float64 column alone would be 8 bytes a row
+    assert pa.total_allocated_bytes() - allocated < len(df) * 8
+    assert not mapped['mhabi_score'].to_numpy().flags.writeable
+    assert os.listdir(tmp_path) == ['frame.arrow']
+
+
+def test_mapped_cache_builds_each_version_once_and_drops_stale_files(tmp_path, build, builds):
+    directory = str(tmp_path / 'frames')
+    first = MappedFrameCache(directory).load('patients.csv', 1, build)
+    # Another process finds the snapshot on disk instead of building it
+    again = MappedFrameCache(directory).load('patients.csv', 1, build)
+    other = MappedFrameCache(directory).load('other.csv', 1, build)
+    assert builds == [200, 200]
+    pd.testing.assert_frame_equal(again, first)
+
+    updated = MappedFrameCache(directory).load('patients.csv', 2, lambda: build(250))
+    assert builds == [200, 200, 250] and len(updated) == 250
+    cache = MappedFrameCache(directory)
+    assert sorted(os.listdir(directory)) == sorted(
+        os.path.basename(cache.path(name, version)) for name, version in [('patients.csv', 2), ('other.csv', 1)]
+    )
+    assert len(other) == 200
+
+
+# --- Shared snapshots ---
+def test_shared_frame_rebuilds_only_for_a_new_version(build, builds):
+    shared = SharedFrame('patients.csv', build)
+    assert shared.peek('v1') is None and builds == []
+    frame = shared.get('v1')
+    assert shared.get('v1') is frame and shared.peek('v1') is frame
+    assert shared.peek('v2') is None and builds == [200]
+    assert shared.get('v2') is not frame and builds == [200, 200]
+    assert frame['region'].dtype == 'category'
+
+
+def test_shared_frame_maps_its_snapshot(mapped, build, builds):
+    shared = SharedFrame('patients.csv', build)
+    frame = shared.get('v1')
+    assert os.listdir(mapped) == [os.path.basename(compact._mapped_cache.path('patients.csv', 'v1'))]
+    assert not frame['dalys'].to_numpy().flags.writeable
+    # A new session (or process) maps the existing snapshot rather than rebuilding it
+    assert len(SharedFrame('patients.csv', build).get('v1')) == 200 and builds == [200]
+
+
+def test_mapped_snapshot_is_invalidated_when_the_source_changes(tmp_path, mapped, fresh_cache):
+    path = tmp_path / 'patients.csv'
+    patients(200).to_csv(path, index=False)
+    assert len(load_scored_data(str(path))) == 200
+
+    patients(10).assign(patient_id=lambda df: 'N' + df['patient_id']).to_csv(path, mode='a', header=False, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    scored = load_scored_data(str(path))
+    assert len(scored) == 210 and 'NP000009' in set(scored['patient_id'])
+    assert len(os.listdir(mapped)) == 1
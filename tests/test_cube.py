@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from src.cube import MISSING_LABEL, AggregateCube
+from src.materialize import ScoreMaterializer
+from src.mhabi_algorithm import DEFAULT_CONFIG, process_dataframe
+from src.patient_store import PatientRepository
+from tests.helpers import patients
+
+
+@pytest.fixture
+def scored():
+    return process_dataframe(patients(2000, seed=5))
+
+
+def test_slice_matches_pandas(scored):
+    filters = {'region': ['North', 'West'], 'gender': ['Female']}
+    expected = scored[scored['region'].isin(filters['region']) & scored['gender'].isin(filters['gender'])]
+    summary = AggregateCube.from_frame(scored).query(filters).by('age_group')
+    grouped = expected.groupby('age_group')['mhabi_score']
+    assert summary['age_group'].tolist() == sorted(expected['age_group'].unique())
+    np.testing.assert_array_equal(summary['count'], grouped.count().to_numpy())
+    np.testing.assert_allclose(summary['mean'], grouped.mean().to_numpy())
+    np.testing.assert_allclose(summary['std'], grouped.std(ddof=0).to_numpy(), atol=1e-9)
+    # Quantiles come from half-point histogram bins: the bin holding the lower median
+    np.testing.assert_allclose(summary['median'], grouped.quantile(0.5, interpolation='lower').to_numpy(), atol=0.5)
+
+
+def test_remove_then_add_matches_rebuild(scored):
+    cube = AggregateCube.from_frame(scored)
+    changed = scored.head(100)
+    rescored = process_dataframe(changed.assign(suicide_risk_score=10, region='Central'))
+    cube.remove(changed)
+    cube.add(rescored)
+    rebuilt = AggregateCube.from_frame(process_dataframe(
+        patients(2000, seed=5).assign(suicide_risk_score=lambda df: df['suicide_risk_score'].where(df.index >= 100, 10),
+                                      region=lambda df: df['region'].where(df.index >= 100, 'Central'))
+    ))
+    for dimension in ('region', 'age_group', 'gender'):
+        ours, theirs = cube.query().by(dimension), rebuilt.query().by(dimension)
+        np.testing.assert_array_equal(ours['count'], theirs['count'])
+        np.testing.assert_allclose(ours['mean'], theirs['mean'])
+
+
+def test_copy_is_independent(scored):
+    cube = AggregateCube.from_frame(scored)
+    before = cube.query().by('region')
+    copy = cube.copy()
+    copy.add(process_dataframe(patients(50, seed=6).assign(region='Central')))
+    assert cube.query().by('region').equals(before)
+    assert cube.count.shape == (4, 5, 3)
+    assert copy.count.shape == (5, 5, 3)
+    assert copy.query().total() == 2050
+
+
+def test_materializer_replaces_the_cube(tmp_path):
+    repository = PatientRepository(str(tmp_path / 'patients.db'))
+    repository.insert_many(patients(300))
+    materializer = ScoreMaterializer(repository, DEFAULT_CONFIG)
+    materializer.refresh()
+    cube = materializer.cube
+    shape = cube.count.shape
+
+    repository.insert_many(patients(20, seed=2).assign(patient_id=lambda df: 'N' + df['patient_id'], region='Central'))
+    materializer.refresh()
+
+    assert materializer.cube is not cube
+    assert cube.count.shape == shape and cube.query().total() == 300
+    assert materializer.cube.query().total() == 320
+
+
+def test_missing_dimension_values_get_their_own_cell(scored):
+    scored = scored.copy()
+    scored.loc[:9, 'region'] = np.nan
+    scored.loc[5:14, 'age_group'] = None
+    cube = AggregateCube.from_frame(scored)
+
+    by_region = cube.query().by('region').set_index('region')['count']
+    expected = scored['region'].fillna(MISSING_LABEL).value_counts()
+    assert by_region.to_dict() == expected.to_dict()
+    assert cube.query({'region': ['North']}).by('region')['count'].tolist() == [(scored['region'] == 'North').sum()]
+    assert cube.query().by('age_group').set_index('age_group')['count'][MISSING_LABEL] == 10
+
+    # Removing the same rows empties the missing-value cells again
+    cube.remove(scored.head(15))
+    assert cube.query({'region': [MISSING_LABEL]}).by('region')['count'].sum() == 0
+
+
+def test_snapshot_cube_is_cached_per_source_and_filters(tmp_path, monkeypatch):
+    from src import data_loader
+    from src.cache import LRUCache, configure_cache
+
+    configure_cache(data=LRUCache(), resource=LRUCache())
+    path = tmp_path / 'patients.csv'
+    patients(300).to_csv(path, index=False)
+    builds = []
+    from_frame = AggregateCube.from_frame
+    monkeypatch.setattr(AggregateCube, 'from_frame', lambda df: builds.append(len(df)) or from_frame(df))
+
+    north = {'region': ('North',), 'gender': None}
+    for _ in range(3):
+        cube = data_loader.get_cohort_cube(str(path), filters=north)
+    assert len(builds) == 1
+    assert cube.query(north).count.sum() == (patients(300)['region'] == 'North').sum()
+
+    data_loader.get_cohort_cube(str(path))
+    patients(320).to_csv(path, index=False)
+    assert data_loader.get_cohort_cube(str(path)).count.sum() == 320
+    assert builds[1:] == [300, 320]
+    configure_cache(data=LRUCache(), resource=LRUCache())
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+from src import patient_store, storage
+from src.cache import LRUCache, configure_cache
+from src.data_loader import DataLoadError, get_shared_frame, load_emr_data, load_filter_options, load_scored_data
+from tests.helpers import patients
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    configure_cache(data=LRUCache(), resource=LRUCache())
+    yield
+    configure_cache(data=LRUCache(), resource=LRUCache())
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'patients.csv'
+    patients(200).to_csv(path, index=False)
+    return str(path)
+
+
+def test_csv_is_parsed_once_for_every_filter_combination(csv_path, monkeypatch):
+    reads = []
+    read = storage.CsvStore.read
+    monkeypatch.setattr(storage.CsvStore, 'read', lambda self, filters=None: reads.append(filters) or read(self, filters))
+
+    full = load_emr_data(csv_path)
+    north = load_emr_data(csv_path, {'region': ['North']})
+    south_women = load_emr_data(csv_path, {'region': ['South'], 'gender': ['Female']})
+    options = load_filter_options(csv_path)
+
+    assert reads == [None]
+    assert set(north['region']) == {'North'}
+    assert len(north) == (full['region'] == 'North').sum()
+    assert set(zip(south_women['region'], south_women['gender'])) == {('South', 'Female')}
+    assert options['region'] == ['East', 'North', 'South', 'West']
+    assert options['gender'] == sorted(full['gender'].unique())
+
+
+def test_parquet_filters_are_pushed_down(tmp_path, monkeypatch):
+    path = str(tmp_path / 'dataset')
+    storage.ParquetStore(path).append(patients(200))
+    pushed = []
+    read = storage.ParquetStore.read
+    monkeypatch.setattr(storage.ParquetStore, 'read', lambda self, filters=None: pushed.append(filters) or read(self, filters))
+
+    north = load_emr_data(path, {'region': ['North']})
+    assert pushed == [{'region': ['North']}]
+    assert set(north['region']) == {'North'}
+
+
+def test_scored_parquet_filters_are_pushed_down_until_the_snapshot_exists(tmp_path, monkeypatch):
+    path = str(tmp_path / 'dataset')
+    storage.ParquetStore(path).append(patients(200))
+    pushed = []
+    read = storage.ParquetStore.read
+    monkeypatch.setattr(storage.ParquetStore, 'read', lambda self, filters=None: pushed.append(filters) or read(self, filters))
+
+    filters = {'region': ('North',), 'gender': None}
+    north = load_scored_data(path, filters)
+    assert pushed == [filters]
+    assert get_shared_frame(path).frame is None
+    assert set(north['region']) == {'North'}
+
+    full = load_scored_data(path)
+    masked = load_scored_data(path, filters)
+    assert pushed == [filters, None]
+    expected = full[full['region'] == 'North'].sort_values('patient_id')
+    pushed_down = north.sort_values('patient_id')
+    assert list(pushed_down['patient_id']) == list(expected['patient_id']) == sorted(masked['patient_id'])
+    assert list(pushed_down['mhabi_score']) == list(expected['mhabi_score'])
+
+
+def test_clear_drops_the_parsed_frame(csv_path):
+    assert len(load_emr_data(csv_path)) == 200
+    patients(10).assign(patient_id=lambda df: 'N' + df['patient_id']).to_csv(csv_path, mode='a', header=False, index=False)
+    load_emr_data.clear()
+    assert len(load_emr_data(csv_path, {'region': None})) == 210
+    assert isinstance(load_emr_data(csv_path), pd.DataFrame)
+
+
+def test_missing_database_raises_without_creating_it(tmp_path):
+    path = tmp_path / 'missing' / 'patients.db'
+    with pytest.raises(DataLoadError, match="not found"):
+        load_emr_data(str(path))
+    assert load_filter_options(str(path)) == {}
+    assert not (tmp_path / 'missing').exists()
+
+
+def test_database_is_opened_once_across_loads(tmp_path, monkeypatch):
+    path = str(tmp_path / 'patients.db')
+    patient_store.PatientRepository(path).insert_many(patients(50))
+    opened = []
+    init = patient_store.PatientRepository.__init__
+    monkeypatch.setattr(patient_store.PatientRepository, '__init__', lambda self, p: opened.append(p) or init(self, p))
+
+    for filters in [None, {'region': ['North']}, {'region': ['South']}]:
+        load_emr_data(path, filters)
+        load_emr_data.clear()
+    load_filter_options(path)
+    assert opened == [path]
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.history import TrendRollups
+from src.mhabi_algorithm import DEFAULT_CONFIG, process_dataframe
+from src.patient_store import DuplicateAssessmentError, PatientRepository
+from tests.helpers import patients
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return PatientRepository(str(tmp_path / 'patients.db'))
+
+
+def visits(n, start, seed, days=120):
+    """`n` assessments of patients P000000... at random times in the `days` after `start`."""
+    rng = np.random.default_rng(seed)
+    offsets = pd.to_timedelta(rng.integers(0, days * 24 * 60, n), unit='min')
+    return patients(n, seed=seed).assign(assessed_at=pd.Timestamp(start) + offsets)
+
+
+def expected_weekly(history):
+    """Weekly sums per region computed directly from every saved assessment."""
+    times = pd.to_datetime(history['assessed_at'])
+    scored = process_dataframe(history.drop(columns='assessed_at'))
+    return pd.DataFrame({
+        'week_start': times.dt.normalize() - pd.to_timedelta(times.dt.weekday, unit='D'),
+        'region': scored['region'].astype(str),
+        'assessments': 1,
+        'score_sum': scored['mhabi_score'],
+        'amplified': scored['risk_amplified'].astype(int),
+    }).groupby(['week_start', 'region'], as_index=False).sum()
+
+
+def expected_trend(history, window):
+    weekly = expected_weekly(history)
+    rows = []
+    for week in pd.date_range(weekly['week_start'].min(), weekly['week_start'].max(), freq='W-MON'):
+        for region, sums in weekly.groupby('region'):
+            inside = sums[(sums['week_start'] > week - pd.Timedelta(weeks=window)) & (sums['week_start'] <= week)]
+            if inside['assessments'].sum():
+                rows.append((week, region, inside['assessments'].sum(), inside['score_sum'].sum() / inside['assessments'].sum()))
+    return pd.DataFrame(rows, columns=['week_start', 'region', 'assessments', 'mean_score'])
+
+
+def assert_rollups_match(rollups, history):
+    weekly = rollups.weekly()
+    expected = expected_weekly(history)
+    assert list(zip(weekly['week_start'], weekly['region'])) == list(zip(expected['week_start'], expected['region']))
+    np.testing.assert_array_equal(weekly['assessments'], expected['assessments'])
+    np.testing.assert_array_equal(weekly['amplified'], expected['amplified'])
+    np.testing.assert_allclose(weekly['score_sum'], expected['score_sum'])
+
+    for window in (1, 4):
+        trend = rollups.trend(window)
+        reference = expected_trend(history, window)
+        assert list(zip(trend['week_start'], trend['region'])) == list(zip(reference['week_start'], reference['region']))
+        np.testing.assert_array_equal(trend['assessments'], reference['assessments'])
+        np.testing.assert_allclose(trend['mean_score'], reference['mean_score'])
+
+
+def test_rollups_fold_reassessments_and_backfills(repository):
+    rollups = TrendRollups(repository, DEFAULT_CONFIG)
+    initial = visits(300, '2025-03-03', seed=1)
+    repository.save_assessments(initial)
+    assert rollups.refresh() == 300
+    assert_rollups_match(rollups, initial)
+
+    # Later re-assessments of known patients, a backfill of older ones and some new patients
+    reassessed = visits(80, '2025-07-07', seed=2)
+    backfilled = visits(60, '2024-11-04', seed=3, days=60)
+    new = visits(20, '2025-05-05', seed=4).assign(patient_id=lambda df: 'N' + df['patient_id'])
+    repository.save_assessments(reassessed)
+    repository.save_assessments(pd.concat([backfilled, new], ignore_index=True))
+    assert rollups.refresh() == 160
+    assert rollups.refresh() == 0
+    history = pd.concat([initial, reassessed, backfilled, new], ignore_index=True)
+    assert_rollups_match(rollups, history)
+
+    # Another process (a fresh instance) picks up from the shared watermark without recounting
+    assert TrendRollups(repository, DEFAULT_CONFIG).refresh() == 0
+    assert_rollups_match(rollups, history)
+
+
+def test_backfill_does_not_replace_the_current_record(repository):
+    current = patients(1).assign(assessed_at=pd.Timestamp('2025-06-02 10:00'), suicide_risk_score=3)
+    older = current.assign(assessed_at=pd.Timestamp('2025-01-06 10:00'), suicide_risk_score=9)
+    newer = current.assign(assessed_at=pd.Timestamp('2025-08-04 10:00'), suicide_risk_score=6)
+
+    assert repository.save_assessments(current) == (1, 0)
+    assert repository.save_assessments(older) == (0, 0)
+    assert repository.get('P000000')['suicide_risk_score'] == 3
+    assert repository.save_assessments(newer) == (0, 1)
+    assert repository.get('P000000')['suicide_risk_score'] == 6
+    assert repository.assessments('P000000')['suicide_risk_score'].tolist() == [9, 3, 6]
+
+
+def test_repeated_assessments_are_rejected_whole(repository):
+    rollups = TrendRollups(repository, DEFAULT_CONFIG)
+    batch = visits(50, '2025-03-03', seed=5)
+    repository.save_assessments(batch)
+    rollups.refresh()
+    revision = repository.current_revision()
+
+    again = pd.concat([batch.head(2), visits(5, '2025-09-01', seed=6)], ignore_index=True)
+    with pytest.raises(DuplicateAssessmentError) as error:
+        repository.save_assessments(again)
+    assert [patient_id for patient_id, _ in error.value.assessments] == sorted(batch['patient_id'].head(2))
+    assert repository.current_revision() == revision
+    assert rollups.refresh() == 0
+    assert_rollups_match(rollups, batch)
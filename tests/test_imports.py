@@ -0,0 +1,8 @@
+import pytest
+
+from benchmarks.import_time import CORE_MODULES, measure
+
+
+@pytest.mark.parametrize('module', CORE_MODULES)
+def test_core_module_imports_without_ui_libraries(module):
+    assert measure(module, repeat=1)['forbidden'] == []
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ingest import EMR_DTYPES, iter_emr_chunks, iter_record_chunks, narrow_counts
+from src.mhabi_algorithm import process_dataframe
+from src.patient_store import PatientRepository
+from src.score import score_file
+from tests.helpers import assert_matches_rowwise, patients
+
+
+@pytest.fixture
+def extract(tmp_path):
+    """A CSV extract whose fourth row has a blank wait_time_days cell."""
+    df = patients(50).astype({'wait_time_days': float})
+    df.loc[3, 'wait_time_days'] = np.nan
+    path = tmp_path / 'extract.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_blank_count_cell_is_read_as_missing(extract):
+    chunks = list(iter_emr_chunks(extract, chunksize=10))
+    assert [len(chunk) for chunk in chunks] == [10] * 5
+    # Only the chunk holding the blank cell keeps float64
+    assert chunks[0]['wait_time_days'].dtype == np.float64
+    assert all(chunk['wait_time_days'].dtype == np.int16 for chunk in chunks[1:])
+    assert chunks[0]['suicide_risk_score'].dtype == np.int8
+    assert chunks[0]['region'].dtype == 'category'
+    assert np.isnan(chunks[0]['wait_time_days'].iloc[3])
+
+
+def test_missing_count_scores_top_tier(extract):
+    chunk = next(iter_emr_chunks(extract, chunksize=10))
+    scored = process_dataframe(chunk)
+    assert_matches_rowwise(chunk, scored)
+    assert scored['norm_wait_time'].iloc[3] == 100
+
+
+def test_narrow_counts_is_lossless():
+    df = pd.DataFrame({
+        'wait_time_days': [1.0, 2.0], 'er_visits_last_year': [1.5, 2.0],
+        'missed_work_school_days': [1.0, 40000.0], 'suicide_risk_score': [3.0, 9.0],
+    })
+    narrowed = narrow_counts(df)
+    assert narrowed.dtypes.to_dict() == {
+        'wait_time_days': np.int16, 'er_visits_last_year': np.float64,
+        'missed_work_school_days': np.float64, 'suicide_risk_score': np.int8,
+    }
+    assert EMR_DTYPES['suicide_risk_score'] == 'int8'
+
+
+def test_missing_required_column(tmp_path):
+    path = tmp_path / 'partial.csv'
+    patients(5).drop(columns='dalys').to_csv(path, index=False)
+    with pytest.raises(ValueError, match='dalys'):
+        next(iter_emr_chunks(str(path)))
+
+
+def test_extract_with_blank_cell_seeds_repository(extract, tmp_path):
+    repository = PatientRepository(str(tmp_path / 'patients.db'))
+    for chunk in iter_emr_chunks(extract, chunksize=10):
+        repository.insert_many(chunk, skip_duplicates=True)
+    stored = repository.read()
+    assert len(stored) == 50
+    assert stored['wait_time_days'].isna().sum() == 1
+
+
+def test_score_file_with_blank_cell(extract, tmp_path):
+    output = str(tmp_path / 'scored.parquet')
+    assert score_file(extract, output, workers=1, chunksize=10)['rows'] == 50
+    scored = pd.read_parquet(output)
+    assert scored['norm_wait_time'].iloc[3] == 100
+    assert sum(len(chunk) for chunk in iter_record_chunks(output)) == 50
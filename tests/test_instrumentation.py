@@ -0,0 +1,142 @@
+import contextvars
+import json
+import re
+
+import pytest
+
+from src import instrumentation
+from src.instrumentation import Recorder, activate, instrumented, recording, stage
+
+# name{labels} value, with label values escaped as in the OpenMetrics text format
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)\{(?P<labels>.*)\} (?P<value>\S+)$')
+LABEL = re.compile(r'(?P<key>[a-zA-Z_][a-zA-Z0-9_]*)="(?P<value>(?:[^"\\]|\\.)*)"(?:,|$)')
+
+
+def parse_openmetrics(text):
+    """Parses exposition text into ({metric: {TYPE, UNIT, HELP}}, [(metric, labels, value)])."""
+    assert text.endswith('# EOF\n')
+    metadata, samples = {}, []
+    for line in text.splitlines()[:-1]:
+        if line.startswith('# '):
+            kind, name, value = line[2:].split(' ', 2)
+            metadata.setdefault(name, {})[kind] = value
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        labels = {
+            label['key']: re.sub(r'\\(.)', lambda m: {'n': '\n'}.get(m[1], m[1]), label['value'])
+            for label in LABEL.finditer(match['labels'])
+        }
+        samples.append((match['name'], labels, float(match['value'])))
+    return metadata, samples
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the wall clock and RSS reads with counters advanced by the test."""
+    now = {'seconds': 0.0, 'rss': 1000}
+    monkeypatch.setattr(instrumentation.time, 'perf_counter', lambda: now['seconds'])
+    monkeypatch.setattr(instrumentation, 'current_rss_bytes', lambda: now['rss'])
+    return now
+
+
+# --- Recording ---
+def test_stage_timings_accumulate_per_stage_and_labels(clock):
+    recorder = Recorder()
+    with recording(recorder):
+        for seconds, chart in [(0.5, 'region'), (0.25, 'region'), (2.0, 'age')]:
+            with stage('chart', chart=chart):
+                clock['seconds'] += seconds
+                clock['rss'] += 100
+    assert recorder.summary() == [
+        {'stage': 'chart', 'labels': {'chart': 'region'}, 'calls': 2, 'seconds': 0.75, 'rss_delta_bytes': 200},
+        {'stage': 'chart', 'labels': {'chart': 'age'}, 'calls': 1, 'seconds': 2.0, 'rss_delta_bytes': 100},
+    ]
+
+
+def test_instrumented_times_each_call_and_passes_results_through(clock):
+    @instrumented('work')
+    def work(seconds):
+        clock['seconds'] += seconds
+        return 1 / (seconds - 0.5)
+
+    recorder = Recorder()
+    with recording(recorder):
+        assert work(1.5) == 1.0
+        with pytest.raises(ZeroDivisionError):
+            work(0.5)
+    assert work(2.5) == 0.5
+    assert [(r['stage'], r['seconds']) for r in recorder.records] == [('work', 1.5), ('work', 0.5)]
+    assert work.__name__ == 'work'
+
+
+def test_failed_stage_is_still_recorded(clock):
+    recorder = Recorder()
+    with pytest.raises(RuntimeError), recording(recorder), stage('load'):
+        clock['seconds'] += 3.0
+        raise RuntimeError("unreadable")
+    assert [(r['stage'], r['seconds']) for r in recorder.records] == [('load', 3.0)]
+
+
+def test_disabled_recorder_reads_no_clock(monkeypatch):
+    monkeypatch.setattr(instrumentation.time, 'perf_counter', lambda: pytest.fail("clock read"))
+    recorder = Recorder(enabled=False)
+    with recording(recorder), stage('load'):
+        instrumented('work')(lambda: None)()
+    with stage('outside'):
+        pass
+    assert recorder.records == []
+
+
+def test_activate_lasts_for_the_context(clock):
+    def run():
+        recorder = activate(Recorder())
+        with stage('page'):
+            clock['seconds'] += 1.0
+        return recorder
+    recorder = contextvars.copy_context().run(run)
+    assert [r['stage'] for r in recorder.records] == ['page']
+    assert instrumentation._current.get() is instrumentation._DISABLED
+
+
+# --- Export ---
+def test_openmetrics_round_trip(clock, tmp_path):
+    recorder = Recorder()
+    with recording(recorder):
+        with stage('chart', chart='say "hi"\\now\n', **{'chart-kind': 'bar'}):
+            clock['seconds'] += 0.125
+            clock['rss'] -= 64
+        with stage('load'):
+            clock['seconds'] += 2.0
+
+    path = tmp_path / 'metrics.prom'
+    recorder.write_openmetrics(str(path), prefix='test')
+    metadata, samples = parse_openmetrics(path.read_text())
+
+    assert metadata['test_stage_duration_seconds'] == {
+        'TYPE': 'gauge', 'UNIT': 'seconds', 'HELP': 'Wall time spent in the stage during the last run.',
+    }
+    assert metadata['test_stage_calls'].keys() == {'TYPE', 'HELP'}
+    chart = {'stage': 'chart', 'chart': 'say "hi"\\now\n', 'chart_kind': 'bar'}
+    assert samples == [
+        ('test_stage_duration_seconds', chart, 0.125),
+        ('test_stage_duration_seconds', {'stage': 'load'}, 2.0),
+        ('test_stage_rss_delta_bytes', chart, -64.0),
+        ('test_stage_rss_delta_bytes', {'stage': 'load'}, 0.0),
+        ('test_stage_calls', chart, 1.0),
+        ('test_stage_calls', {'stage': 'load'}, 1.0),
+    ]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_jsonl_log_appends_one_line_per_record(clock, tmp_path):
+    recorder = Recorder()
+    with recording(recorder), stage('load', source='csv'):
+        clock['seconds'] += 1.0
+    path = tmp_path / 'stages.jsonl'
+    recorder.write_jsonl(str(path))
+    recorder.write_jsonl(str(path))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    assert {line['run_id'] for line in lines} == {recorder.run_id}
+    assert lines[0]['stage'] == 'load' and lines[0]['labels'] == {'source': 'csv'} and lines[0]['seconds'] == 1.0
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from src.materialize import ScoreMaterializer
+from src.mhabi_algorithm import DEFAULT_CONFIG, process_dataframe
+from src.patient_store import PATIENT_COLUMNS, PatientRepository
+from tests.helpers import assert_matches_rowwise, patients
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = PatientRepository(str(tmp_path / 'patients.db'))
+    repository.insert_many(patients(500))
+    return repository
+
+
+def as_plain(frame):
+    """Sorted by patient with plain dtypes, for comparing frames built different ways."""
+    frame = frame.sort_values('patient_id', ignore_index=True)
+    return frame.astype({column: str for column in ['region', 'age_group', 'gender']}).astype(
+        {column: float for column in ['wait_time_days', 'er_visits_last_year', 'missed_work_school_days', 'suicide_risk_score']}
+    )
+
+
+def test_incremental_refresh_matches_full_rescore(repository):
+    materializer = ScoreMaterializer(repository, DEFAULT_CONFIG)
+    materializer.refresh()
+
+    changed = repository.read().head(20).assign(suicide_risk_score=10, er_visits_last_year=4)
+    repository.save_assessments(changed)
+    new = patients(30, seed=9).assign(patient_id=lambda df: 'N' + df['patient_id'], region='Central')
+    repository.insert_many(new)
+
+    frame = materializer.refresh()
+    assert materializer.last_rescored == 50
+    expected = process_dataframe(repository.read())
+    pd.testing.assert_frame_equal(as_plain(frame)[expected.columns], as_plain(expected), check_dtype=False)
+    assert_matches_rowwise(repository.read().sort_values('patient_id', ignore_index=True),
+                           frame.sort_values('patient_id', ignore_index=True)[expected.columns])
+
+
+def test_refresh_never_modifies_a_returned_frame(repository):
+    materializer = ScoreMaterializer(repository, DEFAULT_CONFIG)
+    before = materializer.refresh()
+    snapshot = before.copy()
+
+    repository.save_assessments(repository.read().head(10).assign(wait_time_days=365))
+    repository.insert_many(patients(5, seed=4).assign(patient_id=lambda df: 'N' + df['patient_id'], region='Central'))
+    after = materializer.refresh()
+
+    assert after is not before
+    pd.testing.assert_frame_equal(before, snapshot)
+    assert len(after) == len(before) + 5
+
+
+def test_scores_persist_across_processes(repository):
+    ScoreMaterializer(repository, DEFAULT_CONFIG).refresh()
+    restarted = ScoreMaterializer(repository, DEFAULT_CONFIG)
+    assert len(restarted.refresh()) == 500
+    assert restarted.last_rescored == 0
+    assert list(restarted.refresh().columns[:len(PATIENT_COLUMNS)]) == PATIENT_COLUMNS
+
+
+def test_update_only_refresh_leaves_the_previous_frame_untouched(repository):
+    materializer = ScoreMaterializer(repository, DEFAULT_CONFIG)
+    before = materializer.refresh()
+    snapshot = before.copy()
+
+    repository.save_assessments(repository.read().tail(3).assign(suicide_risk_score=10, er_visits_last_year=5))
+    after = materializer.refresh()
+
+    pd.testing.assert_frame_equal(before, snapshot)
+    assert materializer.last_rescored == 3
+    assert (after.set_index('patient_id').loc[snapshot['patient_id'].tail(3), 'suicide_risk_score'] == 10).all()
+
+
+def test_row_positions_follow_inserts_and_updates(repository):
+    materializer = ScoreMaterializer(repository, DEFAULT_CONFIG)
+    materializer.refresh()
+    for round in range(4):
+        new = patients(3, seed=20 + round).assign(patient_id=lambda df: f"R{round}-" + df['patient_id'])
+        repository.insert_many(new)
+        known = repository.read().sample(4, random_state=round)
+        repository.save_assessments(known.assign(wait_time_days=200 - round))
+        frame = materializer.refresh()
+
+        assert len(materializer._positions) == len(frame) == 500 + 3 * (round + 1)
+        positions = [materializer._positions[patient_id] for patient_id in frame['patient_id']]
+        assert positions == list(range(len(frame)))
+        expected = process_dataframe(repository.read())
+        pd.testing.assert_frame_equal(as_plain(frame)[expected.columns], as_plain(expected), check_dtype=False)
@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.mhabi_algorithm import (
+    round_like_python, calculate_mhabi, calculate_mhabi_vectorized, process_dataframe
+)
+from src.scoring_config import load_scoring_config
+from tests.helpers import assert_matches_rowwise, patients
+
+CONFIG = load_scoring_config()
+# Inputs that score in the bottom tier of every factor and never amplify
+BASELINE = {
+    'wait_time_days': 0, 'dalys': 0.0, 'er_visits_last_year': 0,
+    'missed_work_school_days': 0, 'suicide_risk_score': 1,
+}
+
+
+def frame(rows):
+    return pd.DataFrame([{**BASELINE, **row} for row in rows])
+
+
+def boundary_values(factor):
+    """Every edge, the floats either side of it and the integers either side of it."""
+    values = []
+    for edge in factor.edge_values:
+        values += [edge, np.nextafter(edge, -np.inf), np.nextafter(edge, np.inf), edge - 1, edge + 1]
+    return values
+
+
+@pytest.mark.parametrize('factor', CONFIG.factors, ids=lambda factor: f"{factor.key}-{factor.comparison}")
+def test_tier_boundaries_match_rowwise(factor):
+    df = frame({factor.column: value} for value in boundary_values(factor))
+    assert_matches_rowwise(df, process_dataframe(df))
+
+
+@pytest.mark.parametrize('column, value, expected', [
+    # le: the edge itself belongs to the lower tier
+    ('wait_time_days', 7, 10), ('wait_time_days', 8, 40), ('wait_time_days', 90, 70), ('wait_time_days', 91, 100),
+    # lt: the edge itself belongs to the upper tier
+    ('dalys', 0.0999, 10), ('dalys', 0.1, 40), ('dalys', 0.29, 70), ('dalys', 0.3, 100),
+    # eq: only exact hits select a tier; anything else falls through to the last
+    ('er_visits_last_year', 0, 0), ('er_visits_last_year', 2, 70), ('er_visits_last_year', 0.5, 100),
+    ('er_visits_last_year', 3, 100), ('er_visits_last_year', -1, 100),
+])
+def test_tier_scores(column, value, expected):
+    factor = next(factor for factor in CONFIG.factors if factor.column == column)
+    assert factor.normalize(np.array([value]))[0] == expected
+    assert factor.normalize_scalar(value) == expected
+
+
+@pytest.mark.parametrize('column', list(BASELINE))
+def test_missing_input_scores_top_tier(column):
+    df = frame([{column: np.nan}])
+    scored = process_dataframe(df)
+    assert_matches_rowwise(df, scored)
+    factor = next(factor for factor in CONFIG.factors if factor.column == column)
+    assert scored[factor.output_column].iloc[0] == factor.score_values[-1]
+    assert not scored['risk_amplified'].iloc[0]
+
+
+@pytest.mark.parametrize('suicide_risk, er_visits, amplified', [
+    (7, 2, True), (10, 5, True), (6, 2, False), (7, 1, False), (np.nan, 2, False), (7, np.nan, False),
+])
+def test_amplification_threshold(suicide_risk, er_visits, amplified):
+    df = frame([{'suicide_risk_score': suicide_risk, 'er_visits_last_year': er_visits}])
+    scored = process_dataframe(df)
+    assert_matches_rowwise(df, scored)
+    assert bool(scored['risk_amplified'].iloc[0]) is amplified
+
+
+def test_amplified_score_is_capped():
+    df = frame([{'wait_time_days': 365, 'dalys': 1.0, 'er_visits_last_year': 5,
+                 'missed_work_school_days': 60, 'suicide_risk_score': 10}])
+    scored = process_dataframe(df)
+    assert_matches_rowwise(df, scored)
+    assert scored['risk_amplified'].iloc[0]
+    assert scored['mhabi_score'].iloc[0] == CONFIG.cap
+
+
+def test_every_tier_combination_matches_rowwise():
+    # One representative value per tier of each factor, crossed: covers every composite score
+    tiers = {
+        factor.column: [*factor.edge_values, factor.edge_values[-1] + 1] if factor.comparison != 'lt'
+        else [factor.edge_values[0] - 0.05, *factor.edge_values]
+        for factor in CONFIG.factors
+    }
+    df = pd.MultiIndex.from_product(tiers.values(), names=list(tiers)).to_frame(index=False)
+    assert_matches_rowwise(df, process_dataframe(df))
+
+
+def test_random_patients_match_rowwise():
+    df = patients(5000, seed=1)
+    df.loc[df.sample(frac=0.05, random_state=2).index, 'dalys'] = np.nan
+    assert_matches_rowwise(df, process_dataframe(df))
+
+
+@pytest.mark.parametrize('value', [0.125, 0.375, 1.005, 2.675, 30.065, 58.465, 70.015, 99.995, 43.5 * 1.1])
+def test_half_cent_rounding_matches_builtin_round(value):
+    assert round_like_python(np.array([value]))[0] == round(float(value), 2)
+
+
+def test_half_cent_rounding_grid_matches_builtin_round():
+    # Every half cent below 100 and the floats either side of it. float() matters:
+    # round() on an np.float64 uses NumPy's rounding, which is what the scorer must avoid.
+    halves = (np.arange(20000) + 0.5) / 100
+    values = np.concatenate([halves, np.nextafter(halves, 0), np.nextafter(halves, 200)])
+    expected = [round(float(v), 2) for v in values]
+    assert (np.round(values, 2) != expected).any()
+    np.testing.assert_array_equal(round_like_python(values), expected)
+
+
+def test_vectorized_returns_typed_arrays():
+    results = calculate_mhabi_vectorized(frame([{}, {'wait_time_days': 40}]))
+    assert results['mhabi_score'].dtype == np.float64
+    assert results['risk_amplified'].dtype == bool
+    assert all(scores.dtype == np.uint8 for scores in results['normalized_scores'].values())
+
+
+def test_process_dataframe_keeps_inputs_and_handles_empty():
+    df = patients(10)
+    scored = process_dataframe(df)
+    pd.testing.assert_frame_equal(scored[df.columns], df)
+    assert process_dataframe(df.iloc[:0]).empty
+
+
+def test_score_dicts_match_scalar():
+    df = patients(20)
+    scored = process_dataframe(df, include_score_dicts=True)
+    expected = [calculate_mhabi(row)['normalized_scores'] for row in df.to_dict('records')]
+    assert scored['normalized_scores'].tolist() == expected
+    assert not any(math.isnan(score) for score in scored['mhabi_score'])
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.ingest import REQUIRED_COLUMNS
+from src.migrate import main, migrate_csv_to_parquet
+from src.storage import ParquetStore
+from tests.helpers import patients
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'patients.csv'
+    patients(1200, seed=7).to_csv(path, index=False)
+    return str(path)
+
+
+def as_plain(df):
+    df = df[REQUIRED_COLUMNS].sort_values('patient_id', ignore_index=True)
+    return df.astype({column: str for column in ['patient_id', 'region', 'age_group', 'gender']}).astype(
+        {column: float for column in REQUIRED_COLUMNS[4:]}
+    )
+
+
+@pytest.mark.parametrize('partition_by', [['region'], ['region', 'gender']])
+def test_migrated_dataset_reads_back_as_the_csv(csv_path, tmp_path, partition_by):
+    target = str(tmp_path / 'dataset')
+    assert main([csv_path, target, '--partition-by', *partition_by, '--chunksize', '500']) == 0
+
+    store = ParquetStore(target, partition_cols=tuple(partition_by))
+    pd.testing.assert_frame_equal(as_plain(store.read()), as_plain(pd.read_csv(csv_path)))
+    assert sorted(os.listdir(target)) == [f"region={region}" for region in ['East', 'North', 'South', 'West']]
+    if 'gender' in partition_by:
+        assert sorted(os.listdir(os.path.join(target, 'region=North'))) == [
+            'gender=Female', 'gender=Male', 'gender=Non-binary']
+
+    north_women = store.read({'region': ['North'], 'gender': ['Female']})
+    assert set(zip(north_women['region'], north_women['gender'])) == {('North', 'Female')}
+
+
+def test_existing_dataset_is_not_overwritten(csv_path, tmp_path, capsys):
+    target = str(tmp_path / 'dataset')
+    assert migrate_csv_to_parquet(csv_path, target) == 1200
+    assert main([csv_path, target]) == 1
+    assert "already exists" in capsys.readouterr().err
+    assert len(ParquetStore(target).read()) == 1200
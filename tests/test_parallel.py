@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.mhabi_algorithm import DEFAULT_CONFIG, calculate_mhabi_vectorized
+from src.parallel import calculate_mhabi_parallel
+from src.scoring_config import load_scoring_config
+from tests.helpers import REGIONAL_PROFILE, patients
+
+
+@pytest.fixture
+def regional(tmp_path):
+    path = tmp_path / 'regional.toml'
+    path.write_text(REGIONAL_PROFILE)
+    return load_scoring_config(str(path))
+
+
+def assert_same_results(actual, expected):
+    np.testing.assert_array_equal(actual['mhabi_score'], expected['mhabi_score'])
+    np.testing.assert_array_equal(actual['risk_amplified'], expected['risk_amplified'])
+    assert list(actual['normalized_scores']) == list(expected['normalized_scores'])
+    for label, values in expected['normalized_scores'].items():
+        np.testing.assert_array_equal(actual['normalized_scores'][label], values)
+
+
+@pytest.mark.parametrize('shard_rows', [None, 333])
+def test_parallel_matches_vectorized(shard_rows):
+    df = patients(2000, seed=5)
+    df.loc[::97, 'dalys'] = np.nan
+    results = calculate_mhabi_parallel(df, DEFAULT_CONFIG, workers=2, shard_rows=shard_rows)
+    assert_same_results(results, calculate_mhabi_vectorized(df, DEFAULT_CONFIG))
+
+
+def test_parallel_packs_amplification_only_inputs(regional):
+    df = patients(1000, seed=6)
+    results = calculate_mhabi_parallel(df, regional, workers=2)
+    expected = calculate_mhabi_vectorized(df, regional)
+    assert expected['risk_amplified'].any()
+    assert_same_results(results, expected)
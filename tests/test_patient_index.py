@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from src.cache import LRUCache, configure_cache
+from src.data_loader import data_version, load_scored_data
+from src.mhabi_algorithm import normalized_scores_from_row, process_dataframe
+from src.patient_index import PatientIndex
+from src.patient_store import PatientRepository
+from tests.helpers import patients
+
+
+@pytest.fixture
+def fresh_cache():
+    configure_cache(data=LRUCache(), resource=LRUCache())
+    yield
+    configure_cache(data=LRUCache(), resource=LRUCache())
+
+
+@pytest.fixture
+def scored():
+    df = patients(30, seed=1)
+    df['patient_id'] = [f"{prefix}{i:03d}" for i, prefix in enumerate(['ab', 'AB', 'Ac', 'b'] * 7 + ['ab', 'z'])]
+    return process_dataframe(df)
+
+
+@pytest.fixture
+def index(scored):
+    return PatientIndex(scored)
+
+
+# --- Prefix search ---
+def test_prefix_search_is_case_insensitive_and_sorted(index, scored):
+    expected = sorted((i for i in scored['patient_id'] if i.upper().startswith('AB')), key=str.upper)
+    assert index.search('ab', limit=100) == expected
+    assert index.search('  aB ', limit=100) == expected
+    assert index.search('AC', limit=100) == [i for i in scored['patient_id'] if i.startswith('Ac')]
+
+
+def test_prefix_search_limits_and_misses(index):
+    assert index.search('a', limit=3) == index.search('a', limit=100)[:3]
+    assert index.search('', limit=1000) == sorted(index.search('', limit=1000), key=str.upper)
+    assert len(index.search('', limit=1000)) == len(index) == 30
+    assert index.search('q') == []
+    assert index.search('z') == ['z029']
+    assert index.search('z029x') == []
+
+
+# --- Exact lookup ---
+def test_exact_lookup(index, scored):
+    record = index.get('b003')
+    pd.testing.assert_series_equal(record, scored.iloc[3])
+    assert 'b003' in index and 'B003' not in index
+    assert index.get('B003') is None
+    assert index.sub_scores('b003') == normalized_scores_from_row(scored.iloc[3])
+    assert index.sub_scores('missing') is None
+
+
+def test_records_skip_unknown_ids(index, scored):
+    records = index.records(['z029', 'missing', 'ab000'])
+    assert records['patient_id'].tolist() == ['z029', 'ab000']
+    assert index.records(['missing']).empty
+    assert list(index.records([]).columns) == list(scored.columns)
+
+
+# --- Maintenance ---
+def test_index_rebuilt_after_inserts_sees_new_and_reassessed_patients(tmp_path, fresh_cache):
+    # The dashboard rebuilds its index whenever data_version changes
+    path = str(tmp_path / 'patients.db')
+    store = PatientRepository(path)
+    store.insert_many(patients(20, seed=2))
+    before = data_version(path)
+    old = PatientIndex(load_scored_data(path))
+
+    new_patient = patients(21, seed=3).iloc[[20]]
+    reassessed = patients(1, seed=4).assign(suicide_risk_score=10, er_visits_last_year=5)
+    store.save_assessments(pd.concat([new_patient, reassessed], ignore_index=True))
+    assert data_version(path) != before
+    index = PatientIndex(load_scored_data(path))
+
+    assert len(index) == 21 and len(old) == 20
+    assert 'P000020' in index and 'P000020' not in old
+    assert index.search('p00002') == ['P000020']
+    old_score, new_score = old.get('P000000')['mhabi_score'], index.get('P000000')['mhabi_score']
+    assert old_score == process_dataframe(patients(20, seed=2))['mhabi_score'].iloc[0]
+    assert new_score == process_dataframe(reassessed)['mhabi_score'].iloc[0] != old_score
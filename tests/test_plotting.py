@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.cube import CORRELATION_INPUTS, AggregateCube
+from src.mhabi_algorithm import process_dataframe
+from src.plotting import ols_from_statistics, scatter_with_trendline, sufficient_statistics
+from src.storage import apply_filters
+from tests.helpers import patients
+
+
+@pytest.fixture
+def scored():
+    df = patients(3000, seed=7)
+    df.loc[::50, 'dalys'] = np.nan
+    return process_dataframe(df)
+
+
+def test_ols_from_statistics_matches_polyfit():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=500)
+    y = 3 * x + 2 + rng.normal(size=500)
+    slope, intercept = ols_from_statistics(sufficient_statistics(x, y))
+    np.testing.assert_allclose([slope, intercept], np.polyfit(x, y, 1))
+    assert ols_from_statistics(sufficient_statistics([1, 1, 1], [1, 2, 3])) is None
+
+
+@pytest.mark.parametrize('column', CORRELATION_INPUTS)
+def test_cube_statistics_match_filtered_rows(scored, column):
+    filters = {'region': ['North', 'East'], 'age_group': ['25-34', '55+']}
+    rows = apply_filters(scored, filters)
+    x, y = rows[column].to_numpy(dtype=float), rows['mhabi_score'].to_numpy()
+    valid = ~np.isnan(x)
+    expected = sufficient_statistics(x[valid], y[valid])
+    statistics = AggregateCube.from_frame(scored).query(filters).statistics(column)
+    assert statistics['n'] == expected['n']
+    np.testing.assert_allclose([statistics[key] for key in expected], list(expected.values()))
+
+
+def test_cube_statistics_follow_updates(scored):
+    cube = AggregateCube.from_frame(scored)
+    changed = scored.head(200)
+    cube.remove(changed)
+    cube.add(process_dataframe(changed.assign(wait_time_days=changed['wait_time_days'] * 2)))
+    updated = scored.assign(wait_time_days=np.where(scored.index < 200, scored['wait_time_days'] * 2, scored['wait_time_days']))
+    rescored = process_dataframe(updated[patients(1).columns])
+    expected = sufficient_statistics(rescored['wait_time_days'], rescored['mhabi_score'])
+    np.testing.assert_allclose(list(cube.query().statistics('wait_time_days').values()), list(expected.values()))
+
+
+def test_small_cohort_is_drawn_as_points(scored):
+    fig = scatter_with_trendline(scored.head(100), 'wait_time_days', 'mhabi_score', 'title', {})
+    points, trend = fig.data
+    assert points.type == 'scattergl' and len(points.x) == 100
+    assert trend.mode == 'lines'
+
+
+def test_large_cohort_is_binned_and_uses_given_statistics(scored):
+    statistics = AggregateCube.from_frame(scored).query().statistics('dalys')
+    fig = scatter_with_trendline(scored, 'dalys', 'mhabi_score', 'title', {}, max_points=1000, statistics=statistics)
+    density, trend = fig.data
+    assert density.name == 'Patients (binned)'
+    assert density.customdata.sum() == statistics['n']
+    slope, intercept = ols_from_statistics(statistics)
+    np.testing.assert_allclose(trend.y, intercept + slope * np.asarray(trend.x))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from src.mhabi_algorithm import process_dataframe
+from src.population import summarize_emr_file
+from tests.helpers import patients
+
+
+def test_streaming_summary_matches_full_scan(tmp_path):
+    path = tmp_path / 'patients.csv'
+    df = patients(2500, seed=4)
+    df.to_csv(path, index=False)
+
+    summary = summarize_emr_file(str(path), chunksize=400)
+    scored = process_dataframe(df)
+    scores = scored['mhabi_score'].to_numpy()
+
+    assert summary['chunks'] == 7
+    overall = summary['overall']
+    assert overall['count'] == len(df)
+    assert overall['mean'] == pytest.approx(scores.mean())
+    assert overall['std'] == pytest.approx(scores.std())
+    assert (overall['min'], overall['max']) == (scores.min(), scores.max())
+    assert overall['amplified_count'] == scored['risk_amplified'].sum()
+
+    assert list(summary['groups']) == sorted(df['region'].unique())
+    for region, group in summary['groups'].items():
+        expected = scored[scored['region'] == region]
+        assert group['count'] == len(expected)
+        assert group['mean'] == pytest.approx(expected['mhabi_score'].mean())
+        assert group['amplified_rate'] == pytest.approx(expected['risk_amplified'].mean())
+
+
+def test_empty_extract_has_empty_summary(tmp_path):
+    path = tmp_path / 'empty.csv'
+    patients(0).to_csv(path, index=False)
+    summary = summarize_emr_file(str(path))
+    assert summary['overall']['count'] == 0 and summary['overall']['mean'] is None
+    assert summary['groups'] == {}
+    assert np.isfinite(summary['peak_rss_bytes'])
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from src import mhabi_algorithm
+from src.mhabi_algorithm import calculate_mhabi, process_dataframe
+from src.scoring_config import ScoringConfigError, list_scoring_profiles, load_scoring_config
+from tests.helpers import REGIONAL_PROFILE, assert_matches_rowwise, patients
+
+
+@pytest.fixture
+def regional(tmp_path):
+    path = tmp_path / 'regional.toml'
+    path.write_text(REGIONAL_PROFILE)
+    return load_scoring_config(str(path))
+
+
+def test_custom_profile_matches_rowwise(regional):
+    df = patients(2000, seed=3)
+    scored = process_dataframe(df, config=regional)
+    assert_matches_rowwise(df, scored, config=regional)
+    assert list(regional.normalized_score_columns.values()) == ['norm_wait_time', 'norm_er_visits']
+    assert scored['mhabi_score'].max() <= 90
+
+
+def test_input_columns_include_amplification_inputs(regional):
+    assert regional.input_columns == ['wait_time_days', 'er_visits_last_year', 'suicide_risk_score']
+    assert mhabi_algorithm.DEFAULT_CONFIG.input_columns == [
+        factor.column for factor in mhabi_algorithm.DEFAULT_CONFIG.factors
+    ]
+
+
+def test_profiles_are_cached_by_content(regional, tmp_path):
+    copy = tmp_path / 'copy.toml'
+    copy.write_text(REGIONAL_PROFILE)
+    assert load_scoring_config(str(copy)) is regional
+
+
+def test_default_profile_is_compiled_once(monkeypatch):
+    def reload(*args, **kwargs):
+        raise AssertionError("default profile reloaded")
+    monkeypatch.setattr(mhabi_algorithm, 'load_scoring_config', reload)
+    row = patients(1).iloc[0].to_dict()
+    assert calculate_mhabi(row)['mhabi_score'] == process_dataframe(patients(1))['mhabi_score'].iloc[0]
+
+
+@pytest.mark.parametrize('text, message', [
+    ('name = "empty"', "defines no factors"),
+    ('[[factors]]\nkey = "x"\nlabel = "X"\ncolumn = "x"\nweight = 1\nedges = [1]\nscores = [1]', "one more score"),
+    ('[[factors]]\nkey = "x"\nlabel = "X"\ncolumn = "x"\nweight = 1\nedges = [2, 1]\nscores = [1, 2, 3]', "strictly increasing"),
+    ('[[factors]]\nkey = "x"\nlabel = "X"\ncolumn = "x"\nweight = 1\ncomparison = "ge"\nedges = [1]\nscores = [1, 2]', "unknown comparison"),
+    ('[[factors]]\nkey = "x"\nlabel = "X"\nweight = 1\nedges = [1]\nscores = [1, 2]', "missing required key"),
+])
+def test_malformed_profiles_are_rejected(tmp_path, text, message):
+    path = tmp_path / 'bad.toml'
+    path.write_text(text)
+    with pytest.raises(ScoringConfigError, match=message):
+        load_scoring_config(str(path))
+
+
+def test_list_scoring_profiles(tmp_path):
+    (tmp_path / 'b.toml').write_text(REGIONAL_PROFILE)
+    (tmp_path / 'a.toml').write_text(REGIONAL_PROFILE)
+    (tmp_path / 'notes.txt').write_text('')
+    assert list(list_scoring_profiles(str(tmp_path))) == ['a', 'b']
+    assert list_scoring_profiles(str(tmp_path / 'missing')) == {}
+    assert 'default' in list_scoring_profiles()
+    assert np.isclose(load_scoring_config().weights.sum(), 1.0)
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+from src.mhabi_algorithm import DEFAULT_CONFIG, normalized_scores_from_row, process_dataframe
+from src.service import NDJSON_CONTENT_TYPE, MicroBatcher, ScoringService
+from tests.helpers import patients
+
+# Generous bound for steps that should finish at once, so a hang fails the test instead of the run
+TIMEOUT = 5
+
+
+def run_service(scenario, **options):
+    """Runs `await scenario(service)` against a ScoringService listening on a free port."""
+    async def main():
+        service = ScoringService(DEFAULT_CONFIG, **options)
+        await service.start(port=0)
+        try:
+            return await asyncio.wait_for(scenario(service), TIMEOUT)
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+
+async def request(service, method, path, body=b'', content_type='application/json'):
+    """Sends one HTTP request on a fresh connection; returns (status, content type, body)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', service.port)
+    head = f"{method} {path} HTTP/1.1\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n"
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    payload = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return status, headers['content-type'], payload
+
+
+def assert_matches_process_dataframe(records, results):
+    """Asserts that service results agree with `process_dataframe` over the same records."""
+    scored = process_dataframe(pd.DataFrame(records)).to_dict('records')
+    assert [result['patient_id'] for result in results] == [row['patient_id'] for row in scored]
+    assert [result['mhabi_score'] for result in results] == [row['mhabi_score'] for row in scored]
+    assert [result['risk_amplified'] for result in results] == [row['risk_amplified'] for row in scored]
+    assert [result['normalized_scores'] for result in results] == [normalized_scores_from_row(row) for row in scored]
+
+
+# --- Scoring ---
+def test_batch_matches_process_dataframe():
+    records = patients(300, seed=1).to_dict('records')
+
+    async def scenario(service):
+        return await request(service, 'POST', '/score/batch', json.dumps(records).encode())
+    status, content_type, body = run_service(scenario)
+    assert (status, content_type) == (200, 'application/json')
+    assert_matches_process_dataframe(records, json.loads(body))
+
+
+def test_ndjson_batch_keeps_format_and_order():
+    records = patients(50, seed=2).to_dict('records')
+    body = b''.join(json.dumps(record).encode() + b'\n' for record in records)
+
+    async def scenario(service):
+        return await request(service, 'POST', '/score/batch', body, NDJSON_CONTENT_TYPE)
+    status, content_type, payload = run_service(scenario)
+    assert (status, content_type) == (200, NDJSON_CONTENT_TYPE)
+    assert_matches_process_dataframe(records, [json.loads(line) for line in payload.splitlines()])
+
+
+def test_concurrent_single_requests_are_coalesced():
+    records = patients(40, seed=3).to_dict('records')
+
+    async def scenario(service):
+        responses = await asyncio.gather(*(
+            request(service, 'POST', '/score', json.dumps(record).encode()) for record in records
+        ))
+        return responses, service.batcher.stats()
+    responses, stats = run_service(scenario, max_delay=0.05)
+    assert {status for status, _, _ in responses} == {200}
+    assert_matches_process_dataframe(records, [json.loads(body) for _, _, body in responses])
+    assert stats['records'] == len(records)
+    assert stats['batches'] < len(records)
+
+
+# --- Micro-batching ---
+def run_batcher(records, **options):
+    """Submits records concurrently to a MicroBatcher; returns (results, stats)."""
+    async def main():
+        batcher = MicroBatcher(DEFAULT_CONFIG, **options)
+        batcher.start()
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(record) for record in records)), TIMEOUT)
+            return results, batcher.stats()
+        finally:
+            await batcher.stop()
+    return asyncio.run(main())
+
+
+def test_full_batch_flushes_without_waiting():
+    # The delay is longer than the timeout, so only flushing on size lets this finish
+    records = patients(16, seed=4).to_dict('records')
+    results, stats = run_batcher(records, max_batch_size=8, max_delay=60)
+    assert_matches_process_dataframe(records, results)
+    assert (stats['batches'], stats['records'], stats['mean_batch_size']) == (2, 16, 8.0)
+
+
+def test_partial_batch_flushes_after_the_delay():
+    records = patients(3, seed=5).to_dict('records')
+    results, stats = run_batcher(records, max_batch_size=512, max_delay=0.01)
+    assert_matches_process_dataframe(records, results)
+    assert (stats['batches'], stats['records'], stats['queued']) == (1, 3, 0)
+
+
+# --- Errors ---
+@pytest.mark.parametrize('path, body, message', [
+    ('/score', b'{"patient_id": ', "Invalid JSON"),
+    ('/score', b'[1, 2]', "must be a JSON object"),
+    ('/score', b'{"wait_time_days": 3}', "Field 'dalys' must be a number"),
+    ('/score/batch', b'{"wait_time_days": 3}', "Expected a JSON array"),
+])
+def test_malformed_payloads_are_rejected(path, body, message):
+    async def scenario(service):
+        return await request(service, 'POST', path, body)
+    status, content_type, payload = run_service(scenario)
+    assert (status, content_type) == (400, 'application/json')
+    assert message in json.loads(payload)['error']
+
+
+def test_batch_error_names_the_patient_and_rejects_booleans():
+    records = patients(2, seed=6).to_dict('records')
+    records[1]['suicide_risk_score'] = True
+
+    async def scenario(service):
+        return await request(service, 'POST', '/score/batch', json.dumps(records).encode())
+    status, _, payload = run_service(scenario)
+    assert status == 400
+    assert json.loads(payload)['error'] == "Patient 1: Field 'suicide_risk_score' must be a number."
+
+
+def test_unknown_routes_and_error_metrics():
+    async def scenario(service):
+        statuses = [
+            (await request(service, 'GET', '/nowhere'))[0],
+            (await request(service, 'GET', '/score'))[0],
+            (await request(service, 'POST', '/score', b'not json'))[0],
+        ]
+        _, _, metrics = await request(service, 'GET', '/metrics')
+        return statuses, json.loads(metrics)
+    statuses, metrics = run_service(scenario)
+    assert statuses == [404, 405, 400]
+    assert metrics['endpoints']['/score']['count'] == 2
+    assert metrics['endpoints']['/score']['errors'] == 2
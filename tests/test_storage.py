@@ -0,0 +1,56 @@
+import pytest
+
+from src.patient_store import PatientRepository
+from src.storage import CsvStore, ParquetStore, apply_filters, open_store, store_type
+from tests.helpers import patients
+
+
+@pytest.fixture(params=['csv', 'parquet', 'db'])
+def store(request, tmp_path):
+    return open_store(str(tmp_path / {'csv': 'patients.csv', 'parquet': 'dataset', 'db': 'patients.db'}[request.param]))
+
+
+def test_open_store_picks_backend(tmp_path):
+    assert isinstance(open_store(str(tmp_path / 'a.csv')), CsvStore)
+    assert isinstance(open_store(str(tmp_path / 'a.db')), PatientRepository)
+    assert isinstance(open_store(str(tmp_path / 'dataset')), ParquetStore)
+
+
+def test_store_type_does_not_open_the_store(tmp_path):
+    assert store_type(str(tmp_path / 'new' / 'a.sqlite')) is PatientRepository
+    assert store_type(str(tmp_path / 'A.CSV')) is CsvStore
+    assert store_type(str(tmp_path / 'emr.parquet')) is ParquetStore
+    assert not (tmp_path / 'new').exists()
+
+
+def test_lookups_on_a_missing_store(store):
+    assert not store.contains('P001')
+    assert store.existing_ids(['P001']) == set()
+    assert store.next_patient_id() == 'P001'
+
+
+def test_lookups_on_an_empty_csv(tmp_path):
+    path = tmp_path / 'patients.csv'
+    path.write_text('')
+    store = CsvStore(str(path))
+    assert not store.contains('P001')
+    assert store.existing_ids(['P001']) == set()
+
+
+def test_append_then_lookup(store):
+    df = patients(30)
+    store.append(df)
+    assert store.contains('P000007')
+    assert not store.contains('P999999')
+    assert store.existing_ids(['P000001', 'X1']) == {'P000001'}
+    assert store.next_patient_id() == 'P030'
+    north = store.read({'region': ['North']})
+    assert len(north) == (df['region'] == 'North').sum()
+    assert store.distinct_values('gender') == sorted(df['gender'].unique())
+
+
+def test_apply_filters_ignores_unset_columns():
+    df = patients(50)
+    assert apply_filters(df, None) is df
+    assert apply_filters(df, {'region': None}) is df
+    assert apply_filters(df, {'region': []}).empty
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.table import AMPLIFIED_ROW_STYLE, PatientTable, amplified_row_styles
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'patient_id': [f"P{i:03d}" for i in range(7)],
+        'region': ['North', 'South', None, 'East', 'North', 'West', 'East'],
+        'mhabi_score': [50.0, 75.5, 50.0, np.nan, 90.0, 75.5, 50.0],
+        'risk_amplified': [False, True, False, False, True, False, True],
+    })
+
+
+def ids(page):
+    return page['patient_id'].tolist()
+
+
+# --- Sorting ---
+@pytest.mark.parametrize('descending', [False, True])
+def test_sort_is_stable_in_both_directions(df, descending):
+    table = PatientTable(df)
+    expected = df.sort_values('mhabi_score', ascending=not descending, kind='stable')
+    assert ids(table.page(1, page_size=10, descending=descending)) == ids(expected)
+
+
+def test_descending_ties_keep_frame_order(df):
+    page = PatientTable(df).page(1, page_size=10)
+    assert ids(page) == ['P004', 'P001', 'P005', 'P000', 'P002', 'P006', 'P003']
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_text_columns_sort_with_missing_values_last(df, descending):
+    page = PatientTable(df).page(1, page_size=10, sort_by='region', descending=descending)
+    expected = df.sort_values('region', ascending=not descending, kind='stable', na_position='last')
+    assert ids(page) == ids(expected)
+
+
+def test_sort_orders_are_computed_once(df, monkeypatch):
+    table = PatientTable(df)
+    assert list(table._orders) == [('mhabi_score', True)]
+    calls = []
+    original = table._sort_keys
+    monkeypatch.setattr(table, '_sort_keys', lambda column: calls.append(column) or original(column))
+    for page_number in (1, 2, 3):
+        table.page(page_number, page_size=3)
+        table.page(page_number, page_size=3, sort_by='region', descending=False)
+    assert calls == ['region']
+    table.page(1, page_size=3, sort_by='region')
+    assert calls == ['region', 'region']
+
+
+# --- Paging ---
+def test_pages_cover_every_row_once(df):
+    table = PatientTable(df, columns=['patient_id', 'mhabi_score'])
+    assert table.page_count(3) == 3
+    pages = [table.page(page_number, page_size=3) for page_number in (1, 2, 3)]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum((ids(page) for page in pages), []) == ids(table.page(1, page_size=10))
+    assert list(pages[0].columns) == ['patient_id', 'mhabi_score']
+
+
+def test_page_numbers_are_clamped(df):
+    table = PatientTable(df)
+    assert ids(table.page(0, page_size=3)) == ids(table.page(1, page_size=3))
+    assert ids(table.page(99, page_size=3)) == ids(table.page(3, page_size=3))
+    assert ids(table.page(2, page_size=3, sort_by=None)) == ['P003', 'P004', 'P005']
+
+
+def test_empty_table_has_one_empty_page(df):
+    table = PatientTable(df.iloc[:0])
+    assert (len(table), table.page_count(50)) == (0, 1)
+    assert table.page(1).empty
+
+
+def test_amplified_rows_are_highlighted(df):
+    page = PatientTable(df).page(1, page_size=3)
+    styles = amplified_row_styles(page)
+    assert styles.shape == page.shape
+    assert (styles.iloc[:, 0] == AMPLIFIED_ROW_STYLE).tolist() == page['risk_amplified'].tolist()
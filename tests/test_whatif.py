@@ -0,0 +1,46 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from src.mhabi_algorithm import DEFAULT_CONFIG, process_dataframe
+from src.whatif import WhatIfModel
+from tests.helpers import patients
+
+
+def with_weights(config, weights, amplification_factor):
+    """The profile `config` with other weights and amplification, as a full rescore would use."""
+    factors = tuple(dataclasses.replace(factor, weight=weights[factor.label]) for factor in config.factors)
+    return dataclasses.replace(config, factors=factors, amplification_factor=amplification_factor)
+
+
+@pytest.fixture(scope='module')
+def population():
+    df = patients(20000, seed=8)
+    return df, WhatIfModel(process_dataframe(df), DEFAULT_CONFIG)
+
+
+def test_baseline_parameters_reproduce_scores(population):
+    df, model = population
+    np.testing.assert_array_equal(model.rescore(), model.baseline)
+    assert model.compare()['changed'] == 0
+
+
+def test_scenarios_match_full_rescore(population):
+    df, model = population
+    rng = np.random.default_rng(9)
+    for _ in range(20):
+        weights = dict(zip(model.labels, rng.uniform(0, 0.6, len(model.labels)).round(2).tolist()))
+        amplification_factor = round(float(rng.uniform(1, 1.6)), 2)
+        expected = process_dataframe(df, config=with_weights(DEFAULT_CONFIG, weights, amplification_factor))
+        np.testing.assert_array_equal(model.rescore(weights, amplification_factor), expected['mhabi_score'])
+
+
+def test_compare_summarizes_shift(population):
+    df, model = population
+    scenario = model.compare({'Suicide Risk': 0.4}, 1.3)
+    delta = scenario['scores'] - model.baseline
+    assert scenario['changed'] == np.count_nonzero(np.abs(delta) >= 0.005)
+    assert scenario['mean_change'] == pytest.approx(delta.mean())
+    assert scenario['after']['counts'].sum() == scenario['before']['counts'].sum() == len(model)
+    assert scenario['after']['mean'] > scenario['before']['mean']